@@ -6,7 +6,10 @@ import os
 sys.path.append('/opt/src')  
 
 from scraper import scrape_books_to_minio
-from etl import etl_raw_to_bronze, etl_bronze_to_silver, etl_silver_to_gold, run_data_quality_task
+from etl import (
+    etl_raw_to_bronze, etl_compact_bronze, etl_bronze_to_silver, etl_compact_silver,
+    etl_silver_to_gold, run_data_quality_task,
+)
 
 
 default_args = {
@@ -34,11 +37,21 @@ with DAG(
         python_callable=etl_raw_to_bronze
     )
 
+    compact_bronze_task = PythonOperator(
+        task_id="compact_bronze",
+        python_callable=etl_compact_bronze
+    )
+
     silver_task = PythonOperator(
         task_id="transform_bronze_to_silver",
         python_callable=etl_bronze_to_silver
     )
 
+    compact_silver_task = PythonOperator(
+        task_id="compact_silver",
+        python_callable=etl_compact_silver
+    )
+
     gold_task = PythonOperator(
         task_id="transform_silver_to_gold",
         python_callable=etl_silver_to_gold
@@ -50,7 +63,7 @@ with DAG(
     python_callable=run_data_quality_task
 )
 
-    scrape_task >> bronze_task >> silver_task >> gold_task >> dq_task
+    scrape_task >> bronze_task >> compact_bronze_task >> silver_task >> compact_silver_task >> gold_task >> dq_task
 
 
 
@@ -0,0 +1,102 @@
+"""
+Vector backends against corpus size: Chroma (persistent client, HNSW + SQLite), the memory-mapped
+snapshot and the in-memory NumPy exact index. For each size: time to open, single-query p50/p99
+with documents and metadata (what a /query/ request fetches), throughput for batches of 32
+queries (what the micro-batcher sends), and Chroma's recall@k against the exact top k.
+
+Vectors are random unit vectors, so HNSW recall here is a lower bound on what real embeddings get.
+
+    python benchmarks/bench_backends.py --sizes 1000 10000 50000 --dim 384
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import chromadb
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from vector_snapshot import ExactIndex, VectorSnapshot, export_collection  # noqa: E402
+
+
+def unit_vectors(size, dim, seed):
+    vectors = np.random.default_rng(seed).standard_normal((size, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def build(tmp, size, dim):
+    client = chromadb.PersistentClient(path=os.path.join(tmp, "chroma"))
+    collection = client.get_or_create_collection("rag_docs")
+    vectors = unit_vectors(size, dim, seed=0)
+    step = client.get_max_batch_size()
+    for start in range(0, size, step):
+        rows = range(start, min(start + step, size))
+        collection.add(ids=[f"chunk-{i}" for i in rows], embeddings=vectors[start:start + len(rows)],
+                       documents=[f"document {i} " * 20 for i in rows],
+                       metadatas=[{"source": f"raw/{i % 1000}.txt", "price": float(i % 50)} for i in rows])
+    export_collection(collection, os.path.join(tmp, "vector_snapshot"), quantization="none")
+
+
+def open_backend(tmp, backend):
+    if backend == "chroma":
+        return chromadb.PersistentClient(path=os.path.join(tmp, "chroma")).get_collection("rag_docs")
+    kind = VectorSnapshot if backend == "snapshot" else ExactIndex
+    return kind.open_current(os.path.join(tmp, "vector_snapshot"))
+
+
+def bench(tmp, backend, queries, k, truth):
+    started = time.perf_counter()
+    store = open_backend(tmp, backend)
+    open_seconds = time.perf_counter() - started
+    store.query(query_embeddings=queries[:1], n_results=k, include=["distances"])  # warm caches before timing
+
+    latencies, found = [], []
+    for query in queries:
+        started = time.perf_counter()
+        result = store.query(query_embeddings=query[None, :], n_results=k, include=["documents", "metadatas", "distances"])
+        latencies.append(time.perf_counter() - started)
+        found.append(result["ids"][0])
+    latencies = np.array(latencies) * 1000
+
+    started = time.perf_counter()
+    for start in range(0, len(queries), 32):
+        store.query(query_embeddings=queries[start:start + 32], n_results=k, include=["documents", "metadatas", "distances"])
+    batch_seconds = time.perf_counter() - started
+
+    return {
+        "backend": backend,
+        "open_s": round(open_seconds, 3),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 2),
+        "batch32_qps": round(len(queries) / batch_seconds, 1),
+        f"recall@{k}": round(float(np.mean([len(set(t) & set(f)) / k for t, f in zip(truth, found)])), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    rows = []
+    for size in args.sizes:
+        queries = unit_vectors(args.queries, args.dim, seed=1)
+        with tempfile.TemporaryDirectory() as tmp:
+            build(tmp, size, args.dim)
+            truth = ExactIndex.open_current(os.path.join(tmp, "vector_snapshot")).query(
+                queries, n_results=args.k, include=[])["ids"]
+            rows += [dict(size=size, **bench(tmp, backend, queries, args.k, truth))
+                     for backend in ("chroma", "snapshot", "numpy")]
+    columns = list(rows[0])
+    print(" | ".join(f"{column:>11}" for column in columns))
+    for row in rows:
+        print(" | ".join(f"{row[column]:>11}" for column in columns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Keyword-index cost for hybrid retrieval: BM25 build time, on-disk size, load time and query
+latency against corpus size, plus the reciprocal-rank fusion step. With --with-chroma the same
+corpus (random 384-d vectors) is loaded into an in-memory Chroma collection so BM25 latency can be
+read against the vector search it runs next to.
+
+    python benchmarks/bench_hybrid.py --sizes 1000 10000 50000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from keyword_index import BM25Index, reciprocal_rank_fusion  # noqa: E402
+
+
+def synthetic_corpus(size, words_per_chunk=150, vocabulary=20000, seed=0):
+    """Zipf-distributed words, roughly like English text, with a price and title per chunk."""
+    rng = np.random.default_rng(seed)
+    words = np.array([f"w{i}" for i in range(vocabulary)])
+    ranks = np.minimum(rng.zipf(1.2, size=(size, words_per_chunk)), vocabulary) - 1
+    return [
+        f"title: book {i} price: £{rng.uniform(10, 60):.2f} " + " ".join(words[row])
+        for i, row in enumerate(ranks)
+    ]
+
+
+def percentiles(samples):
+    samples = np.asarray(samples) * 1000
+    return round(float(np.percentile(samples, 50)), 3), round(float(np.percentile(samples, 99)), 3)
+
+
+def bench_size(size, queries, with_chroma, candidates):
+    documents = synthetic_corpus(size)
+    ids = [f"chunk-{i}" for i in range(size)]
+
+    started = time.perf_counter()
+    index = BM25Index.build(ids, documents)
+    build_seconds = time.perf_counter() - started
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bm25_index.npz")
+        index_bytes = index.save(path)
+        started = time.perf_counter()
+        index = BM25Index.load(path)
+        load_seconds = time.perf_counter() - started
+
+    rng = np.random.default_rng(1)
+    query_texts = [f"book {rng.integers(size)} w{rng.integers(50)} w{rng.integers(2000)}" for _ in range(queries)]
+    keyword_latency, keyword_rankings = [], []
+    for query in query_texts:
+        started = time.perf_counter()
+        keyword_rankings.append([doc_id for doc_id, _ in index.search(query, candidates)])
+        keyword_latency.append(time.perf_counter() - started)
+
+    fusion_latency = []
+    for ranking in keyword_rankings:
+        vector_ranking = list(rng.choice(ids, size=candidates, replace=False))
+        started = time.perf_counter()
+        reciprocal_rank_fusion([vector_ranking, ranking])
+        fusion_latency.append(time.perf_counter() - started)
+
+    row = {
+        "chunks": size,
+        "terms": index.stats()["terms"],
+        "build_s": round(build_seconds, 3),
+        "index_mb": round(index_bytes / 1e6, 2),
+        "load_s": round(load_seconds, 3),
+        "bm25_p50_ms": percentiles(keyword_latency)[0],
+        "bm25_p99_ms": percentiles(keyword_latency)[1],
+        "rrf_p50_ms": percentiles(fusion_latency)[0],
+    }
+
+    if with_chroma:
+        import chromadb
+
+        collection = chromadb.EphemeralClient().get_or_create_collection(f"bench-{size}")
+        vectors = rng.standard_normal((size, 384)).astype(np.float32)
+        for start in range(0, size, 5000):
+            collection.add(ids=ids[start:start + 5000], embeddings=vectors[start:start + 5000],
+                           documents=documents[start:start + 5000])
+        vector_latency = []
+        for query_vector in rng.standard_normal((queries, 384)).astype(np.float32):
+            started = time.perf_counter()
+            collection.query(query_embeddings=[query_vector], n_results=candidates,
+                             include=["documents", "metadatas", "distances"])
+            vector_latency.append(time.perf_counter() - started)
+        row["chroma_p50_ms"], row["chroma_p99_ms"] = percentiles(vector_latency)
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--candidates", type=int, default=20)
+    parser.add_argument("--with-chroma", action="store_true")
+    args = parser.parse_args()
+
+    rows = [bench_size(size, args.queries, args.with_chroma, args.candidates) for size in args.sizes]
+    columns = list(rows[0])
+    print(" | ".join(f"{column:>13}" for column in columns))
+    for row in rows:
+        print(" | ".join(f"{row.get(column, ''):>13}" for column in columns))
+
+
+if __name__ == "__main__":
+    main()
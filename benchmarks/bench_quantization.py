@@ -0,0 +1,100 @@
+"""
+Quantized vector snapshots against the float32 baseline: recall@k of the exact float32 top k,
+bytes the search scans (what has to stay in the page cache), bytes on disk and query latency,
+with and without the full-precision rescore of the quantized candidates.
+
+Vectors are random unit vectors with a little cluster structure, close enough to normalized
+sentence embeddings for the recall of scalar quantization to be representative.
+
+    python benchmarks/bench_quantization.py --vectors 200000 --dim 384 --k 10
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from vector_snapshot import SnapshotWriter, VectorSnapshot, directory_size  # noqa: E402
+
+
+def make_vectors(size, dim, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(size // 1000, 1), dim)).astype(np.float32)
+    vectors = centers[rng.integers(len(centers), size=size)] + rng.standard_normal((size, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def build_snapshot(root, vectors, quantization):
+    # One root per mode: publishing prunes older versions under the same root
+    root = os.path.join(root, quantization)
+    writer = SnapshotWriter(root, count=len(vectors), dim=vectors.shape[1], version=quantization,
+                            quantization=quantization, keep_float32=True)
+    for start in range(0, len(vectors), 10000):
+        rows = range(start, min(start + 10000, len(vectors)))
+        writer.add([f"chunk-{i}" for i in rows], vectors[start:start + len(rows)], [""] * len(rows), [{}] * len(rows))
+    writer.publish()
+    return os.path.join(root, quantization)
+
+
+def scanned_bytes(snapshot):
+    """Arrays a search reads in full; the float32 rows touched by a rescore are not counted."""
+    if snapshot.quantization == "none":
+        arrays = (snapshot.vectors, snapshot.sq_norms)
+    else:
+        arrays = (snapshot.codes, snapshot.code_sq_norms, snapshot.scales)
+    return sum(array.nbytes for array in arrays if array is not None)
+
+
+def bench(path, rescore, queries, k, truth):
+    snapshot = VectorSnapshot(path, rescore=rescore)
+    snapshot.search(queries[:1], k)  # fault the pages in before timing
+    latencies, found = [], []
+    for query in queries:
+        started = time.perf_counter()
+        rows, _ = snapshot.search(query[None, :], k)
+        latencies.append(time.perf_counter() - started)
+        found.append(rows[0])
+    latencies = np.array(latencies) * 1000
+    # Without a rescore the float32 files are not needed (VECTOR_SNAPSHOT_KEEP_FLOAT32=false)
+    disk = directory_size(path) - (os.path.getsize(os.path.join(path, "vectors.npy"))
+                                   + os.path.getsize(os.path.join(path, "sq_norms.npy"))
+                                   if snapshot.quantization != "none" and not rescore else 0)
+    return {
+        "mode": snapshot.quantization if snapshot.quantization != "none" else "float32",
+        "rescore": rescore if snapshot.quantization != "none" else "-",
+        f"recall@{k}": round(float(np.mean([len(set(t) & set(f)) / k for t, f in zip(truth, found)])), 4),
+        "scanned_mb": round(scanned_bytes(snapshot) / 2 ** 20, 1),
+        "disk_mb": round(disk / 2 ** 20, 1),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=200000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--rescore", type=int, nargs="+", default=[0, 4])
+    args = parser.parse_args()
+
+    vectors = make_vectors(args.vectors, args.dim)
+    queries = make_vectors(args.queries, args.dim, seed=1)
+    with tempfile.TemporaryDirectory() as root:
+        paths = {quantization: build_snapshot(root, vectors, quantization) for quantization in ("none", "fp16", "int8")}
+        truth, _ = VectorSnapshot(paths["none"]).search(queries, args.k)
+        rows = [bench(paths["none"], 0, queries, args.k, truth)]
+        rows += [bench(paths[quantization], rescore, queries, args.k, truth)
+                 for quantization in ("fp16", "int8") for rescore in args.rescore]
+    columns = list(rows[0])
+    print(" | ".join(f"{column:>11}" for column in columns))
+    for row in rows:
+        print(" | ".join(f"{row[column]:>11}" for column in columns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Vector search served by several worker processes from one snapshot: per-worker memory and
+query latency against worker count, with the snapshot memory-mapped (shared page cache) or
+loaded into each worker's own memory as a baseline.
+
+Memory is read from /proc/self/smaps_rollup after the snapshot is opened and queried: `private`
+is what the worker alone holds, `pss` splits shared pages between the workers mapping them.
+The query embedding model, which every API worker also loads, is not part of this benchmark.
+
+    python benchmarks/bench_workers.py --vectors 200000 --workers 1 2 4 8
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from vector_snapshot import SnapshotWriter, VectorSnapshot  # noqa: E402
+
+
+def build_snapshot(root, size, dim, seed=0):
+    rng = np.random.default_rng(seed)
+    writer = SnapshotWriter(root, count=size, dim=dim, version="bench")
+    for start in range(0, size, 10000):
+        rows = range(start, min(start + 10000, size))
+        vectors = rng.standard_normal((len(rows), dim)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        writer.add([f"chunk-{i}" for i in rows], vectors, [f"document {i} " * 20 for i in rows],
+                   [{"source": f"raw/{i % 1000}.txt", "price": float(i % 50)} for i in rows])
+    writer.publish()
+
+
+def memory_kb():
+    fields = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    return {"rss": fields["Rss"], "pss": fields["Pss"],
+            "private": fields["Private_Clean"] + fields["Private_Dirty"]}
+
+
+def worker(root, mmap, queries, n_results, barrier, results):
+    before = memory_kb()
+    snapshot = VectorSnapshot.open_current(root, mmap=mmap)
+    rng = np.random.default_rng(os.getpid())
+    vectors = rng.standard_normal((queries, snapshot.vectors.shape[1])).astype(np.float32)
+    snapshot.query(vectors[:1], n_results)  # fault the pages in before timing
+    barrier.wait()
+    latencies = []
+    for vector in vectors:
+        started = time.perf_counter()
+        snapshot.query(vector[None, :], n_results)
+        latencies.append(time.perf_counter() - started)
+    after = memory_kb()
+    results.put((latencies, {key: after[key] - before[key] for key in after}))
+
+
+def bench(root, workers, mmap, queries, n_results):
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(workers)
+    results = context.Queue()
+    processes = [context.Process(target=worker, args=(root, mmap, queries, n_results, barrier, results))
+                 for _ in range(workers)]
+    started = time.perf_counter()
+    for process in processes:
+        process.start()
+    collected = [results.get() for _ in processes]
+    elapsed = time.perf_counter() - started
+    for process in processes:
+        process.join()
+
+    latencies = np.concatenate([latency for latency, _ in collected]) * 1000
+    memory = [mem for _, mem in collected]
+    return {
+        "workers": workers,
+        "mode": "mmap" if mmap else "copy",
+        "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 2),
+        "qps": round(len(latencies) / elapsed, 1),
+        "private_mb_per_worker": round(np.mean([mem["private"] for mem in memory]) / 1024, 1),
+        "pss_mb_total": round(sum(mem["pss"] for mem in memory) / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=200000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--n-results", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        build_snapshot(root, args.vectors, args.dim)
+        rows = [bench(root, workers, mmap, args.queries, args.n_results)
+                for mmap in (True, False) for workers in args.workers]
+    columns = list(rows[0])
+    print(" | ".join(f"{column:>21}" for column in columns))
+    for row in rows:
+        print(" | ".join(f"{row[column]:>21}" for column in columns))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,75 +1,730 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
+from typing import Optional, Protocol
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+import asyncio
+import contextvars
+import json
+import os
+import sys
+import time
 import chromadb
+import numpy as np
 from langchain_ollama import OllamaLLM
 import logging
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+from answer_cache import AnswerCache, ANSWER_CACHE_ENABLED, ANSWER_CACHE_SEMANTIC
+from micro_batcher import MicroBatcher, RETRIEVAL_BATCHING
+from embedding import QueryEmbedder, check_embedding_model, EMBEDDING_MODEL
+from keyword_index import load_keyword_index, reciprocal_rank_fusion, HYBRID_SEARCH, HYBRID_CANDIDATES
+from structured_query import (BookCatalog, QueryFilters, build_where, matches_filters, parse_tabular_question,
+                              STRUCTURED_ANSWERS)
+from reranker import Reranker, RERANK_ENABLED, RERANK_MODEL, RERANK_CANDIDATES, RERANK_TOP_N
+from context_assembler import ContextAssembler
+from vector_snapshot import VectorSnapshot, ExactIndex, current_version
+from gold_release import published_layout, release_version
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, generate_latest, CONTENT_TYPE_LATEST
+from metrics import StageTimer, current_timer, timed_stage
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="RAG API", description="Ask questions and get answers using RAG!", version="1.0")
+CHROMA_PATH = os.getenv("CHROMA_DIR", "./data/gold/chroma")
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "phi3")
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL")  # default: the Ollama client's own (OLLAMA_HOST or localhost:11434)
+RETRIEVAL_WORKERS = int(os.getenv("RETRIEVAL_WORKERS", "4"))
+RETRIEVAL_TIMEOUT = float(os.getenv("RETRIEVAL_TIMEOUT", "10"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "120"))
+DISCONNECT_POLL_INTERVAL = 0.25
+CONTEXT_DOCUMENTS = 3  # documents put in the prompt when there is no reranker
+# "chroma"; "snapshot": the gold stage's memory-mapped export, shared by every worker process;
+# "numpy": the same export held in memory and searched exactly, for small and medium corpora
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma")
+# Seconds between checks for a newly published gold release; requests also trigger a check
+GOLD_POLL_INTERVAL = float(os.getenv("GOLD_POLL_INTERVAL", "5"))
+
+# Set up in the app lifespan; tests may assign their own before startup
+collection = None
+llm = None
+embedder = None
+keyword_index = None
+book_catalog = None
+reranker = None
+answer_cache = None
+retrieval_executor = None
+retrieval_batcher = None
+gold_layout = None  # the gold build being served
+served_gold_version = None
+_rejected_gold_version = None
+_gold_reload = None
+context_assembler = ContextAssembler()
+
+# Prometheus metrics, served at /metrics
+metrics_registry = CollectorRegistry()
+# Sub-10ms lookups up to multi-minute CPU generation
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+STAGE_SECONDS = Histogram(
+    "rag_stage_duration_seconds", "Time spent in each stage of a query (embed, retrieve, rerank, "
+    "prompt_build, generate, ttft)", ["stage"], buckets=LATENCY_BUCKETS, registry=metrics_registry)
+REQUEST_SECONDS = Histogram(
+    "rag_request_duration_seconds", "End-to-end query latency", ["endpoint"], buckets=LATENCY_BUCKETS,
+    registry=metrics_registry)
+REQUESTS_IN_FLIGHT = Gauge(
+    "rag_requests_in_flight", "Queries currently being served", ["endpoint"], registry=metrics_registry)
+REQUESTS_TOTAL = Counter(
+    "rag_requests_total", "Queries served, by outcome", ["endpoint", "outcome"], registry=metrics_registry)
+CACHE_LOOKUPS = Counter(
+    "rag_answer_cache_lookups_total", "Answer cache lookups, by result", ["result"], registry=metrics_registry)
+GOLD_RELOADS = Counter(
+    "rag_gold_reloads_total", "Switches to a newly published gold release, by result", ["result"],
+    registry=metrics_registry)
+ERROR_OUTCOMES = {499: "disconnected", 504: "timeout"}
+
+
+class ClientDisconnected(Exception):
+    pass
+
+
+def init_backends():
+    global collection, llm, embedder, keyword_index, book_catalog, reranker, answer_cache
+    global gold_layout, served_gold_version
+    try:
+        gold_layout = published_layout(CHROMA_PATH)
+        served_gold_version = release_version(gold_layout)
+        if embedder is None:
+            embedder = QueryEmbedder(EMBEDDING_MODEL)
+        # Vectors from a different model would silently return nonsense; refuse to start instead
+        check_embedding_model(embedder.model_name, gold_layout.lineage)
+        logger.info(f"🔢 Loading query embedding model {embedder.model_name}...")
+        logger.info(f"🔥 Embedding model warm in {embedder.warm_up():.2f}s")
+        if collection is None:
+            collection = open_vector_store(gold_layout)
+        if keyword_index is None and HYBRID_SEARCH:
+            keyword_index = load_keyword_index(gold_layout.keyword_index)
+            if keyword_index is None:
+                logger.warning(f"⚠️ No keyword index at {gold_layout.keyword_index}; using vector search only")
+        if book_catalog is None and STRUCTURED_ANSWERS:
+            book_catalog = BookCatalog.load(gold_layout.catalog)
+            if book_catalog is None:
+                logger.warning(f"⚠️ No book catalog at {gold_layout.catalog}; structured answers disabled")
+        if reranker is None and RERANK_ENABLED:
+            reranker = Reranker(RERANK_MODEL)
+            logger.info(f"🔀 Loading cross-encoder {reranker.model_name}...")
+            logger.info(f"🔥 Cross-encoder warm in {reranker.warm_up():.2f}s")
+        if llm is None:
+            logger.info("🧠 Loading local language model...")
+            llm = OllamaLLM(model=OLLAMA_MODEL, base_url=OLLAMA_BASE_URL)
+        if answer_cache is None and ANSWER_CACHE_ENABLED:
+            answer_cache = AnswerCache(embed_fn=embed_query if ANSWER_CACHE_SEMANTIC else None)
+    except Exception as e:
+        logger.error("❌ Failed to initialize models/vector store", exc_info=True)
+        raise RuntimeError("Initialization failed. Check logs.") from e
+
+
+class VectorStore(Protocol):
+    """
+    What retrieval needs from a vector backend: the subset of Chroma's collection API below,
+    with Chroma-shaped results (one list per query embedding).
+    """
 
-CHROMA_PATH = "./data/gold/chroma"
+    def query(self, query_embeddings, n_results: int, include, where: Optional[dict] = None) -> dict: ...
 
-# Initialize persistent chromadb client and collection
-try:
+    def get(self, ids, include) -> dict: ...
+
+
+def open_chroma(layout) -> VectorStore:
     logger.info("📦 Connecting to Chroma vector DB...")
-    client = chromadb.PersistentClient(path=CHROMA_PATH)
-    collection = client.get_collection(name="rag_docs")
-    # collection = chroma_client.get_or_create_collection(name="rag_docs")
-    logger.info("🧠 Loading local language model...")
-    llm = OllamaLLM(model="phi3")
-except Exception as e:
-    logger.error("❌ Failed to initialize models/vector store", exc_info=True)
-    raise RuntimeError("Initialization failed. Check logs.") from e
+    client = chromadb.PersistentClient(path=layout.chroma)
+    return client.get_collection(name="rag_docs")
+
+
+def open_snapshot(layout, kind=VectorSnapshot) -> VectorStore:
+    snapshot = kind.open_current(layout.vector_snapshot)
+    if snapshot is None:
+        raise RuntimeError(f"No vector snapshot published at {layout.vector_snapshot}")
+    logger.info(f"🗺️ Opened vector snapshot {snapshot.version} as {kind.__name__} ({snapshot.count()} vectors)")
+    return snapshot
+
+
+VECTOR_BACKENDS = {
+    "chroma": open_chroma,
+    "snapshot": open_snapshot,
+    "numpy": partial(open_snapshot, kind=ExactIndex),
+}
+
+
+def open_vector_store(layout) -> VectorStore:
+    """
+    Open the gold build's vectors with the VECTOR_BACKEND from the `VECTOR_BACKENDS` registry.
+    """
+    if VECTOR_BACKEND not in VECTOR_BACKENDS:
+        raise ValueError(f"Unknown VECTOR_BACKEND '{VECTOR_BACKEND}'. Available: {sorted(VECTOR_BACKENDS)}")
+    return VECTOR_BACKENDS[VECTOR_BACKEND](layout)
+
+
+def embed_query(text: str):
+    with timed_stage("embed"):
+        return embedder.encode([text])[0]
+
+
+def search_batch(requests: list) -> list:
+    """
+    One embedding pass and one multi-query Chroma search for a batch of `(query, n_results, vector, filters)`,
+    split back into single-query results. Queries that already carry a vector are not re-embedded;
+    queries with different metadata filters share the embedding pass but not the Chroma call.
+    """
+    missing = [i for i, (_, _, vector, _) in enumerate(requests) if vector is None]
+    vectors = [vector for _, _, vector, _ in requests]
+    embed_seconds = 0.0
+    if missing:
+        started = time.perf_counter()
+        for i, vector in zip(missing, embedder.encode([requests[i][0] for i in missing])):
+            vectors[i] = vector
+        embed_seconds = time.perf_counter() - started
+
+    groups = {}
+    for i, (_, _, _, filters) in enumerate(requests):
+        groups.setdefault(filters, []).append(i)
+    merged = [None] * len(requests)
+    for filters, indices in groups.items():
+        results = search_group([requests[i] for i in indices], [vectors[i] for i in indices], filters)
+        for i, result in zip(indices, results):
+            merged[i] = result
+    for i in missing:
+        merged[i]["embed_seconds"] = embed_seconds  # shared batch embedding, reported to each caller
+    return merged
+
+
+def search_group(requests: list, vectors: list, filters) -> list:
+    index = keyword_index
+    n_results = max(n for _, n, _, _ in requests)
+    if index is not None:
+        n_results = max(n_results, HYBRID_CANDIDATES)  # over-fetch so fusion has candidates to rerank
+    where = build_where(filters)
+    # Chroma applies the metadata filter before the nearest-neighbour search, so all n results match it
+    results = collection.query(query_embeddings=[np.asarray(vector, dtype=np.float32) for vector in vectors],
+                               n_results=n_results, include=["documents", "metadatas", "distances"],
+                               **({"where": where} if where else {}))
+    if index is None:
+        return [
+            {key: [results[key][i][:n]] for key in ("documents", "metadatas", "distances")}
+            for i, (_, n, _, _) in enumerate(requests)
+        ]
+    return fuse_keyword_results(index, requests, results, filters)
+
+
+def fuse_keyword_results(index, requests: list, results: dict, filters=None) -> list:
+    """
+    Reciprocal-rank fusion of the vector candidates with BM25 candidates for each query.
+    Keyword-only hits are fetched from Chroma in one `get` for the whole batch; their distance is None.
+    BM25 knows nothing of metadata, so with filters every keyword hit is fetched and checked before truncating.
+    """
+    filtered = filters is not None and not filters.is_empty()
+    known = {}
+    fused_ids = []
+    for i, (query, n, _, _) in enumerate(requests):
+        for doc_id, doc, meta, distance in zip(results["ids"][i], results["documents"][i],
+                                               results["metadatas"][i], results["distances"][i]):
+            known[doc_id] = (doc, meta, distance)
+        keyword_ids = [doc_id for doc_id, _ in index.search(query, HYBRID_CANDIDATES)]
+        fused = reciprocal_rank_fusion([results["ids"][i], keyword_ids])
+        fused_ids.append([doc_id for doc_id, _ in (fused if filtered else fused[:n])])
+
+    missing = sorted({doc_id for ids in fused_ids for doc_id in ids if doc_id not in known})
+    if missing:
+        fetched = collection.get(ids=missing, include=["documents", "metadatas"])
+        for doc_id, doc, meta in zip(fetched["ids"], fetched["documents"], fetched["metadatas"]):
+            known[doc_id] = (doc, meta, None)
+
+    merged = []
+    for ids, (_, n, _, _) in zip(fused_ids, requests):
+        # ids deleted since indexing drop out
+        rows = [known[doc_id] for doc_id in ids if doc_id in known and matches_filters(known[doc_id][1], filters)][:n]
+        merged.append({
+            "documents": [[doc for doc, _, _ in rows]],
+            "metadatas": [[meta for _, meta, _ in rows]],
+            "distances": [[distance for _, _, distance in rows]],
+        })
+    return merged
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global retrieval_executor, retrieval_batcher, _gold_reload
+    init_backends()
+    # Chroma's client is blocking; a bounded pool keeps it off the event loop
+    retrieval_executor = ThreadPoolExecutor(max_workers=RETRIEVAL_WORKERS, thread_name_prefix="retrieval")
+    if RETRIEVAL_BATCHING:
+        retrieval_batcher = MicroBatcher(search_batch, executor=retrieval_executor)
+    watcher = asyncio.ensure_future(watch_gold_releases())
+    try:
+        yield
+    finally:
+        watcher.cancel()
+        if _gold_reload is not None:
+            _gold_reload.cancel()
+            _gold_reload = None
+        retrieval_executor.shutdown(wait=False, cancel_futures=True)
+        retrieval_executor = None
+        retrieval_batcher = None
+
+
+app = FastAPI(title="RAG API", description="Ask questions and get answers using RAG!", version="1.0", lifespan=lifespan)
+
+
+class Filters(BaseModel):
+    price_min: Optional[float] = None
+    price_max: Optional[float] = None
+    in_stock: Optional[bool] = None
+
 
 class Question(BaseModel):
     query: str
+    filters: Optional[Filters] = None
+    debug: bool = False  # include per-stage timings in the response
 
-@app.get("/")
-def read_root():
-    return {"message": "👋 Welcome! Your RAG API is up and running."}
+    def query_filters(self) -> Optional[QueryFilters]:
+        if self.filters is None:
+            return None
+        filters = QueryFilters(self.filters.price_min, self.filters.price_max, self.filters.in_stock)
+        return None if filters.is_empty() else filters
 
-@app.post("/query/")
-def ask_question(question: Question):
-    logger.info(f"Received query: {question.query}")
 
-    try:
-        # Query the vector store for top 3 docs
-        results = collection.query(
-            query_texts=[question.query],
-            n_results=3,
-            include=["documents", "metadatas", "distances"]
-        )
-        docs = results["documents"][0]
-        if not docs:
-            return {"question": question.query, "answer": "No relevant documents found.", "context": ""}
+def assemble_context(results: dict) -> str:
+    """
+    Deduplicated, merged and budget-trimmed prompt context from retrieval results.
+    """
+    metadatas = results["metadatas"][0] if results.get("metadatas") else None
+    context, stats = context_assembler.assemble(results["documents"][0], metadatas)
+    logger.info(f"🧩 Context: {stats}")
+    return context
+
 
-        # Prepare context by joining docs
-        context = "\n\n".join(docs)
+def log_prompt_size(prompt: str) -> None:
+    # phi3 on CPU slows down almost linearly with prompt length
+    logger.info(f"📝 Prompt tokens: {context_assembler.token_counter(prompt)}")
 
-        prompt = f"""Answer the following question using the context below:
+
+def build_prompt(context: str, query: str) -> str:
+    return f"""Answer the following question using the context below:
 
 Context:
 {context}
 
 Question:
-{question.query}
+{query}
 
 Answer:"""
 
-        # Generate answer using the LLM
-        response = llm.invoke(prompt)
+
+def load_gold(layout) -> dict:
+    """
+    Open and warm everything served from one gold build, off the event loop. The vector store is
+    only reopened when the build replaced it (a new release, or a new snapshot of a legacy build).
+    """
+    check_embedding_model(embedder.model_name, layout.lineage)
+    loaded = {}
+    replaced = layout.chroma != gold_layout.chroma
+    if replaced or (isinstance(collection, VectorSnapshot) and current_version(layout.vector_snapshot) != collection.version):
+        store = open_vector_store(layout)
+        # Pay for first-query setup (file reads, page faults) here rather than on a user's request
+        store.query(query_embeddings=[embed_query("warm up")], n_results=1, include=["distances"])
+        loaded["collection"] = store
+    if HYBRID_SEARCH:
+        loaded["keyword_index"] = load_keyword_index(layout.keyword_index)
+    if STRUCTURED_ANSWERS:
+        loaded["book_catalog"] = BookCatalog.load(layout.catalog)
+    return loaded
+
+
+async def reload_gold(layout, version) -> None:
+    global collection, keyword_index, book_catalog, gold_layout, served_gold_version, _rejected_gold_version
+    loop = asyncio.get_running_loop()
+    try:
+        loaded = await loop.run_in_executor(None, load_gold, layout)
+    except Exception as e:
+        # Keep serving the current build; this release is not retried until another one is published
+        _rejected_gold_version = version
+        GOLD_RELOADS.labels(result="rejected").inc()
+        logger.error(f"❌ Not switching to gold release {version}: {e}")
+        return
+    # No await from here on, so every request sees either the old build or the new one, never a mix.
+    # In-flight searches keep the store they started with; it is closed once they drop it
+    collection = loaded.get("collection", collection)
+    keyword_index = loaded.get("keyword_index", keyword_index)
+    book_catalog = loaded.get("book_catalog", book_catalog)
+    gold_layout, served_gold_version = layout, version
+    GOLD_RELOADS.labels(result="ok").inc()
+    logger.info(f"🔁 Switched to gold release {version}")
+
+
+def check_gold_release() -> None:
+    """
+    Start a background switch when the gold stage has published a new release. Reads one small
+    file and never blocks: requests keep using the current build until the new one is warm.
+    A failed check is logged and retried on the next poll or request.
+    """
+    global _gold_reload
+    if _gold_reload is not None and not _gold_reload.done():
+        return
+    try:
+        layout = published_layout(CHROMA_PATH)
+        version = release_version(layout)
+    except Exception:
+        # e.g. a transient OSError reading releases/CURRENT; the loaded build keeps serving
+        logger.error("Error checking for a new gold release", exc_info=True)
+        return
+    if version not in (served_gold_version, _rejected_gold_version):
+        _gold_reload = asyncio.ensure_future(reload_gold(layout, version))
+
+
+async def watch_gold_releases():
+    while True:
+        await asyncio.sleep(GOLD_POLL_INTERVAL)
+        check_gold_release()
+
+
+def structured_answer(query: str, filters: Optional[QueryFilters]):
+    """
+    `(answer, rows)` straight from the book catalog when the question is purely tabular
+    ("cheapest book", "how many books under £20"), otherwise None. No retrieval, no LLM.
+    """
+    if not STRUCTURED_ANSWERS:
+        return None
+    tabular = parse_tabular_question(query)
+    if book_catalog is None or tabular is None:
+        return None
+    if filters is not None:
+        # Filters stated in the question win over the request's own
+        tabular = tabular._replace(filters=QueryFilters(*(
+            asked if asked is not None else given for asked, given in zip(tabular.filters, filters)
+        )))
+    return book_catalog.answer(tabular)
+
+
+async def retrieve(query: str, n_results: int = 3, query_vector=None, filters: Optional[QueryFilters] = None) -> dict:
+    request = (query, n_results, query_vector, filters)
+    started = time.perf_counter()
+    if retrieval_batcher is not None:
+        results = await asyncio.wait_for(retrieval_batcher.submit(request), RETRIEVAL_TIMEOUT)
+    else:
+        loop = asyncio.get_running_loop()
+        search = partial(search_batch, [request])
+        results = (await asyncio.wait_for(loop.run_in_executor(retrieval_executor, search), RETRIEVAL_TIMEOUT))[0]
+    timer = current_timer.get()
+    if timer is not None:
+        embed_seconds = results.pop("embed_seconds", 0.0)
+        timer.add("embed", embed_seconds)
+        timer.add("retrieve", time.perf_counter() - started - embed_seconds)
+    return results
+
+
+async def retrieve_context(query: str, query_vector=None, filters: Optional[QueryFilters] = None) -> dict:
+    """
+    Documents for the prompt: the top CONTEXT_DOCUMENTS from retrieval or, with a reranker,
+    the best RERANK_TOP_N of RERANK_CANDIDATES by cross-encoder score.
+    """
+    if reranker is None:
+        return await retrieve(query, n_results=CONTEXT_DOCUMENTS, query_vector=query_vector, filters=filters)
+
+    results = await retrieve(query, n_results=RERANK_CANDIDATES, query_vector=query_vector, filters=filters)
+    loop = asyncio.get_running_loop()
+    # Cross-encoder inference is blocking CPU work
+    with timed_stage("rerank"):
+        reranked = await loop.run_in_executor(retrieval_executor, reranker.rerank, query, results["documents"][0],
+                                              RERANK_TOP_N)
+    if reranked.skipped:
+        logger.warning(f"⏱️ Rerank budget exhausted, kept retrieval order ({reranked.elapsed_ms}ms)")
+    else:
+        logger.info(f"🔀 Reranked {reranked.scored}/{len(results['documents'][0])} candidates in {reranked.elapsed_ms}ms")
+    return {key: [[results[key][0][i] for i in reranked.order]] for key in ("documents", "metadatas", "distances")}
+
+
+async def run_cancellable(request: Request, coro, timeout: float):
+    """
+    Await `coro` with a deadline, cancelling it as soon as the client goes away
+    (cancelling an Ollama call closes its stream, which stops generation server-side).
+    """
+    loop = asyncio.get_running_loop()
+    task = asyncio.ensure_future(coro)
+    deadline = loop.time() + timeout
+    try:
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise asyncio.TimeoutError()
+            done, _ = await asyncio.wait({task}, timeout=min(DISCONNECT_POLL_INTERVAL, remaining))
+            if task in done:
+                return task.result()
+            if await request.is_disconnected():
+                raise ClientDisconnected()
+    finally:
+        if not task.done():
+            task.cancel()
+
+
+def sources_from(results: dict) -> list:
+    docs = results["documents"][0]
+    metadatas = results["metadatas"][0] if results.get("metadatas") else [{}] * len(docs)
+    distances = results["distances"][0] if results.get("distances") else [None] * len(docs)
+    return [
+        {"source": (meta or {}).get("source"), "distance": distance, "document": doc}
+        for doc, meta, distance in zip(docs, metadatas, distances)
+    ]
+
+
+async def cache_lookup(query: str, filters: Optional[QueryFilters] = None):
+    """
+    Returns `(hit, query_vector, version)`; pass the vector and version back to `cache_store`.
+    Filtered queries bypass the cache, since the cache key is the question text alone.
+    """
+    if answer_cache is None or filters is not None:
+        return None, None, None
+    version = served_gold_version
+    answer_cache.sync_version(version)
+    loop = asyncio.get_running_loop()
+    # A semantic lookup embeds the question, which is blocking work; the copied context lets
+    # that embedding be timed against this request
+    lookup = contextvars.copy_context().run
+    hit, vector = await loop.run_in_executor(retrieval_executor, lookup, answer_cache.lookup, query)
+    CACHE_LOOKUPS.labels(result=hit.kind if hit is not None else "miss").inc()
+    return hit, vector, version
+
+
+def cache_store(query: str, payload: dict, vector, version, filters: Optional[QueryFilters] = None) -> None:
+    # An answer built from an index that was replaced mid-request is not worth keeping
+    if answer_cache is not None and filters is None and served_gold_version == version:
+        answer_cache.put(query, payload, vector)
+
+
+def finish_request(endpoint: str, timer: StageTimer, outcome: str) -> None:
+    REQUESTS_IN_FLIGHT.labels(endpoint=endpoint).dec()
+    REQUESTS_TOTAL.labels(endpoint=endpoint, outcome=outcome).inc()
+    REQUEST_SECONDS.labels(endpoint=endpoint).observe(timer.elapsed())
+    for stage, seconds in timer.stages.items():
+        STAGE_SECONDS.labels(stage=stage).observe(seconds)
+    logger.info(f"⏱️ {endpoint} {outcome}: {timer.as_ms()}")
+
+
+def response_outcome(response: dict) -> str:
+    if "structured" in response:
+        return "structured"
+    return "cached" if response.get("cached") else "ok"
+
+
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def stream_tokens(prompt: str, timeout: float):
+    """
+    Yield generated text fragments from the Ollama stream, giving up once `timeout` seconds have passed.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    stream = llm.astream(prompt).__aiter__()
+    try:
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise asyncio.TimeoutError()
+            try:
+                token = await asyncio.wait_for(stream.__anext__(), remaining)
+            except StopAsyncIteration:
+                return
+            yield token
+    finally:
+        await stream.aclose()
+
+
+@app.get("/")
+def read_root():
+    return {"message": "👋 Welcome! Your RAG API is up and running."}
+
+@app.get("/cache/stats")
+def cache_stats():
+    if answer_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, "semantic": answer_cache.semantic, **answer_cache.stats()}
+
+@app.get("/rerank/stats")
+def rerank_stats():
+    if reranker is None:
+        return {"enabled": False}
+    return {"enabled": True, **reranker.stats()}
+
+@app.get("/metrics")
+def metrics():
+    return Response(content=generate_latest(metrics_registry), media_type=CONTENT_TYPE_LATEST)
+
+@app.post("/query/")
+async def ask_question(question: Question, request: Request):
+    timer = StageTimer()
+    current_timer.set(timer)
+    REQUESTS_IN_FLIGHT.labels(endpoint="query").inc()
+    outcome = "error"
+    try:
+        response = await answer_question(question, request, timer)
+        if isinstance(response, JSONResponse):
+            outcome = ERROR_OUTCOMES.get(response.status_code, "error")
+            return response
+        outcome = response_outcome(response)
+        if question.debug:
+            response["debug"] = {"timings_ms": timer.as_ms()}
+        return response
+    except HTTPException as e:
+        outcome = ERROR_OUTCOMES.get(e.status_code, "error")
+        raise
+    finally:
+        finish_request("query", timer, outcome)
+
+async def answer_question(question: Question, request: Request, timer: StageTimer):
+    logger.info(f"Received query: {question.query}")
+    check_gold_release()
+    filters = question.query_filters()
+
+    try:
+        structured = structured_answer(question.query, filters)
+        if structured is not None:
+            answer, rows = structured
+            logger.info("📊 Answered from the book catalog")
+            return {"question": question.query, "answer": answer, "context": "", "cached": None, "structured": rows}
+
+        hit, query_vector, version = await cache_lookup(question.query, filters)
+        if hit is not None:
+            logger.info(f"💾 Answer cache {hit.kind} hit (similarity {hit.similarity:.3f})")
+            return {"question": question.query, "answer": hit.payload["answer"],
+                    "context": hit.payload["context"], "cached": hit.kind}
+
+        # Query the vector store (and reranker) for the top docs without blocking the event loop
+        results = await retrieve_context(question.query, query_vector=query_vector, filters=filters)
+        if not results["documents"][0]:
+            return {"question": question.query, "answer": "No relevant documents found.", "context": "", "cached": None}
+
+        with timer.stage("prompt_build"):
+            context = assemble_context(results)
+            prompt = build_prompt(context, question.query)
+        log_prompt_size(prompt)
+
+        # Generate answer using the async Ollama client
+        with timer.stage("generate"):
+            response = await run_cancellable(request, llm.ainvoke(prompt), LLM_TIMEOUT)
 
         logger.info("LLM response generated")
+        answer = response.strip()
+        cache_store(question.query, {"answer": answer, "context": context, "sources": sources_from(results)},
+                    query_vector, version, filters)
         return {
             "question": question.query,
-            "answer": response.strip(),
-            "context": context
+            "answer": answer,
+            "context": context,
+            "cached": None
         }
 
+    except asyncio.TimeoutError:
+        logger.warning(f"⏱️ Query timed out: {question.query}")
+        raise HTTPException(status_code=504, detail="Query timed out")
+    except ClientDisconnected:
+        logger.info(f"🔌 Client disconnected, generation cancelled: {question.query}")
+        return JSONResponse(status_code=499, content={"detail": "Client closed request"})
     except Exception as e:
         logger.error("Error processing query", exc_info=True)
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
+@app.post("/query/stream")
+async def ask_question_stream(question: Question):
+    """
+    Server-sent events: one `sources` event with the retrieved documents, `token` events as the
+    answer is generated, then `done` with time-to-first-token and total latency (or `error`).
+    """
+    logger.info(f"Received streaming query: {question.query}")
+    timer = StageTimer()
+    current_timer.set(timer)
+    REQUESTS_IN_FLIGHT.labels(endpoint="stream").inc()
+    check_gold_release()
+    filters = question.query_filters()
+    structured = hit = results = None
+    try:
+        structured = structured_answer(question.query, filters)
+        if structured is None:
+            hit, query_vector, version = await cache_lookup(question.query, filters)
+        if structured is None and hit is None:
+            results = await retrieve_context(question.query, query_vector=query_vector, filters=filters)
+    except asyncio.TimeoutError:
+        finish_request("stream", timer, "timeout")
+        raise HTTPException(status_code=504, detail="Query timed out")
+    except Exception:
+        logger.error("Error retrieving documents", exc_info=True)
+        finish_request("stream", timer, "error")
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+
+    def done_event(ttft_ms, cached) -> str:
+        done = {"ttft_ms": ttft_ms, "total_ms": round(timer.elapsed() * 1000, 1), "cached": cached}
+        if question.debug:
+            done["debug"] = {"timings_ms": timer.as_ms()}
+        return sse_event("done", done)
+
+    async def events():
+        # Until the last event is sent, an abandoned stream counts as a disconnect
+        outcome = "disconnected"
+        try:
+            if structured is not None:
+                answer, rows = structured
+                yield sse_event("sources", {"question": question.query, "sources": [], "structured": rows})
+                yield sse_event("token", {"text": answer})
+                outcome = "structured"
+                yield done_event(None, None)
+                return
+
+            if hit is not None:
+                sources, context = hit.payload["sources"], hit.payload["context"]
+            else:
+                sources = sources_from(results)
+                with timer.stage("prompt_build"):
+                    context = assemble_context(results)
+                    prompt = build_prompt(context, question.query)
+            yield sse_event("sources", {"question": question.query, "sources": sources})
+            if hit is not None or not context:
+                yield sse_event("token", {"text": hit.payload["answer"] if hit is not None else "No relevant documents found."})
+                outcome = "cached" if hit is not None else "ok"
+                yield done_event(None, hit.kind if hit is not None else None)
+                return
+
+            log_prompt_size(prompt)
+            first_token_at = None
+            tokens = []
+            try:
+                with timer.stage("generate"):
+                    async for token in stream_tokens(prompt, LLM_TIMEOUT):
+                        if first_token_at is None:
+                            first_token_at = time.perf_counter()
+                            timer.add("ttft", first_token_at - timer.started)
+                        tokens.append(token)
+                        yield sse_event("token", {"text": token})
+            except asyncio.TimeoutError:
+                logger.warning(f"⏱️ Streaming query timed out: {question.query}")
+                outcome = "timeout"
+                yield sse_event("error", {"detail": "Query timed out"})
+                return
+            except Exception:
+                logger.error("Error streaming answer", exc_info=True)
+                outcome = "error"
+                yield sse_event("error", {"detail": "Internal Server Error"})
+                return
+
+            ttft_ms = round((first_token_at - timer.started) * 1000, 1) if first_token_at else None
+            logger.info(f"LLM response streamed: ttft {ttft_ms}ms, total {round(timer.elapsed() * 1000, 1)}ms")
+            cache_store(question.query, {"answer": "".join(tokens).strip(), "context": context, "sources": sources},
+                        query_vector, version, filters)
+            outcome = "ok"
+            yield done_event(ttft_ms, None)
+        finally:
+            finish_request("stream", timer, outcome)
 
+    # A client disconnect cancels this generator, which closes the Ollama stream
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
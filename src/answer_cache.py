@@ -0,0 +1,177 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1024"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "3600"))  # seconds
+ANSWER_CACHE_SEMANTIC = os.getenv("ANSWER_CACHE_SEMANTIC", "true").lower() == "true"
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.95"))  # cosine similarity
+
+_PUNCTUATION = re.compile(r"[^\w\s£$€.]|(?<!\d)\.|\.(?!\d)")
+
+
+def normalize_query(query: str) -> str:
+    """
+    Exact-match key: case, punctuation (except decimal points and currency) and spacing are ignored.
+    """
+    return " ".join(_PUNCTUATION.sub(" ", query.lower()).split())
+
+
+class CacheHit(NamedTuple):
+    payload: Dict[str, Any]
+    kind: str  # "exact" or "semantic"
+    similarity: float
+
+
+class _Entry:
+    __slots__ = ("payload", "vector", "expires_at")
+
+    def __init__(self, payload: Dict[str, Any], vector: Optional[np.ndarray], expires_at: float):
+        self.payload = payload
+        self.vector = vector
+        self.expires_at = expires_at
+
+
+class AnswerCache:
+    """
+    Two-level in-memory answer cache: exact match on the normalized question, then nearest
+    cached question by embedding cosine similarity above `similarity_threshold`.
+
+    Entries expire after `ttl` seconds and the least recently used entry is dropped beyond
+    `max_entries`. `sync_version` clears everything when the gold index version changes.
+    """
+
+    def __init__(self, max_entries: int = ANSWER_CACHE_MAX_ENTRIES, ttl: float = ANSWER_CACHE_TTL,
+                 similarity_threshold: float = ANSWER_CACHE_SIMILARITY,
+                 embed_fn: Optional[Callable[[str], np.ndarray]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self.embed_fn = embed_fn
+        self.clock = clock
+        self.version = None
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._matrix: Optional[np.ndarray] = None  # stacked vectors for the semantic lookup
+        self._matrix_keys = []
+        self._lock = threading.Lock()
+
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def semantic(self) -> bool:
+        return self.embed_fn is not None
+
+    def sync_version(self, version) -> None:
+        """
+        Drop every entry when the underlying index was rebuilt since the last call.
+        """
+        with self._lock:
+            if version == self.version:
+                return
+            if self._entries:
+                self.invalidations += 1
+            self.version = version
+            self._entries.clear()
+            self._matrix = None
+
+    def lookup(self, query: str) -> Tuple[Optional[CacheHit], Optional[np.ndarray]]:
+        """
+        Return `(hit, query_vector)`. The raw query embedding is computed only on an exact miss and
+        can be reused for retrieval and handed back to `put`, so a question is embedded once per request.
+        """
+        key = normalize_query(query)
+        with self._lock:
+            self._expire()
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.exact_hits += 1
+                return CacheHit(entry.payload, "exact", 1.0), None
+
+        if not self.semantic:
+            with self._lock:
+                self.misses += 1
+            return None, None
+
+        vector = np.asarray(self.embed_fn(query), dtype=np.float32).ravel()
+        with self._lock:
+            hit = self._nearest(self._normalize(vector))
+            if hit is None:
+                self.misses += 1
+            else:
+                self.semantic_hits += 1
+            return hit, vector
+
+    def put(self, query: str, payload: Dict[str, Any], vector: Optional[np.ndarray] = None) -> None:
+        key = normalize_query(query)
+        if self.semantic and vector is None:
+            vector = self.embed_fn(query)
+        if vector is not None:
+            vector = self._normalize(vector)
+        with self._lock:
+            self._entries[key] = _Entry(payload, vector, self.clock() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            self._matrix = None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+
+    def stats(self) -> dict:
+        lookups = self.exact_hits + self.semantic_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.exact_hits + self.semantic_hits) / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+    def _expire(self) -> None:
+        now = self.clock()
+        expired = [key for key, entry in self._entries.items() if entry.expires_at <= now]
+        for key in expired:
+            del self._entries[key]
+        if expired:
+            self._matrix = None
+
+    def _nearest(self, vector: np.ndarray) -> Optional[CacheHit]:
+        self._expire()
+        if self._matrix is None:
+            self._matrix_keys = [key for key, entry in self._entries.items() if entry.vector is not None]
+            self._matrix = (np.vstack([self._entries[key].vector for key in self._matrix_keys])
+                            if self._matrix_keys else np.empty((0, vector.shape[0]), dtype=np.float32))
+        if not self._matrix_keys:
+            return None
+
+        similarities = self._matrix @ vector
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.similarity_threshold:
+            return None
+        key = self._matrix_keys[best]
+        self._entries.move_to_end(key)
+        return CacheHit(self._entries[key].payload, "semantic", float(similarities[best]))
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
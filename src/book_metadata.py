@@ -0,0 +1,66 @@
+import re
+from typing import Dict, Optional
+
+import pyarrow as pa
+
+
+# Typed columns carried from BRONZE through SILVER into Chroma metadata
+BOOK_SCHEMA = pa.schema([
+    ("title", pa.string()),
+    ("price", pa.float64()),
+    ("availability", pa.string()),
+    ("in_stock", pa.bool_()),
+    ("stock_count", pa.int64()),
+])
+BOOK_COLUMNS = BOOK_SCHEMA.names
+
+FIELD_PATTERN = re.compile(r"^(title|price|availability|link):\s*(.*)$", re.IGNORECASE)
+PRICE_PATTERN = re.compile(r"\d+(?:[.,]\d+)?")
+STOCK_PATTERN = re.compile(r"\((\d+)\s+available\)", re.IGNORECASE)
+
+
+def parse_price(text: str) -> Optional[float]:
+    match = PRICE_PATTERN.search(text or "")
+    return float(match.group().replace(",", ".")) if match else None
+
+
+def parse_book_fields(raw_text: str) -> Dict[str, object]:
+    """
+    Typed fields from the header lines the scraper writes ("Title: ...", "Price: £51.77",
+    "Availability: In stock (22 available)"). Missing or unparseable fields are None.
+    """
+    fields = {}
+    for line in raw_text.splitlines():
+        match = FIELD_PATTERN.match(line.strip())
+        if match and match.group(1).lower() not in fields:
+            fields[match.group(1).lower()] = match.group(2).strip()
+        elif not line.strip() and fields:
+            break  # the description starts after the first blank line
+
+    title = fields.get("title")
+    availability = fields.get("availability")
+    stock = STOCK_PATTERN.search(availability or "")
+    return {
+        "title": title if title and title != "Unknown Title" else None,
+        "price": parse_price(fields.get("price", "")),
+        "availability": availability if availability and availability != "N/A" else None,
+        "in_stock": availability.lower().startswith("in stock") if availability and availability != "N/A" else None,
+        "stock_count": int(stock.group(1)) if stock else None,
+    }
+
+
+def with_book_columns(table: pa.Table) -> pa.Table:
+    """
+    Add any missing book column as typed nulls (e.g. bronze written before these columns existed).
+    """
+    for field in BOOK_SCHEMA:
+        if field.name not in table.column_names:
+            table = table.append_column(field, pa.nulls(table.num_rows, field.type))
+    return table
+
+
+def chroma_metadata(row: Dict[str, object]) -> Dict[str, object]:
+    """
+    Book columns as Chroma metadata, which only accepts non-null str/int/float/bool values.
+    """
+    return {name: row[name] for name in BOOK_COLUMNS if row.get(name) is not None}
@@ -0,0 +1,165 @@
+import os
+import re
+from typing import Callable, Dict, Iterable, List, NamedTuple
+
+
+CHUNKER = os.getenv("CHUNKER", "sentence")  # "sentence" or "fixed"
+# all-MiniLM-L6-v2 truncates at 256 word pieces including [CLS]/[SEP]
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "254"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "32"))
+CHUNK_HISTOGRAM_BIN = 32
+
+SENTENCE_PATTERN = re.compile(r".+?(?:[.!?]+(?=\s|$)|(?=\n)|$)")
+WORD_PATTERN = re.compile(r"\S+")
+
+
+class Chunk(NamedTuple):
+    offset: int  # character offset of the chunk in the source text
+    text: str
+    tokens: int
+
+
+def approximate_token_count(text: str) -> int:
+    """
+    Word-piece estimate for when no tokenizer is available: ~1.3 tokens per word.
+    """
+    words = len(text.split())
+    return int(words * 1.3 + 0.999) if words else 0
+
+
+def load_token_counter(model_name: str) -> Callable[[str], int]:
+    """
+    Token counter backed by the embedding model's own tokenizer, falling back to an estimate.
+    """
+    try:
+        from transformers import AutoTokenizer
+
+        repo = model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+        tokenizer = AutoTokenizer.from_pretrained(repo)
+    except Exception as e:
+        print(f"⚠️ Tokenizer for {model_name} unavailable ({e}); using approximate token counts")
+        return approximate_token_count
+
+    return lambda text: len(tokenizer.encode(text, add_special_tokens=False))
+
+
+class FixedCharChunker:
+    """
+    Original behaviour: fixed-size character slices with no overlap.
+    """
+
+    name = "fixed"
+
+    def __init__(self, size: int = 512, token_counter: Callable[[str], int] = approximate_token_count):
+        self.size = size
+        self.token_counter = token_counter
+
+    def split(self, text: str) -> List[Chunk]:
+        return [
+            Chunk(offset, text[offset:offset + self.size], self.token_counter(text[offset:offset + self.size]))
+            for offset in range(0, len(text), self.size)
+        ]
+
+
+class SentenceChunker:
+    """
+    Packs whole sentences into chunks of at most `max_tokens`. Consecutive chunks share up to
+    `overlap_tokens` of trailing sentences. A sentence longer than the budget is split on word
+    boundaries, so no chunk is cut mid-word or silently truncated by the model.
+    """
+
+    name = "sentence"
+
+    def __init__(self, max_tokens: int = CHUNK_MAX_TOKENS, overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+                 token_counter: Callable[[str], int] = approximate_token_count):
+        if overlap_tokens >= max_tokens:
+            raise ValueError("overlap_tokens must be smaller than max_tokens")
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.token_counter = token_counter
+
+    def split(self, text: str) -> List[Chunk]:
+        units = self._units(text)
+        chunks = []
+        start = 0
+        while start < len(units):
+            end = start
+            tokens = 0
+            while end < len(units) and (end == start or tokens + units[end][2] <= self.max_tokens):
+                tokens += units[end][2]
+                end += 1
+
+            chunk_start, chunk_end = units[start][0], units[end - 1][1]
+            chunk_text = text[chunk_start:chunk_end]
+            chunks.append(Chunk(chunk_start, chunk_text, self.token_counter(chunk_text)))
+            if end == len(units):
+                break
+
+            # Step back over trailing units that fit in the overlap, always moving forward
+            # and leaving room for at least one new unit in the next chunk
+            next_start = end
+            overlap = 0
+            while (
+                next_start - 1 > start
+                and overlap + units[next_start - 1][2] <= self.overlap_tokens
+                and overlap + units[next_start - 1][2] + units[end][2] <= self.max_tokens
+            ):
+                next_start -= 1
+                overlap += units[next_start][2]
+            start = next_start
+
+        return chunks
+
+    def _units(self, text: str) -> List[tuple]:
+        """
+        (start, end, tokens) spans of sentences, with oversized sentences exploded into words.
+        """
+        units = []
+        for match in SENTENCE_PATTERN.finditer(text):
+            start, end = self._strip_span(text, match.start(), match.end())
+            if start >= end:
+                continue
+            tokens = self.token_counter(text[start:end])
+            if tokens <= self.max_tokens:
+                units.append((start, end, tokens))
+                continue
+            for word in WORD_PATTERN.finditer(text, start, end):
+                units.append((word.start(), word.end(), max(1, self.token_counter(word.group()))))
+        return units
+
+    @staticmethod
+    def _strip_span(text: str, start: int, end: int) -> tuple:
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        return start, end
+
+
+CHUNKERS = {
+    FixedCharChunker.name: FixedCharChunker,
+    SentenceChunker.name: SentenceChunker,
+}
+
+
+def get_chunker(name: str = CHUNKER, token_counter: Callable[[str], int] = approximate_token_count):
+    """
+    Build a chunker by name from the `CHUNKERS` registry.
+    """
+    if name not in CHUNKERS:
+        raise ValueError(f"Unknown chunker '{name}'. Available: {sorted(CHUNKERS)}")
+    return CHUNKERS[name](token_counter=token_counter)
+
+
+def token_histogram(token_counts: Iterable[int], bin_width: int = CHUNK_HISTOGRAM_BIN) -> Dict[str, int]:
+    """
+    Chunk-size histogram in token buckets, e.g. {"0-31": 4, "224-255": 120}.
+    """
+    histogram: Dict[int, int] = {}
+    for count in token_counts:
+        bucket = count // bin_width
+        histogram[bucket] = histogram.get(bucket, 0) + 1
+    return {
+        f"{bucket * bin_width}-{(bucket + 1) * bin_width - 1}": histogram[bucket]
+        for bucket in sorted(histogram)
+    }
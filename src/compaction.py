@@ -0,0 +1,169 @@
+import json
+import os
+import re
+from datetime import datetime
+from io import BytesIO
+from typing import Dict, Iterable, List, Optional
+
+import pyarrow as pa
+import pyarrow.compute as pc
+from minio import Minio
+from minio.error import S3Error
+
+from parquet_io import (
+    IOStats, read_parquet_object, write_parquet_object,
+    partition_for, partition_path, is_partition_file,
+)
+
+
+COMPACTION_MANIFEST = "_compaction_manifest.json"
+PARTITION_FILE_PATTERN = re.compile(r"part-(\d+)\.parquet$")
+
+
+def object_partition(object_name: str, partitions: int) -> int:
+    """
+    Partition of a layer object: parsed from compacted `part-NNNNN` files, hashed for loose files.
+    """
+    match = PARTITION_FILE_PATTERN.search(object_name)
+    if match:
+        return int(match.group(1))
+    return partition_for(object_name, partitions)
+
+
+def manifest_path(folder: str) -> str:
+    return f"{folder}/{COMPACTION_MANIFEST}"
+
+
+def load_compaction_manifest(client: Minio, bucket: str, folder: str) -> Dict[str, dict]:
+    try:
+        response = client.get_object(bucket, manifest_path(folder))
+    except S3Error as e:
+        if e.code == "NoSuchKey":
+            return {}
+        raise
+    try:
+        return json.loads(response.read().decode("utf-8")).get("parts", {})
+    finally:
+        response.close()
+        response.release_conn()
+
+
+def save_compaction_manifest(client: Minio, bucket: str, folder: str, parts: Dict[str, dict]) -> None:
+    payload = json.dumps({"folder": folder, "updated_at": datetime.utcnow().isoformat(), "parts": parts},
+                         indent=2, sort_keys=True).encode("utf-8")
+    client.put_object(bucket, manifest_path(folder), BytesIO(payload), len(payload), content_type="application/json")
+
+
+def _part_entry(table: pa.Table, etag: Optional[str]) -> dict:
+    return {
+        "etag": etag,
+        "rows": table.num_rows,
+        "sources": sorted(table.column("file").to_pylist()),
+        "compacted_at": datetime.utcnow().isoformat(),
+    }
+
+
+def compact_layer(client: Minio, bucket: str, folder: str, partitions: int, row_group_size: int,
+                  io_stats: Optional[IOStats] = None) -> dict:
+    """
+    Merge loose one-record parquet files of a layer into row-group-sized `part-NNNNN.parquet` files.
+
+    Loose rows replace rows of the same source file already in a part (they are newer). The layer's
+    compaction manifest maps every part file to the raw objects it contains; parts rewritten
+    elsewhere (e.g. by the silver stage) are re-indexed when their ETag no longer matches.
+    Loose files are deleted only after their part has been written.
+    """
+    io_stats = io_stats or IOStats()
+    objects = [
+        obj for obj in client.list_objects(bucket, prefix=f"{folder}/", recursive=True)
+        if obj.object_name.endswith(".parquet")
+    ]
+    parts = {obj.object_name: obj for obj in objects if is_partition_file(obj.object_name)}
+    loose: Dict[int, List[str]] = {}
+    for obj in objects:
+        if not is_partition_file(obj.object_name):
+            loose.setdefault(object_partition(obj.object_name, partitions), []).append(obj.object_name)
+
+    manifest = load_compaction_manifest(client, bucket, folder)
+    rewritten = []
+    compacted_files = 0
+
+    for partition, files in sorted(loose.items()):
+        part_name = partition_path(folder, partition)
+        new_rows = pa.concat_tables(
+            [read_parquet_object(client, bucket, file, stats=io_stats) for file in sorted(files)],
+            promote_options="default",
+        )
+        tables = [new_rows]
+        if part_name in parts:
+            existing = read_parquet_object(client, bucket, part_name, stats=io_stats)
+            keep = pc.invert(pc.is_in(existing.column("file"), value_set=new_rows.column("file").combine_chunks()))
+            tables.insert(0, existing.filter(keep))
+
+        merged = pa.concat_tables(tables, promote_options="default")
+        merged = merged.take(pc.sort_indices(merged, sort_keys=[("file", "ascending")]))
+        write_parquet_object(client, bucket, part_name, merged, stats=io_stats, row_group_size=row_group_size)
+        etag = client.stat_object(bucket, part_name).etag
+        manifest[os.path.basename(part_name)] = _part_entry(merged, etag)
+        rewritten.append(part_name)
+
+        for file in files:
+            client.remove_object(bucket, file)
+        compacted_files += len(files)
+
+    # Re-index parts written by someone else since the last compaction, forget deleted ones
+    for part_name, obj in parts.items():
+        key = os.path.basename(part_name)
+        if part_name not in rewritten and manifest.get(key, {}).get("etag") != obj.etag:
+            table = read_parquet_object(client, bucket, part_name, columns=["file"], stats=io_stats)
+            manifest[key] = _part_entry(table, obj.etag)
+    current = {os.path.basename(name) for name in list(parts) + rewritten}
+    for key in [key for key in manifest if key not in current]:
+        del manifest[key]
+
+    save_compaction_manifest(client, bucket, folder, manifest)
+    return {
+        "folder": folder,
+        "compacted_files": compacted_files,
+        "rewritten_parts": len(rewritten),
+        "total_parts": len(current),
+        "total_rows": sum(entry["rows"] for entry in manifest.values()),
+        "io": io_stats.as_dict(),
+    }
+
+
+def drop_records(client: Minio, bucket: str, folder: str, sources: Iterable[str], partitions: int,
+                 row_group_size: int, io_stats: Optional[IOStats] = None) -> int:
+    """
+    Remove rows of deleted source files from the layer's compacted parts; returns rows removed.
+    """
+    by_partition: Dict[int, List[str]] = {}
+    for source in sources:
+        by_partition.setdefault(partition_for(source, partitions), []).append(source)
+
+    manifest = None
+    removed = 0
+    for partition, files in sorted(by_partition.items()):
+        part_name = partition_path(folder, partition)
+        try:
+            existing = read_parquet_object(client, bucket, part_name, stats=io_stats)
+        except S3Error as e:
+            if e.code == "NoSuchKey":
+                continue
+            raise
+        kept = existing.filter(pc.invert(pc.is_in(existing.column("file"), value_set=pa.array(files))))
+        if kept.num_rows == existing.num_rows:
+            continue
+
+        manifest = manifest if manifest is not None else load_compaction_manifest(client, bucket, folder)
+        removed += existing.num_rows - kept.num_rows
+        if kept.num_rows:
+            write_parquet_object(client, bucket, part_name, kept, stats=io_stats, row_group_size=row_group_size)
+            manifest[os.path.basename(part_name)] = _part_entry(kept, client.stat_object(bucket, part_name).etag)
+        else:
+            client.remove_object(bucket, part_name)
+            manifest.pop(os.path.basename(part_name), None)
+
+    if manifest is not None:
+        save_compaction_manifest(client, bucket, folder, manifest)
+    return removed
@@ -0,0 +1,124 @@
+import os
+import re
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from chunker import approximate_token_count
+
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1024"))
+CONTEXT_DEDUP_SIMILARITY = float(os.getenv("CONTEXT_DEDUP_SIMILARITY", "0.9"))  # word-set Jaccard
+CONTEXT_MERGE_GAP = 4  # characters between chunks of one source that still count as adjacent
+CONTEXT_MIN_TRIM_TOKENS = 32  # a passage cut shorter than this is dropped instead
+
+_WORD = re.compile(r"\w+")
+
+
+class Passage(NamedTuple):
+    source: Optional[str]
+    offset: Optional[int]  # character offset in the source text, when known
+    text: str
+    rank: int  # best retrieval rank among the chunks it was built from
+
+
+class ContextAssembler:
+    """
+    Turns ranked retrieval results into prompt context.
+
+    1. Near-identical chunks (re-ingested copies under another source) are dropped, keeping the
+       best-ranked copy.
+    2. Chunks of the same source whose character spans overlap or touch are merged into one
+       passage, so the chunker's overlap is not sent twice.
+    3. Passages are added in rank order until `token_budget`; the one that crosses it is cut at a
+       word boundary, or dropped if less than CONTEXT_MIN_TRIM_TOKENS would remain.
+    """
+
+    def __init__(self, token_budget: int = CONTEXT_TOKEN_BUDGET, similarity: float = CONTEXT_DEDUP_SIMILARITY,
+                 token_counter: Callable[[str], int] = approximate_token_count):
+        self.token_budget = token_budget
+        self.similarity = similarity
+        self.token_counter = token_counter
+
+    def assemble(self, documents: Sequence[str], metadatas: Optional[Sequence[dict]] = None) -> Tuple[str, Dict]:
+        """
+        `(context, stats)`; stats count candidates, duplicates, merges, passages cut or dropped for the
+        budget, and context tokens.
+        """
+        metadatas = metadatas or [{}] * len(documents)
+        stats = {"candidates": len(documents), "duplicates": 0, "merged": 0, "cut": 0, "dropped": 0}
+
+        kept, seen = [], []
+        for rank, (doc, meta) in enumerate(zip(documents, metadatas)):
+            words = frozenset(_WORD.findall((doc or "").lower()))
+            if not words or any(self._jaccard(words, other) >= self.similarity for other in seen):
+                stats["duplicates"] += 1
+                continue
+            seen.append(words)
+            meta = meta or {}
+            kept.append(Passage(meta.get("source"), meta.get("chunk_offset"), doc, rank))
+
+        passages = self._merge_adjacent(kept, stats)
+
+        parts, tokens = [], 0
+        for passage in passages:
+            passage_tokens = self.token_counter(passage.text)
+            if tokens + passage_tokens > self.token_budget:
+                trimmed = self._trim(passage.text, self.token_budget - tokens)
+                if trimmed:
+                    parts.append(trimmed)
+                    tokens += self.token_counter(trimmed)
+                    stats["cut"] = 1
+                stats["dropped"] = len(passages) - len(parts)
+                break
+            parts.append(passage.text)
+            tokens += passage_tokens
+
+        stats["passages"] = len(parts)
+        stats["tokens"] = tokens
+        return "\n\n".join(parts), stats
+
+    def _merge_adjacent(self, passages: List[Passage], stats: Dict) -> List[Passage]:
+        by_source: Dict[str, List[Passage]] = {}
+        for passage in passages:
+            if passage.source is not None and passage.offset is not None:
+                by_source.setdefault(passage.source, []).append(passage)
+
+        merged = {id(passage): passage for passage in passages}
+        for group in by_source.values():
+            group.sort(key=lambda passage: passage.offset)
+            current = group[0]
+            for passage in group[1:]:
+                end = current.offset + len(current.text)
+                if passage.offset > end + CONTEXT_MERGE_GAP:
+                    current = passage
+                    continue
+                if passage.offset + len(passage.text) > end:
+                    tail = passage.text[max(0, end - passage.offset):]
+                    text = current.text + (" " if passage.offset > end else "") + tail
+                else:
+                    text = current.text  # fully contained
+                combined = Passage(current.source, current.offset, text, min(current.rank, passage.rank))
+                # The merged passage takes the slot of the best-ranked chunk it contains
+                merged.pop(id(current))
+                merged.pop(id(passage))
+                merged[id(combined)] = combined
+                stats["merged"] += 1
+                current = combined
+        return sorted(merged.values(), key=lambda passage: passage.rank)
+
+    def _trim(self, text: str, budget: int) -> str:
+        if budget < CONTEXT_MIN_TRIM_TOKENS:
+            return ""
+        words = text.split()
+        low, high = 0, len(words)
+        # Largest word prefix within the budget (token counts grow with the prefix)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self.token_counter(" ".join(words[:middle])) <= budget:
+                low = middle
+            else:
+                high = middle - 1
+        return " ".join(words[:low]) if low >= 1 else ""
+
+    @staticmethod
+    def _jaccard(a: frozenset, b: frozenset) -> float:
+        return len(a & b) / len(a | b)
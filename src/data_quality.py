@@ -1,40 +1,142 @@
-import pandas as pd
+import json
+import os
+from typing import Callable, Dict, Iterable, List, Optional
 
-def check_non_nulls(df: pd.DataFrame) -> dict:
-    non_null_counts = df.notnull().sum()
-    total_non_nulls = non_null_counts.sum()
-    return {
-        "total_non_nulls": int(total_non_nulls),
-        "non_nulls_by_column": non_null_counts.to_dict()
-    }
+import duckdb
 
-def check_nulls(df: pd.DataFrame) -> dict:
-    null_counts = df.isnull().sum()
-    total_nulls = null_counts.sum()
-    return {
-        "total_nulls": int(total_nulls),
-        "nulls_by_column": null_counts.to_dict()
-    }
 
-def check_duplicates(df: pd.DataFrame) -> dict:
-    duplicate_count = df.duplicated().sum()
-    return {"duplicate_rows": int(duplicate_count)}
+# Cap on DuckDB's memory: parquet is streamed row group by row group, and the per-row hashes kept
+# for the duplicate count spill to disk beyond it
+DQ_MEMORY_LIMIT = os.getenv("DQ_MEMORY_LIMIT", "512MB")
+DQ_THREADS = int(os.getenv("DQ_THREADS", "4"))
+# Characters str.strip() removes from a cell that counts as an empty string
+BLANK_CHARACTERS = " \t\n\r\x0b\x0c"
 
-def check_empty_strings(df: pd.DataFrame) -> dict:
-    empty_counts = {
-        col: (df[col].astype(str).str.strip() == '').sum()
-        for col in df.columns if df[col].dtype == object
-    }
-    total_empty = sum(empty_counts.values())
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _literal(text: str) -> str:
+    return "'" + text.replace("'", "''") + "'"
+
+
+def partition_stats(paths: Dict[str, str], temp_directory: Optional[str] = None,
+                    configure: Optional[Callable[[duckdb.DuckDBPyConnection], None]] = None) -> Dict[str, dict]:
+    """
+    Partial DQ counts per parquet file (`{name: path}`), from one aggregated DuckDB query that
+    streams the files row group by row group instead of loading them. Paths may be anything
+    `read_parquet` opens, e.g. s3:// URLs once `configure` has set up the connection:
+
+        {"rows": n, "columns": {col: non-null count}, "empty_strings": {string col: count},
+         "duplicate_rows": n}
+
+    Duplicates are counted within a file. Silver is hash-partitioned by source file and every row
+    carries its source, so identical rows always share a partition and the counts add up.
+    """
+    if not paths:
+        return {}
+    con = duckdb.connect(database=":memory:")
+    try:
+        con.execute(f"SET memory_limit = {_literal(DQ_MEMORY_LIMIT)}")
+        con.execute(f"SET threads = {DQ_THREADS}")
+        if temp_directory is not None:
+            con.execute(f"SET temp_directory = {_literal(temp_directory)}")
+        if configure is not None:
+            configure(con)
+        files = f"[{', '.join(_literal(path) for path in paths.values())}]"
+        # Files written before a column existed read it as NULL, like pa.concat_tables with promotion
+        source = f"read_parquet({files}, union_by_name = true, filename = true)"
+        schema = [(name, kind) for name, kind, *_ in con.execute(f"DESCRIBE SELECT * FROM {source}").fetchall()
+                  if name != "filename"]
+        columns = [_quote(name) for name, _ in schema]
+        strings = [i for i, (_, kind) in enumerate(schema) if kind == "VARCHAR"]
+
+        selects = ["filename", "count(*)", f"count(*) - count(DISTINCT hash({', '.join(columns)}))"]
+        selects += [f"count({column})" for column in columns]
+        selects += [f"count(*) FILTER (WHERE trim({columns[i]}, {_literal(BLANK_CHARACTERS)}) = '')" for i in strings]
+        rows = con.execute(f"SELECT {', '.join(selects)} FROM {source} GROUP BY filename").fetchall()
+        own_columns = {}
+        for filename, name in con.execute(f"SELECT file_name, name FROM parquet_schema({files})").fetchall():
+            own_columns.setdefault(filename, set()).add(name)
+    finally:
+        con.close()
+
+    per_file = {}
+    for filename, row_count, duplicates, *counts in rows:
+        non_nulls, empty = counts[:len(schema)], counts[len(schema):]
+        # Columns the file does not have read as NULL; only the file's own columns are recorded,
+        # so the partial stays right when other partitions change schema later
+        own = own_columns.get(filename, set())
+        per_file[filename] = {
+            "rows": row_count,
+            "columns": {name: count for (name, _), count in zip(schema, non_nulls) if name in own},
+            "empty_strings": {schema[i][0]: count for i, count in zip(strings, empty) if schema[i][0] in own},
+            "duplicate_rows": duplicates,
+        }
+    # GROUP BY returns files in no particular order; the result follows `paths`
+    return {name: per_file.get(path) or {"rows": 0, "columns": {}, "empty_strings": {}, "duplicate_rows": 0}
+            for name, path in paths.items()}
+
+
+def merge_stats(partials: Iterable[dict]) -> dict:
+    """Add up partial counts; a column missing from a partition counts as NULL there."""
+    merged = {"rows": 0, "columns": {}, "empty_strings": {}, "duplicate_rows": 0}
+    for partial in partials:
+        merged["rows"] += partial["rows"]
+        merged["duplicate_rows"] += partial["duplicate_rows"]
+        for key in ("columns", "empty_strings"):
+            for column, count in partial[key].items():
+                merged[key][column] = merged[key].get(column, 0) + count
+    return merged
+
+
+def build_report(stats: dict) -> dict:
+    """The DQ report from merged counts, in the shape the pandas checks produced."""
+    non_nulls = stats["columns"]
+    nulls = {column: stats["rows"] - count for column, count in non_nulls.items()}
+    empty = {column: stats["empty_strings"][column] for column in non_nulls if column in stats["empty_strings"]}
     return {
-        "total_empty_strings": int(total_empty),
-        "empty_strings_by_column": empty_counts
+        "total_non_nulls": sum(non_nulls.values()),
+        "non_nulls_by_column": dict(non_nulls),
+        "total_nulls": sum(nulls.values()),
+        "nulls_by_column": nulls,
+        "duplicate_rows": stats["duplicate_rows"],
+        "total_empty_strings": sum(empty.values()),
+        "empty_strings_by_column": empty,
     }
 
-def run_data_quality_checks(df: pd.DataFrame) -> dict:
-    results = {}
-    results.update(check_non_nulls(df))
-    results.update(check_nulls(df))
-    results.update(check_duplicates(df))
-    results.update(check_empty_strings(df))
-    return results
+
+def run_data_quality_checks(paths: Dict[str, str]) -> dict:
+    """One streaming pass over the parquet files at `paths` (`{name: local path}`)."""
+    return build_report(merge_stats(partition_stats(paths).values()))
+
+
+class PartitionStatsCache:
+    """
+    Partial DQ counts per silver partition, keyed by the object's etag and size, so a run only
+    scans the partitions that changed since the last one.
+    """
+
+    def __init__(self, entries: Optional[Dict[str, dict]] = None):
+        self.entries = entries or {}
+
+    @classmethod
+    def from_json(cls, data: Optional[bytes]) -> "PartitionStatsCache":
+        return cls(json.loads(data)["partitions"] if data else None)
+
+    def to_json(self) -> bytes:
+        return json.dumps({"partitions": self.entries}).encode("utf-8")
+
+    def get(self, object_name: str, etag: Optional[str], size: Optional[int]) -> Optional[dict]:
+        entry = self.entries.get(object_name)
+        if entry is None or entry["etag"] != etag or entry["size"] != size:
+            return None
+        return entry["stats"]
+
+    def put(self, object_name: str, etag: Optional[str], size: Optional[int], stats: dict) -> None:
+        self.entries[object_name] = {"etag": etag, "size": size, "stats": stats}
+
+    def retain(self, object_names: List[str]) -> None:
+        keep = set(object_names)
+        self.entries = {name: entry for name, entry in self.entries.items() if name in keep}
@@ -0,0 +1,260 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from embedding_cache import EmbeddingCache, chunk_hash
+
+
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+EMBED_WORKERS = int(os.getenv("EMBED_WORKERS", "1"))
+EMBED_POOL = os.getenv("EMBED_POOL", "thread")  # "thread" or "process"
+CHROMA_WRITE_BATCH = int(os.getenv("CHROMA_WRITE_BATCH", "4096"))
+
+
+class EmbeddingPipeline:
+    """
+    Streaming embedding stage: collects chunks from any number of files, encodes them in
+    fixed-size batches on a thread or process pool and upserts them into Chroma in bulk.
+
+    Call `add` for every chunk, then `flush` once at the end. With a `cache`, only chunks
+    missing from it are encoded; the model is loaded through `model_loader` on the first
+    miss, so a run that hits the cache for everything never loads it.
+    """
+
+    def __init__(self, model, collection, batch_size: int = EMBED_BATCH_SIZE, workers: int = EMBED_WORKERS,
+                 pool: str = EMBED_POOL, write_batch_size: int = CHROMA_WRITE_BATCH,
+                 cache: Optional[EmbeddingCache] = None, model_name: Optional[str] = None,
+                 model_loader: Optional[Callable] = None):
+        if pool not in ("thread", "process"):
+            raise ValueError(f"Unknown embedding pool type: {pool}")
+        if model is None and model_loader is None:
+            raise ValueError("Either a model or a model_loader is required")
+        if cache is not None and not model_name:
+            raise ValueError("model_name is required to key the embedding cache")
+        self._model = model
+        self._model_loader = model_loader
+        self.model_name = model_name
+        self.cache = cache
+        self.collection = collection
+        self.batch_size = batch_size
+        self.workers = max(1, workers)
+        self.pool = pool
+        self.write_batch_size = max(write_batch_size, batch_size)
+
+        self._pending_ids: List[str] = []
+        self._pending_docs: List[str] = []
+        self._pending_meta: List[Dict] = []
+        self._write_ids: List[str] = []
+        self._write_docs: List[str] = []
+        self._write_meta: List[Dict] = []
+        self._write_vectors: List[np.ndarray] = []
+
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._process_pool = None
+        self._pool_started = False
+
+        self.chunks = 0
+        self.encoded_chunks = 0
+        self.batches = 0
+        self.writes = 0
+        self.encode_seconds = 0.0
+        self.write_seconds = 0.0
+        self._started = time.perf_counter()
+
+    @property
+    def model(self):
+        if self._model is None:
+            self._model = self._model_loader()
+        return self._model
+
+    def add(self, vector_id: str, document: str, metadata: Dict) -> None:
+        self._pending_ids.append(vector_id)
+        self._pending_docs.append(document)
+        self._pending_meta.append(metadata)
+        # Encode once every worker can get a full batch
+        if len(self._pending_docs) >= self.batch_size * self.workers:
+            self._encode_pending()
+
+    def flush(self) -> dict:
+        """
+        Encode and write everything still buffered, release the pool and return throughput stats.
+        """
+        try:
+            if self._pending_docs:
+                self._encode_pending()
+            if self._write_ids:
+                self._write()
+            if self.cache is not None:
+                self.cache.evict()
+        finally:
+            self.close()
+        return self.stats()
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        if self._process_pool is not None:
+            self.model.stop_multi_process_pool(self._process_pool)
+            self._process_pool = None
+
+    def stats(self) -> dict:
+        elapsed = time.perf_counter() - self._started
+        stats = {
+            "chunks": self.chunks,
+            "encoded_chunks": self.encoded_chunks,
+            "encode_batches": self.batches,
+            "chroma_writes": self.writes,
+            "batch_size": self.batch_size,
+            "workers": self.workers,
+            "pool": self.pool,
+            "encode_seconds": round(self.encode_seconds, 3),
+            "write_seconds": round(self.write_seconds, 3),
+            "chunks_per_sec": round(self.chunks / elapsed, 2) if elapsed > 0 else 0.0,
+            "encode_chunks_per_sec": round(self.encoded_chunks / self.encode_seconds, 2) if self.encode_seconds > 0 else 0.0,
+        }
+        if self.cache is not None:
+            stats["cache"] = self.cache.stats()
+        return stats
+
+    def _encode_pending(self) -> None:
+        docs = self._pending_docs
+        if self.cache is None:
+            vectors = self._timed_encode(docs)
+        else:
+            vectors = self._encode_with_cache(docs)
+
+        self._write_ids.extend(self._pending_ids)
+        self._write_docs.extend(docs)
+        self._write_meta.extend(self._pending_meta)
+        self._write_vectors.append(vectors)
+        self.chunks += len(docs)
+
+        self._pending_ids, self._pending_docs, self._pending_meta = [], [], []
+        if len(self._write_ids) >= self.write_batch_size:
+            self._write()
+
+    def _encode_with_cache(self, docs: List[str]) -> np.ndarray:
+        hashes = [chunk_hash(doc) for doc in docs]
+        cached = self.cache.get_many(self.model_name, hashes)
+
+        # Encode each distinct missing chunk once
+        missing = {}
+        for digest, doc in zip(hashes, docs):
+            if digest not in cached and digest not in missing:
+                missing[digest] = doc
+        if missing:
+            encoded = self._timed_encode(list(missing.values()))
+            self.cache.put_many(self.model_name, list(missing), encoded)
+            cached.update(zip(missing, encoded))
+
+        return np.vstack([cached[digest] for digest in hashes])
+
+    def _timed_encode(self, docs: List[str]) -> np.ndarray:
+        started = time.perf_counter()
+        vectors = self._encode(docs)
+        self.encode_seconds += time.perf_counter() - started
+        self.encoded_chunks += len(docs)
+        return vectors
+
+    def _start_pool(self) -> None:
+        self._pool_started = True
+        self.model  # load once here rather than racing to load it from worker threads
+        if self.pool == "thread" and self.workers > 1:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers)
+        elif self.pool == "process" and self.workers > 1:
+            self._process_pool = self.model.start_multi_process_pool(target_devices=["cpu"] * self.workers)
+
+    def _encode(self, docs: List[str]) -> np.ndarray:
+        if not self._pool_started:
+            self._start_pool()
+        batches = [docs[i:i + self.batch_size] for i in range(0, len(docs), self.batch_size)]
+        self.batches += len(batches)
+        if self._process_pool is not None:
+            return np.asarray(self.model.encode_multi_process(docs, self._process_pool, batch_size=self.batch_size))
+        if self._executor is not None:
+            encoded = self._executor.map(self._encode_batch, batches)
+            return np.vstack(list(encoded))
+        return self._encode_batch(docs)
+
+    def _encode_batch(self, batch: List[str]) -> np.ndarray:
+        return np.asarray(self.model.encode(batch, batch_size=self.batch_size, convert_to_numpy=True))
+
+    def _write(self) -> None:
+        vectors = np.vstack(self._write_vectors)
+        started = time.perf_counter()
+        for start in range(0, len(self._write_ids), self.write_batch_size):
+            end = start + self.write_batch_size
+            self.collection.upsert(
+                ids=self._write_ids[start:end],
+                documents=self._write_docs[start:end],
+                embeddings=vectors[start:end],
+                metadatas=self._write_meta[start:end],
+            )
+            self.writes += 1
+        self.write_seconds += time.perf_counter() - started
+
+        self._write_ids, self._write_docs, self._write_meta, self._write_vectors = [], [], [], []
+
+
+class EmbeddingModelMismatch(RuntimeError):
+    pass
+
+
+def lineage_embedding_model(lineage_path: str) -> Optional[str]:
+    """
+    Embedding model recorded by the gold stage in its local lineage file, or None if there is none yet.
+    """
+    try:
+        with open(lineage_path) as f:
+            return json.load(f).get("embedding_model")
+    except FileNotFoundError:
+        return None
+
+
+def check_embedding_model(model_name: str, lineage_path: str) -> None:
+    """
+    Raise if the gold index was built with a different model than the one that embeds queries.
+    """
+    indexed_with = lineage_embedding_model(lineage_path)
+    if indexed_with is not None and indexed_with != model_name:
+        raise EmbeddingModelMismatch(
+            f"Gold index was embedded with '{indexed_with}' but queries use '{model_name}'"
+        )
+
+
+class QueryEmbedder:
+    """
+    Query-side twin of the gold stage's encoder: the same sentence-transformers model, loaded once
+    and warmed up front so the first request does not pay for model load or first-batch setup.
+    """
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL, model=None, batch_size: int = EMBED_BATCH_SIZE):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self._model = model
+
+    @property
+    def model(self):
+        if self._model is None:
+            from sentence_transformers import SentenceTransformer
+
+            self._model = SentenceTransformer(self.model_name)
+        return self._model
+
+    def warm_up(self) -> float:
+        """
+        Load the model and run one dummy batch; returns the seconds it took.
+        """
+        started = time.perf_counter()
+        self.encode(["warm up"] * min(self.batch_size, 8))
+        return time.perf_counter() - started
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        # Same call as EmbeddingPipeline._encode_batch, so query and document vectors match
+        return np.asarray(self.model.encode(texts, batch_size=self.batch_size, convert_to_numpy=True))
@@ -0,0 +1,126 @@
+import hashlib
+import os
+import sqlite3
+import time
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+
+EMBED_CACHE_PATH = os.getenv("EMBED_CACHE_PATH", "/opt/data/cache/embedding_cache.sqlite")
+EMBED_CACHE_MAX_ENTRIES = int(os.getenv("EMBED_CACHE_MAX_ENTRIES", "1000000"))
+
+
+def normalize_chunk(text: str) -> str:
+    """
+    Collapse whitespace so chunks differing only in spacing share a cache entry.
+    """
+    return " ".join(text.split())
+
+
+def chunk_hash(text: str) -> str:
+    return hashlib.sha256(normalize_chunk(text).encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    On-disk embedding cache in a local SQLite table keyed by (model name, normalized chunk hash).
+
+    Vectors are stored as raw float32 bytes. Entries carry a last-used timestamp so the
+    cache can be trimmed back to `max_entries` by evicting the least recently used rows.
+    """
+
+    def __init__(self, path: str = EMBED_CACHE_PATH, max_entries: int = EMBED_CACHE_MAX_ENTRIES):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                chunk_hash TEXT NOT NULL,
+                dim INTEGER NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (model, chunk_hash)
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used)")
+        self._conn.commit()
+
+    def get_many(self, model: str, hashes: Iterable[str]) -> Dict[str, np.ndarray]:
+        """
+        Return cached vectors for the given hashes; missing hashes are simply absent.
+        """
+        unique = list(dict.fromkeys(hashes))
+        found: Dict[str, np.ndarray] = {}
+        # Stay well below SQLite's bound-parameter limit
+        for start in range(0, len(unique), 500):
+            batch = unique[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows = self._conn.execute(
+                f"SELECT chunk_hash, dim, vector FROM embeddings WHERE model = ? AND chunk_hash IN ({placeholders})",
+                [model, *batch],
+            ).fetchall()
+            for digest, dim, blob in rows:
+                found[digest] = np.frombuffer(blob, dtype=np.float32, count=dim)
+
+        if found:
+            now = time.time()
+            self._conn.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE model = ? AND chunk_hash = ?",
+                [(now, model, digest) for digest in found],
+            )
+            self._conn.commit()
+
+        self.hits += len(found)
+        self.misses += len(unique) - len(found)
+        return found
+
+    def put_many(self, model: str, hashes: List[str], vectors: np.ndarray) -> None:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        now = time.time()
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (model, chunk_hash, dim, vector, last_used) VALUES (?, ?, ?, ?, ?)",
+            [(model, digest, vector.shape[0], vector.tobytes(), now) for digest, vector in zip(hashes, vectors)],
+        )
+        self._conn.commit()
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def evict(self) -> int:
+        """
+        Delete least recently used entries beyond `max_entries`; returns how many were removed.
+        """
+        excess = len(self) - self.max_entries
+        if excess <= 0:
+            return 0
+        self._conn.execute(
+            "DELETE FROM embeddings WHERE rowid IN (SELECT rowid FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+            (excess,),
+        )
+        self._conn.commit()
+        self.evicted += excess
+        return excess
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evicted": self.evicted,
+            "entries": len(self),
+            "max_entries": self.max_entries,
+        }
+
+    def close(self) -> None:
+        self._conn.close()
@@ -1,26 +1,36 @@
 import os
 import duckdb
-import pandas as pd
+import pyarrow as pa
+import hashlib
 import tempfile
-import uuid
-from io import BytesIO
+import time
+from concurrent.futures import wait, FIRST_EXCEPTION
 from datetime import datetime
-from minio import Minio
-from sentence_transformers import SentenceTransformer
+from minio.error import S3Error
 import chromadb
 import json
 import numpy as np
 
 
-from data_quality import run_data_quality_checks  # import your DQ functions
+from data_quality import partition_stats, merge_stats, build_report, PartitionStatsCache
+from manifest import StageManifest, content_hash, MANIFEST_PREFIX
+from embedding import EmbeddingPipeline, CHROMA_WRITE_BATCH, EMBEDDING_MODEL, lineage_embedding_model
+from embedding_cache import EmbeddingCache, EMBED_CACHE_PATH
+from chunker import get_chunker, load_token_counter, token_histogram, CHUNKER
+from parquet_io import (
+    IOStats, read_object_buffer, download_object, parquet_from_buffer, write_parquet_object,
+    partition_path, is_partition_file,
+)
+from compaction import compact_layer, drop_records, object_partition
+from object_store import get_store
+from keyword_index import BM25Index
+from book_metadata import BOOK_COLUMNS, parse_book_fields, with_book_columns, chroma_metadata
+from vector_snapshot import export_collection
+from gold_release import published_layout, stage_release, publish_release, discard_release
 
 # -----------------------------
 # ENV + MinIO Configuration
 # -----------------------------
-MINIO_URL = os.getenv("MINIO_URL", "localhost:9000")
-MINIO_ACCESS_KEY = os.getenv("MINIO_ACCESS_KEY", "minioadmin")
-MINIO_SECRET_KEY = os.getenv("MINIO_SECRET_KEY", "minioadmin")
-MINIO_BUCKET = os.getenv("MINIO_BUCKET", "mydata")
 CHROMA_DIR = os.getenv("CHROMA_DIR", "/opt/data/gold/chroma")
 os.makedirs(CHROMA_DIR, exist_ok=True)
 
@@ -28,73 +38,180 @@ RAW_FOLDER = "raw"
 BRONZE_FOLDER = "bronze"
 SILVER_FOLDER = "silver"
 
-client = Minio(
-    MINIO_URL,
-    access_key=MINIO_ACCESS_KEY,
-    secret_key=MINIO_SECRET_KEY,
-    secure=False
-)
+# Set ETL_FULL_REFRESH=true to ignore stage manifests and reprocess every object
+FULL_REFRESH = os.getenv("ETL_FULL_REFRESH", "false").lower() == "true"
+# Memory-mapped, read-only copy of the gold vectors that several API workers can share
+VECTOR_SNAPSHOT_ENABLED = os.getenv("VECTOR_SNAPSHOT_ENABLED", "true").lower() == "true"
+# Silver (and compacted bronze) is written as hash-partitioned files instead of one file per book;
+# bronze part N holds exactly the rows of silver part N
+SILVER_PARTITIONS = int(os.getenv("SILVER_PARTITIONS", "8"))
+PARQUET_ROW_GROUP_SIZE = int(os.getenv("PARQUET_ROW_GROUP_SIZE", "10000"))
+EMBED_CACHE_ENABLED = os.getenv("EMBED_CACHE_ENABLED", "true").lower() == "true"
+# Reuse the DQ counts of silver partitions unchanged since the last run (kept in DQ_PARTITION_STATS_PATH)
+DQ_INCREMENTAL = os.getenv("DQ_INCREMENTAL", "true").lower() == "true"
+DQ_PARTITION_STATS_PATH = "data_quality/partition_stats.json"
+
+# Shared pooled client (MinIO, or the filesystem stand-in with OBJECT_STORE=filesystem)
+store = get_store()
+client = store.client
+MINIO_BUCKET = store.bucket
 
 # -----------------------------
 # MinIO Helpers
 # -----------------------------
+def iter_objects(folder, suffix=".txt"):
+    return store.iter_objects(f"{folder}/", suffix)
+
+def list_objects(folder, suffix=".txt"):
+    return store.list_objects(f"{folder}/", suffix)
+
 def list_files(folder, suffix=".txt"):
-    objects = client.list_objects(MINIO_BUCKET, prefix=f"{folder}/", recursive=True)
-    return sorted([obj.object_name for obj in objects if obj.object_name.endswith(suffix)])
+    return [obj.object_name for obj in iter_objects(folder, suffix)]
 
 def download_file(object_name):
-    response = client.get_object(MINIO_BUCKET, object_name)
-    data = response.read()
-    response.close()
-    response.release_conn()
-    return data
+    return store.get(object_name)
 
 def upload_to_minio(data: bytes, object_name: str, content_type="application/octet-stream"):
-    bytes_io = BytesIO(data)
-    bytes_io.seek(0)
-    client.put_object(
-        bucket_name=MINIO_BUCKET,
-        object_name=object_name,
-        data=bytes_io,
-        length=len(data),
-        content_type=content_type
-    )
+    store.put(object_name, data, content_type=content_type)
+    print(f"✅ Uploaded to MinIO: {object_name}")
+
+def remove_from_minio(object_name: str):
+    store.remove(object_name)
+    print(f"🗑️ Removed from MinIO: {object_name}")
+
+def remove_if_exists(object_name: str):
+    if store.exists(object_name):
+        remove_from_minio(object_name)
+
+def write_parquet(data, object_name: str, io_stats=None):
+    write_parquet_object(client, MINIO_BUCKET, object_name, data, stats=io_stats, row_group_size=PARQUET_ROW_GROUP_SIZE)
     print(f"✅ Uploaded to MinIO: {object_name}")
 
+def read_buffers(objects, io_stats, key=lambda item: item):
+    """Fetch objects concurrently on the shared transfer pool; yields (item, buffer) in input order."""
+    return store.map_ordered(lambda item: read_object_buffer(client, MINIO_BUCKET, key(item), io_stats), objects)
+
+def wait_for_uploads(futures):
+    """Block until queued uploads finish, re-raising the first failure."""
+    done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+    for future in done:
+        future.result()
+    wait(futures)
+
+# -----------------------------
+# Stage manifests (incremental processing)
+# -----------------------------
+def load_manifest(stage, full_refresh=False):
+    if full_refresh:
+        return StageManifest(stage)
+    try:
+        data = download_file(f"{MANIFEST_PREFIX}/{stage}.json")
+    except S3Error as e:
+        if e.code != "NoSuchKey":
+            raise
+        data = None
+    return StageManifest.from_json(stage, data)
+
+def save_manifest(manifest):
+    upload_to_minio(manifest.to_json(), f"{MANIFEST_PREFIX}/{manifest.stage}.json", content_type="application/json")
+
+def load_local_manifest(stage, path, full_refresh=False):
+    # The gold manifest lives next to the Chroma directory it describes, so wiping one wipes both
+    if full_refresh or not os.path.exists(path):
+        return StageManifest(stage)
+    with open(path, "rb") as f:
+        return StageManifest.from_json(stage, f.read())
+
+def save_local_manifest(manifest, path):
+    with open(path, "wb") as f:
+        f.write(manifest.to_json())
+
+def save_gold_lineage(lineage, path):
+    # Written atomically: the API treats any change of this file as a new gold version
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(lineage, f, indent=2, default=str)
+    os.replace(tmp_path, path)
+
+def remove_stale_outputs(manifest, current_objects):
+    """Drop manifest entries whose input disappeared upstream and delete the outputs they produced."""
+    removed = manifest.removed(current_objects)
+    for object_name in removed:
+        output_key = manifest.output_key(object_name)
+        manifest.drop(object_name)
+        if output_key:
+            try:
+                remove_from_minio(output_key)
+            except S3Error as e:
+                print(f"⚠️ Could not remove stale output {output_key}: {e}")
+    return removed
+
 # -----------------------------
 # ETL Stage 1: RAW → BRONZE
 # -----------------------------
-def etl_raw_to_bronze():
-    txt_files = list_files(RAW_FOLDER, suffix=".txt")
+def etl_raw_to_bronze(full_refresh=FULL_REFRESH):
+    txt_files = []
+    manifest = load_manifest("raw_to_bronze", full_refresh)
     processed_files = []
+    skipped_files = []
+    uploads = []
     total_lines = 0
+    io_stats = IOStats()
+
+    def changed_objects():
+        # Consumed lazily: downloads start while the listing is still being paged in
+        for obj in iter_objects(RAW_FOLDER, suffix=".txt"):
+            txt_files.append(obj.object_name)
+            if manifest.is_unchanged(obj.object_name, obj.etag, obj.size):
+                skipped_files.append(obj.object_name)
+                continue
+            yield obj
+
+    for obj, buffer in read_buffers(changed_objects(), io_stats, key=lambda obj: obj.object_name):
+        file = obj.object_name
+        raw_data = buffer.to_pybytes()
+        digest = content_hash(raw_data)
+        if manifest.has_content(file, digest):
+            manifest.refresh(file, obj.etag, obj.size)
+            skipped_files.append(file)
+            continue
 
-    for file in txt_files:
         print(f"📥 Processing RAW file: {file}")
-        raw_text = download_file(file).decode("utf-8")
+        raw_text = raw_data.decode("utf-8")
 
         lines = [line.strip().lower() for line in raw_text.splitlines() if line.strip()]
         clean_text = "\n".join(lines)
         total_lines += len(lines)
 
-        df = pd.DataFrame({
+        # Typed book fields are parsed before lowercasing so titles keep their case
+        fields = parse_book_fields(raw_text)
+        table = with_book_columns(pa.table({
             "file": [file],
-            "content": [clean_text]
-        })
-
-        parquet_buffer = BytesIO()
-        df.to_parquet(parquet_buffer, index=False)
-        parquet_buffer.seek(0)
+            "content": [clean_text],
+            **{name: pa.array([fields[name]]) for name in BOOK_COLUMNS if fields[name] is not None},
+        }))
 
         bronze_path = file.replace(RAW_FOLDER, BRONZE_FOLDER).replace(".txt", ".parquet")
-        upload_to_minio(parquet_buffer.read(), bronze_path)
+        uploads.append(store.submit(write_parquet, table, bronze_path, io_stats))
         processed_files.append(bronze_path)
+        manifest.record(file, obj.etag, obj.size, digest, bronze_path)
+
+    wait_for_uploads(uploads)
+    removed_files = remove_stale_outputs(manifest, txt_files)
+    if removed_files:
+        # Rows of removed raw files may already have been compacted into bronze parts
+        drop_records(client, MINIO_BUCKET, BRONZE_FOLDER, removed_files, SILVER_PARTITIONS,
+                     PARQUET_ROW_GROUP_SIZE, io_stats)
+    save_manifest(manifest)
 
     quality_metrics = {
         "total_files": len(txt_files),
         "processed_files": len(processed_files),
+        "skipped_files": len(skipped_files),
+        "removed_files": len(removed_files),
         "total_lines": total_lines,
-        "avg_lines_per_file": total_lines / len(txt_files) if txt_files else 0
+        "avg_lines_per_file": total_lines / len(processed_files) if processed_files else 0,
+        "io": io_stats.as_dict(),
     }
 
     print(f"📊 RAW→BRONZE quality metrics: {quality_metrics}")
@@ -103,113 +220,378 @@ def etl_raw_to_bronze():
 # -----------------------------
 # ETL Stage 2: BRONZE → SILVER
 # -----------------------------
-def etl_bronze_to_silver():
-    parquet_files = list_files(BRONZE_FOLDER, suffix=".parquet")
+def etl_bronze_to_silver(full_refresh=FULL_REFRESH):
+    parquet_objects = list_objects(BRONZE_FOLDER, suffix=".parquet")
+    parquet_files = [obj.object_name for obj in parquet_objects]
+    manifest = load_manifest("bronze_to_silver", full_refresh)
+    skipped_files = []
+    io_stats = IOStats()
+
+    # 1. Find new/modified bronze objects. An object whose silver partition moved (e.g. legacy
+    #    one-file-per-book silver output) counts as modified so it gets rewritten into its partition.
+    buffers = {}
+    changed = {}
+
+    def candidates():
+        for obj in parquet_objects:
+            silver_path = partition_path(SILVER_FOLDER, object_partition(obj.object_name, SILVER_PARTITIONS))
+            if manifest.is_unchanged(obj.object_name, obj.etag, obj.size) and manifest.output_key(obj.object_name) == silver_path:
+                skipped_files.append(obj.object_name)
+                continue
+            yield obj
+
+    for obj, buffer in read_buffers(candidates(), io_stats, key=lambda obj: obj.object_name):
+        file = obj.object_name
+        silver_path = partition_path(SILVER_FOLDER, object_partition(file, SILVER_PARTITIONS))
+        buffers[file] = buffer
+        digest = content_hash(buffer)
+        if manifest.has_content(file, digest) and manifest.output_key(file) == silver_path:
+            manifest.refresh(file, obj.etag, obj.size)
+            skipped_files.append(file)
+            continue
+        changed[file] = (obj, digest)
+
+    removed_files = manifest.removed(parquet_files)
+    affected = {object_partition(file, SILVER_PARTITIONS) for file in list(changed) + removed_files}
+
+    # 2. Every partition touched by a change is rebuilt from all of its current bronze objects,
+    #    i.e. its compacted bronze part plus any loose files not compacted yet
+    members = {partition: [] for partition in affected}
+    for file in parquet_files:
+        partition = object_partition(file, SILVER_PARTITIONS)
+        if partition in members:
+            members[partition].append(file)
+
+    missing = [file for _, files in sorted(members.items()) for file in files if file not in buffers]
+    buffers.update(read_buffers(missing, io_stats))
+
+    tables = []
+    for partition, files in sorted(members.items()):
+        for file in files:
+            bronze = with_book_columns(parquet_from_buffer(buffers[file]))
+            bronze = bronze.select(["file", "content"] + BOOK_COLUMNS)
+            # Loose files are newer than the compacted part for the same source file
+            priority = 0 if is_partition_file(file) else 1
+            bronze = bronze.append_column("partition", pa.array([partition] * bronze.num_rows, pa.int32()))
+            tables.append(bronze.append_column("priority", pa.array([priority] * bronze.num_rows, pa.int8())))
+
+    # 3. One vectorized DuckDB query over every affected bronze row
     processed_files = []
     word_counts = []
+    if tables:
+        con = duckdb.connect(database=':memory:')
+        con.register("bronze", pa.concat_tables(tables))
+        silver = con.execute("""
+            SELECT
+                file,
+                content,
+                array_length(string_split(content, ' ')) AS word_count,
+                title,
+                price,
+                availability,
+                in_stock,
+                stock_count,
+                partition
+            FROM bronze
+            QUALIFY row_number() OVER (PARTITION BY file ORDER BY priority DESC) = 1
+            ORDER BY partition, file
+        """).fetch_arrow_table()
+        con.close()
+
+        word_counts = silver.column("word_count").to_pylist()
+        partition_column = silver.column("partition").to_numpy()
+        silver = silver.drop_columns(["partition"])
+        starts = {}
+        for row, partition in enumerate(partition_column):
+            starts.setdefault(int(partition), [row, row])[1] = row + 1
+
+        uploads = []
+        for partition, (start, end) in sorted(starts.items()):
+            silver_path = partition_path(SILVER_FOLDER, partition)
+            uploads.append(store.submit(write_parquet, silver.slice(start, end - start), silver_path, io_stats))
+            processed_files.append(silver_path)
+        wait_for_uploads(uploads)
 
-    for file in parquet_files:
-        print(f"🔄 Processing BRONZE file: {file}")
-
-        parquet_data = download_file(file)
-
-        with tempfile.NamedTemporaryFile(suffix=".parquet") as tmp_file:
-            tmp_file.write(parquet_data)
-            tmp_file.flush()
-
-            con = duckdb.connect(database=':memory:')
-            con.execute(f"CREATE TABLE bronze AS SELECT * FROM parquet_scan('{tmp_file.name}')")
-
-            con.execute("""
-                CREATE TABLE silver AS
-                SELECT
-                    file,
-                    content,
-                    array_length(string_split(content, ' ')) AS word_count
-                FROM bronze
-            """)
-
-            df_silver = con.execute("SELECT * FROM silver").df()
+    # 4. Partitions left without rows, and outputs of the previous layout, are deleted
+    for partition in affected:
+        silver_path = partition_path(SILVER_FOLDER, partition)
+        if silver_path not in processed_files:
+            remove_if_exists(silver_path)
 
-            word_counts.extend(df_silver["word_count"].tolist())
+    for file, (obj, digest) in changed.items():
+        previous_output = manifest.output_key(file)
+        if previous_output and not is_partition_file(previous_output):
+            remove_if_exists(previous_output)
+        manifest.record(file, obj.etag, obj.size, digest,
+                        partition_path(SILVER_FOLDER, object_partition(file, SILVER_PARTITIONS)))
 
-            parquet_buffer = BytesIO()
-            df_silver.to_parquet(parquet_buffer, index=False)
-            parquet_buffer.seek(0)
+    for file in removed_files:
+        previous_output = manifest.output_key(file)
+        if previous_output and not is_partition_file(previous_output):
+            remove_if_exists(previous_output)
+        manifest.drop(file)
 
-            silver_path = file.replace(BRONZE_FOLDER, SILVER_FOLDER)
-            upload_to_minio(parquet_buffer.read(), silver_path)
-            processed_files.append(silver_path)
-
-    processed_files.sort()
+    save_manifest(manifest)
 
     avg_word_count = sum(word_counts) / len(word_counts) if word_counts else 0
     quality_metrics = {
         "total_files": len(parquet_files),
-        "processed_files": len(processed_files),
-        "avg_word_count": avg_word_count
+        "processed_files": len(changed),
+        "skipped_files": len(skipped_files),
+        "removed_files": len(removed_files),
+        "rebuilt_partitions": len(affected),
+        "written_partition_files": len(processed_files),
+        "silver_rows_written": len(word_counts),
+        "avg_word_count": avg_word_count,
+        "io": io_stats.as_dict(),
     }
 
     print(f"📊 BRONZE→SILVER quality metrics: {quality_metrics}")
     return processed_files
 
+# -----------------------------
+# Compaction: loose single-row files → partitioned row-group-sized files
+# -----------------------------
+def etl_compact_layer(folder):
+    compaction_stats = compact_layer(client, MINIO_BUCKET, folder, SILVER_PARTITIONS, PARQUET_ROW_GROUP_SIZE)
+    print(f"📊 {folder.upper()} compaction metrics: {compaction_stats}")
+    return compaction_stats
+
+def etl_compact_bronze():
+    return etl_compact_layer(BRONZE_FOLDER)
+
+def etl_compact_silver():
+    return etl_compact_layer(SILVER_FOLDER)
+
 # -----------------------------
 # ETL Stage 3: SILVER → GOLD (Embeddings)
 # -----------------------------
-def etl_silver_to_gold():
+def load_embedding_model(model_name):
+    # Imported on the first embedding-cache miss, like the API's QueryEmbedder
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(model_name)
+
+def chunk_id(source, offset, chunk):
+    """Deterministic vector ID: same source, offset and text always map to the same ID."""
+    chunk_hash = hashlib.sha256(chunk.encode("utf-8")).hexdigest()
+    return hashlib.sha256(f"{source}:{offset}:{chunk_hash}".encode("utf-8")).hexdigest()
+
+def existing_vector_ids(collection, silver_file):
+    return set(collection.get(where={"silver_object": silver_file}, include=[])["ids"])
+
+def delete_stale_vectors(collection, existing_ids, keep_ids):
+    """Delete vectors previously produced from a silver file that this run no longer produces."""
+    stale_ids = [vector_id for vector_id in existing_ids if vector_id not in keep_ids]
+    if stale_ids:
+        collection.delete(ids=stale_ids)
+    return len(stale_ids)
+
+def collection_documents(collection, page_size=5000):
+    """Page through every (id, document, metadata) in the collection."""
+    ids, documents, metadatas = [], [], []
+    offset = 0
+    while True:
+        page = collection.get(include=["documents", "metadatas"], limit=page_size, offset=offset)
+        if not page["ids"]:
+            return ids, documents, metadatas
+        ids.extend(page["ids"])
+        documents.extend(page["documents"])
+        metadatas.extend(page["metadatas"])
+        offset += len(page["ids"])
+
+def build_keyword_index(ids, documents, path):
+    """Rebuild the BM25 index over every chunk in the collection and save it next to Chroma."""
+    started = time.perf_counter()
+    index = BM25Index.build(ids, documents)
+    size = index.save(path)
+    stats = dict(index.stats(), bytes=size, build_seconds=round(time.perf_counter() - started, 3))
+    print(f"🔤 Keyword index rebuilt at {path}: {stats}")
+    return stats
+
+def save_book_catalog(metadatas, path):
+    """One row of typed book fields per source file, taken from the chunk metadata."""
+    books = {}
+    for meta in metadatas:
+        if meta and meta.get("source") and "title" in meta:
+            books[meta["source"]] = {"source": meta["source"], **{name: meta.get(name) for name in BOOK_COLUMNS}}
+    catalog = sorted(books.values(), key=lambda book: book["source"])
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(catalog, f)
+    os.replace(tmp_path, path)
+    return len(catalog)
+
+def etl_silver_to_gold(full_refresh=FULL_REFRESH):
     print("🟡 Starting SILVER → GOLD embedding process")
 
-    model_name = "all-MiniLM-L6-v2"
-    model = SentenceTransformer(model_name)
-
-    chroma_client = chromadb.PersistentClient(path=CHROMA_DIR)
+    parquet_objects = list_objects(SILVER_FOLDER, suffix=".parquet")
+    parquet_files = [obj.object_name for obj in parquet_objects]
+
+    served = published_layout(CHROMA_DIR)
+    served_model = lineage_embedding_model(served.lineage)
+    if served_model is not None and served_model != EMBEDDING_MODEL and not full_refresh:
+        # Vectors of two models cannot share an index: nothing of the served release is reused
+        print(f"⚠️ GOLD release {served.version} was embedded with '{served_model}'; "
+              f"re-embedding everything with '{EMBEDDING_MODEL}'")
+        full_refresh = True
+    if served.version is not None and not full_refresh:
+        # Nothing new in silver: leave the published release alone instead of copying it
+        served_manifest = load_local_manifest("silver_to_gold", served.manifest)
+        unchanged = all(served_manifest.is_unchanged(obj.object_name, obj.etag, obj.size) for obj in parquet_objects)
+        if unchanged and not served_manifest.removed(parquet_files):
+            print(f"✅ GOLD release {served.version} is up to date")
+            return []
+
+    # Everything the build writes (Chroma database, manifest, lineage, keyword index, book catalog,
+    # vector snapshot) goes into a new release directory under CHROMA_DIR/releases. It starts as a copy
+    # of the published release, and readers keep using that one until the pointer moves
+    release = stage_release(CHROMA_DIR, previous=None if full_refresh else served)
+    print(f"🏗️ Building GOLD release {release.version}")
+
+    model_name = EMBEDDING_MODEL
+    # The model is only loaded once a chunk misses the embedding cache
+    cache = EmbeddingCache(EMBED_CACHE_PATH) if EMBED_CACHE_ENABLED else None
+    chunker = get_chunker(CHUNKER, token_counter=load_token_counter(model_name))
+
+    chroma_client = chromadb.PersistentClient(path=release.chroma)
     collection = chroma_client.get_or_create_collection(name="rag_docs")
+    pipeline = EmbeddingPipeline(
+        None,
+        collection,
+        write_batch_size=min(CHROMA_WRITE_BATCH, chroma_client.get_max_batch_size()),
+        cache=cache,
+        model_name=model_name,
+        model_loader=lambda: load_embedding_model(model_name),
+    )
 
-    parquet_files = list_files(SILVER_FOLDER, suffix=".parquet")
+    manifest = load_local_manifest("silver_to_gold", release.manifest, full_refresh)
     processed_files = []
+    skipped_files = []
+    produced_ids = set()
+    chunk_tokens = []
     total_chunks = 0
+    reused_vectors = 0
+    metadata_updates = []
+    deleted_vectors = 0
+    io_stats = IOStats()
+
+    def candidates():
+        for obj in parquet_objects:
+            if manifest.is_unchanged(obj.object_name, obj.etag, obj.size):
+                skipped_files.append(obj.object_name)
+                continue
+            yield obj
 
-    for file in parquet_files:
-        print(f"🔍 Embedding SILVER file: {file}")
-        parquet_data = download_file(file)
-
-        with tempfile.NamedTemporaryFile(suffix=".parquet") as tmp_file:
-            tmp_file.write(parquet_data)
-            tmp_file.flush()
-
-            df = pd.read_parquet(tmp_file.name)
-
-            for _, row in df.iterrows():
-                text = row.get("content", "").strip()
-                source = row.get("file", "unknown")
-
+    try:
+        # Upcoming silver files download on the transfer pool while the current one is embedded
+        for obj, parquet_data in read_buffers(candidates(), io_stats, key=lambda obj: obj.object_name):
+            file = obj.object_name
+            digest = content_hash(parquet_data)
+            if manifest.has_content(file, digest):
+                manifest.refresh(file, obj.etag, obj.size)
+                skipped_files.append(file)
+                continue
+
+            print(f"🔍 Embedding SILVER file: {file}")
+            file_ids = set()
+            # A rebuilt silver partition still holds mostly unchanged rows; their vectors are kept as-is
+            existing_ids = existing_vector_ids(collection, file)
+            reusable_ids = set() if full_refresh else existing_ids
+            table = with_book_columns(parquet_from_buffer(parquet_data))
+
+            for row in table.select(["file", "content"] + BOOK_COLUMNS).to_pylist():
+                source = row["file"] or "unknown"
+                text = (row["content"] or "").strip()
                 if not text:
                     continue
-
-                chunks = [text[i:i+512] for i in range(0, len(text), 512)]
-                embeddings = model.encode(chunks).tolist()
-                ids = [str(uuid.uuid4()) for _ in chunks]
-
-                collection.add(
-                    documents=chunks,
-                    embeddings=embeddings,
-                    ids=ids,
-                    metadatas=[{"source": source}] * len(chunks)
-                )
-                total_chunks += len(chunks)
-
-        print(f"✅ Embedded into GOLD: {file}")
-        processed_files.append(file)
+                book_metadata = chroma_metadata(row)
+
+                for chunk in chunker.split(text):
+                    vector_id = chunk_id(source, chunk.offset, chunk.text)
+                    file_ids.add(vector_id)
+                    # Skip IDs already queued this run so a bulk upsert never repeats an ID
+                    if vector_id in produced_ids:
+                        continue
+                    produced_ids.add(vector_id)
+                    metadata = {"source": source, "silver_object": file, "chunk_offset": chunk.offset, **book_metadata}
+                    if vector_id in reusable_ids:
+                        # Same text, same vector; only the metadata is refreshed
+                        metadata_updates.append((vector_id, metadata))
+                        reused_vectors += 1
+                        continue
+                    pipeline.add(vector_id, chunk.text, metadata)
+                    chunk_tokens.append(chunk.tokens)
+                    total_chunks += 1
+
+            # Chunks are encoded and written in cross-file batches; only stale IDs are removed here
+            deleted_vectors += delete_stale_vectors(collection, existing_ids, file_ids)
+            print(f"✅ Queued for GOLD: {file}")
+            processed_files.append(file)
+            manifest.record(file, obj.etag, obj.size, digest, collection.name)
+    finally:
+        embedding_stats = pipeline.flush()
+        for start in range(0, len(metadata_updates), CHROMA_WRITE_BATCH):
+            batch = metadata_updates[start:start + CHROMA_WRITE_BATCH]
+            collection.update(ids=[vector_id for vector_id, _ in batch], metadatas=[meta for _, meta in batch])
+        if cache is not None:
+            cache.close()
 
     processed_files.sort()
+    removed_files = manifest.removed(parquet_files)
+    for file in removed_files:
+        deleted_vectors += delete_stale_vectors(collection, existing_vector_ids(collection, file), keep_ids=set())
+        manifest.drop(file)
+
+    if full_refresh:
+        # Everything was re-embedded, so any other vector (e.g. legacy random-UUID chunks) is an orphan
+        orphan_ids = [vector_id for vector_id in collection.get(include=[])["ids"] if vector_id not in produced_ids]
+        if orphan_ids:
+            collection.delete(ids=orphan_ids)
+        deleted_vectors += len(orphan_ids)
+
+    gold_changed = bool(full_refresh or processed_files or removed_files or deleted_vectors)
+    if not gold_changed:
+        # Only etags moved (content hashes matched); the published release stays current
+        save_local_manifest(manifest, served.manifest)
+        discard_release(release)
+        print(f"✅ GOLD release {served.version} is up to date")
+        return processed_files
+
+    save_local_manifest(manifest, release.manifest)
+
+    ids, documents, metadatas = collection_documents(collection)
+    keyword_index_stats = build_keyword_index(ids, documents, release.keyword_index)
+    catalog_books = save_book_catalog(metadatas, release.catalog)
+
+    vector_snapshot_stats = None
+    if VECTOR_SNAPSHOT_ENABLED:
+        vector_snapshot_stats = export_collection(collection, release.vector_snapshot, extra={"embedding_model": model_name})
+        print(f"🗺️ Vector snapshot published at {release.vector_snapshot}: {vector_snapshot_stats}")
 
     quality_metrics = {
         "total_files": len(parquet_files),
         "processed_files": len(processed_files),
+        "skipped_files": len(skipped_files),
+        "removed_files": len(removed_files),
         "total_embedding_chunks": total_chunks,
         "avg_embedding_chunks_per_file": total_chunks / len(processed_files) if processed_files else 0,
+        "reused_vectors": reused_vectors,
+        "deleted_vectors": deleted_vectors,
+        "collection_size": collection.count(),
+        "embedding": embedding_stats,
+        "chunker": chunker.name,
+        "avg_chunk_tokens": sum(chunk_tokens) / len(chunk_tokens) if chunk_tokens else 0,
+        "max_chunk_tokens": max(chunk_tokens, default=0),
+        "chunk_token_histogram": token_histogram(chunk_tokens),
+        "io": io_stats.as_dict(),
+        "keyword_index": keyword_index_stats,
+        "catalog_books": catalog_books,
+        "vector_snapshot": vector_snapshot_stats,
     }
 
+    print(f"📊 SILVER→GOLD quality metrics: {quality_metrics}")
+
     lineage_data = {
         "stage": "silver_to_gold",
         "timestamp": datetime.utcnow().isoformat(),
@@ -217,8 +599,14 @@ def etl_silver_to_gold():
         "processed_files": processed_files,
         "quality_metrics": quality_metrics,
         "embedding_model": model_name,
+        "release": release.version,
     }
 
+    save_gold_lineage(dict(lineage_data, version=release.version), release.lineage)
+    # Everything the release needs is on disk; one rename makes it the one the API serves
+    publish_release(CHROMA_DIR, release)
+    print(f"🚀 GOLD release {release.version} published")
+
     # Upload lineage data JSON to MinIO under lineage folder
     try:
         lineage_json = json.dumps(lineage_data, indent=2).encode('utf-8')
@@ -228,7 +616,7 @@ def etl_silver_to_gold():
     except Exception as e:
         print(f"❌ Failed to upload lineage data to MinIO: {e}")
 
-    print(f"🎉 GOLD embedding complete. Vector DB saved at `{CHROMA_DIR}`")
+    print(f"🎉 GOLD embedding complete. Vector DB saved at `{release.chroma}`")
     return processed_files
 
 # -----------------------------
@@ -249,29 +637,72 @@ def convert_np_types(obj):
     else:
         return obj
 
-def run_data_quality_task():
-    parquet_files = list_files(SILVER_FOLDER, suffix=".parquet")
-    dfs = []
-    for file in parquet_files:
-        parquet_data = download_file(file)
-        with tempfile.NamedTemporaryFile(suffix=".parquet") as tmp_file:
-            tmp_file.write(parquet_data)
-            tmp_file.flush()
-            df = pd.read_parquet(tmp_file.name)
-            dfs.append(df)
-
-    if dfs:
-        combined_df = pd.concat(dfs, ignore_index=True)
-    else:
-        combined_df = pd.DataFrame()
-
-    if combined_df.empty:
-        print("⚠️ Combined dataframe is empty. Skipping data quality checks.")
+def load_dq_partition_stats(full_refresh=False):
+    if full_refresh:
+        return PartitionStatsCache()
+    try:
+        data = download_file(DQ_PARTITION_STATS_PATH)
+    except S3Error as e:
+        if e.code != "NoSuchKey":
+            raise
+        data = None
+    return PartitionStatsCache.from_json(data)
+
+def scan_partitions(objects, io_stats):
+    """
+    DQ counts of silver partitions from one DuckDB query that reads them in place (httpfs against
+    MinIO, or the files of the filesystem store). Without httpfs, e.g. in an image that cannot
+    download extensions, the partitions are streamed to local files and scanned there.
+    """
+    if not objects:
+        return {}
+    try:
+        return partition_stats({obj.object_name: store.duckdb_path(obj.object_name) for obj in objects},
+                               configure=store.configure_duckdb)
+    except duckdb.Error as e:
+        print(f"⚠️ DuckDB cannot read the object store in place ({e}); downloading changed partitions")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        def fetch(obj):
+            path = os.path.join(tmp, obj.object_name.replace("/", "__"))
+            return download_object(client, MINIO_BUCKET, obj.object_name, path, io_stats)
+
+        paths = {obj.object_name: path for obj, path in store.map_ordered(fetch, objects)}
+        return partition_stats(paths, temp_directory=tmp)
+
+def run_data_quality_task(incremental=DQ_INCREMENTAL):
+    silver_objects = list_objects(SILVER_FOLDER, suffix=".parquet")
+    cache = load_dq_partition_stats(full_refresh=not incremental)
+    io_stats = IOStats()
+
+    stats = {}
+    changed = []
+    for obj in silver_objects:
+        cached = cache.get(obj.object_name, obj.etag, obj.size)
+        if cached is None:
+            changed.append(obj)
+        else:
+            stats[obj.object_name] = cached
+
+    scanned = scan_partitions(changed, io_stats)
+    for obj in changed:
+        cache.put(obj.object_name, obj.etag, obj.size, scanned[obj.object_name])
+    stats.update(scanned)
+    cache.retain([obj.object_name for obj in silver_objects])
+    print(f"📦 Data Quality input I/O: {io_stats.as_dict()} "
+          f"(scanned {len(changed)} partitions, reused {len(silver_objects) - len(changed)})")
+
+    merged = merge_stats(stats[obj.object_name] for obj in silver_objects)
+    if merged["rows"] == 0:
+        print("⚠️ Silver layer is empty. Skipping data quality checks.")
         dq_results = {}
     else:
-        dq_results = run_data_quality_checks(combined_df)
+        dq_results = build_report(merged)
         print("🧪 Data Quality Report:\n", dq_results)
 
+    if incremental:
+        upload_to_minio(cache.to_json(), DQ_PARTITION_STATS_PATH, content_type="application/json")
+
     # Convert numpy types to native python before JSON serialization
     try:
         sanitized_results = convert_np_types(dq_results)
@@ -290,7 +721,9 @@ def run_data_quality_task():
 # -----------------------------
 def run_etl_pipeline():
     bronze_files = etl_raw_to_bronze()
+    etl_compact_bronze()
     silver_files = etl_bronze_to_silver()
+    etl_compact_silver()
     gold_files = etl_silver_to_gold()
 
     dq_results = run_data_quality_task()
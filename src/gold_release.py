@@ -0,0 +1,102 @@
+import os
+import shutil
+from datetime import datetime
+from typing import Optional
+
+from keyword_index import KEYWORD_INDEX_FILE
+from structured_query import BOOK_CATALOG_FILE
+from vector_snapshot import VECTOR_SNAPSHOT_DIR, current_version, prune_versions, write_pointer
+
+
+GOLD_RELEASES_DIR = "releases"  # inside CHROMA_DIR; holds one directory per build plus the CURRENT pointer
+GOLD_RELEASES_KEEP = int(os.getenv("GOLD_RELEASES_KEEP", "2"))
+
+
+class GoldLayout:
+    """
+    File locations of one gold build. A release keeps its Chroma database in `chroma/`; the
+    legacy in-place layout has the database directly in CHROMA_DIR.
+    """
+
+    def __init__(self, base: str, chroma: Optional[str] = None, version: Optional[str] = None):
+        self.base = base
+        self.version = version
+        self.chroma = chroma or os.path.join(base, "chroma")
+        self.lineage = os.path.join(base, "gold_lineage.json")
+        self.manifest = os.path.join(base, "silver_to_gold_manifest.json")
+        self.keyword_index = os.path.join(base, KEYWORD_INDEX_FILE)
+        self.catalog = os.path.join(base, BOOK_CATALOG_FILE)
+        self.vector_snapshot = os.path.join(base, VECTOR_SNAPSHOT_DIR)
+
+
+def releases_root(root: str) -> str:
+    return os.path.join(root, GOLD_RELEASES_DIR)
+
+
+def legacy_layout(root: str) -> GoldLayout:
+    return GoldLayout(root, chroma=root)
+
+
+def published_layout(root: str) -> GoldLayout:
+    """
+    Layout of the build readers should use: the current release, or the legacy in-place build
+    when nothing has been published through the pointer yet.
+    """
+    version = current_version(releases_root(root))
+    if version is None:
+        return legacy_layout(root)
+    return GoldLayout(os.path.join(releases_root(root), version), version=version)
+
+
+def release_version(layout: GoldLayout):
+    """
+    Identity of a build: the release name, or for a legacy build the lineage file's mtime and
+    size (rewritten by every in-place rebuild). None when there is no build yet.
+    """
+    if layout.version is not None:
+        return layout.version
+    try:
+        stat = os.stat(layout.lineage)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def stage_release(root: str, previous: Optional[GoldLayout] = None) -> GoldLayout:
+    """
+    New release directory, seeded with a copy of the previous release's Chroma database and
+    manifest so an incremental build only applies the changes. Invisible to readers until published.
+    """
+    discard_unpublished(root)
+    version = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+    layout = GoldLayout(os.path.join(releases_root(root), version), version=version)
+    os.makedirs(layout.base)
+    if previous is not None and previous.version is not None:
+        shutil.copytree(previous.chroma, layout.chroma)
+        if os.path.exists(previous.manifest):
+            shutil.copy2(previous.manifest, layout.manifest)
+    return layout
+
+
+def discard_unpublished(root: str) -> None:
+    """Remove releases newer than the published one: leftovers of builds that failed before publishing."""
+    if not os.path.isdir(releases_root(root)):
+        return
+    current = current_version(releases_root(root))
+    for name in os.listdir(releases_root(root)):
+        path = os.path.join(releases_root(root), name)
+        if os.path.isdir(path) and (current is None or name > current):
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def publish_release(root: str, layout: GoldLayout, keep: int = GOLD_RELEASES_KEEP) -> None:
+    """
+    Point readers at `layout` with one atomic rename, then drop the oldest releases. The previous
+    release is kept (keep >= 2) so API workers still on it finish their queries undisturbed.
+    """
+    write_pointer(releases_root(root), layout.version)
+    prune_versions(releases_root(root), max(keep, 2))
+
+
+def discard_release(layout: GoldLayout) -> None:
+    shutil.rmtree(layout.base, ignore_errors=True)
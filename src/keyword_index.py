@@ -0,0 +1,143 @@
+import math
+import os
+import re
+import time
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+HYBRID_SEARCH = os.getenv("HYBRID_SEARCH", "true").lower() == "true"
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "20"))  # per retriever, before fusion
+RRF_K = int(os.getenv("RRF_K", "60"))
+KEYWORD_INDEX_FILE = "bm25_index.npz"
+
+TOKEN_PATTERN = re.compile(r"\d+(?:\.\d+)?|[^\W\d_]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were what "
+    "which who with book books".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercased words and numbers (prices like 51.77 stay one token), minus stopwords.
+    """
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    Compact in-memory inverted index with Okapi BM25 scoring.
+
+    Postings are stored as two flat arrays (document index, term frequency) sliced per term
+    through `offsets`, so the whole index is a handful of NumPy arrays and saves to one `.npz`.
+    """
+
+    def __init__(self, doc_ids: np.ndarray, doc_lengths: np.ndarray, terms: np.ndarray, offsets: np.ndarray,
+                 postings_docs: np.ndarray, postings_tf: np.ndarray, k1: float = 1.5, b: float = 0.75):
+        self.doc_ids = doc_ids
+        self.doc_lengths = doc_lengths
+        self.terms = terms
+        self.offsets = offsets
+        self.postings_docs = postings_docs
+        self.postings_tf = postings_tf
+        self.k1 = k1
+        self.b = b
+        self.vocabulary: Dict[str, int] = {term: i for i, term in enumerate(terms.tolist())}
+        self.avg_length = float(doc_lengths.mean()) if len(doc_lengths) else 0.0
+        # Per-document length normalization is query independent, so it is computed once
+        self._length_norm = (k1 * (1 - b + b * doc_lengths / self.avg_length)).astype(np.float32) \
+            if self.avg_length else np.zeros(0, dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    @classmethod
+    def build(cls, ids: Sequence[str], documents: Iterable[str], k1: float = 1.5, b: float = 0.75) -> "BM25Index":
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        lengths = []
+        for doc_index, text in enumerate(documents):
+            counts = Counter(tokenize(text or ""))
+            lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                postings.setdefault(term, []).append((doc_index, tf))
+
+        terms = sorted(postings)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        for i, term in enumerate(terms):
+            offsets[i + 1] = offsets[i] + len(postings[term])
+        flat = [pair for term in terms for pair in postings[term]]
+        postings_docs = np.fromiter((doc for doc, _ in flat), dtype=np.int32, count=len(flat))
+        postings_tf = np.fromiter((tf for _, tf in flat), dtype=np.int32, count=len(flat))
+        return cls(np.array(list(ids), dtype=str), np.array(lengths, dtype=np.float32), np.array(terms, dtype=str),
+                   offsets, postings_docs, postings_tf, k1, b)
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[str, float]]:
+        """
+        Top-k `(doc_id, score)` by BM25; documents sharing no term with the query are never returned.
+        """
+        if not len(self.doc_ids):
+            return []
+        scores = np.zeros(len(self.doc_ids), dtype=np.float32)
+        n_docs = len(self.doc_ids)
+        for term in set(tokenize(query)):
+            term_index = self.vocabulary.get(term)
+            if term_index is None:
+                continue
+            start, end = self.offsets[term_index], self.offsets[term_index + 1]
+            docs = self.postings_docs[start:end]
+            tf = self.postings_tf[start:end]
+            df = end - start
+            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            scores[docs] += idf * tf * (self.k1 + 1) / (tf + self._length_norm[docs])
+
+        matched = np.flatnonzero(scores)
+        if not len(matched):
+            return []
+        if len(matched) > k:
+            matched = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        ranked = matched[np.argsort(-scores[matched], kind="stable")]
+        return [(str(self.doc_ids[i]), float(scores[i])) for i in ranked]
+
+    def save(self, path: str) -> int:
+        """
+        Write the index atomically (readers never see a partial file); returns its size in bytes.
+        """
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, doc_ids=self.doc_ids, doc_lengths=self.doc_lengths, terms=self.terms,
+                 offsets=self.offsets, postings_docs=self.postings_docs, postings_tf=self.postings_tf,
+                 params=np.array([self.k1, self.b]))
+        os.replace(tmp_path, path)
+        return os.path.getsize(path)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        with np.load(path) as data:
+            k1, b = data["params"].tolist()
+            return cls(data["doc_ids"], data["doc_lengths"], data["terms"], data["offsets"],
+                       data["postings_docs"], data["postings_tf"], k1, b)
+
+    def stats(self) -> dict:
+        return {"documents": len(self.doc_ids), "terms": len(self.terms), "postings": len(self.postings_docs)}
+
+
+def load_keyword_index(path: str) -> Optional[BM25Index]:
+    if not os.path.exists(path):
+        return None
+    started = time.perf_counter()
+    index = BM25Index.load(path)
+    print(f"🔤 Loaded keyword index ({index.stats()}) in {time.perf_counter() - started:.2f}s")
+    return index
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = RRF_K) -> List[Tuple[str, float]]:
+    """
+    Merge ranked id lists: score(id) = sum over lists of 1 / (k + rank). Ties keep first-seen order.
+    """
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: -item[1])
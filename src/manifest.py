@@ -0,0 +1,87 @@
+import hashlib
+import json
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+
+MANIFEST_PREFIX = "manifests"
+
+
+def content_hash(data: bytes) -> str:
+    """
+    Return the SHA-256 hex digest used to detect unchanged object contents.
+    """
+    return hashlib.sha256(data).hexdigest()
+
+
+class StageManifest:
+    """
+    Persisted record of the inputs an ETL stage has already processed.
+
+    Each entry is keyed by input object name and stores its ETag, size, content hash,
+    the output key it produced and when it was processed. A stage uses it to skip
+    inputs that have not changed since the previous run.
+    """
+
+    def __init__(self, stage: str, entries: Optional[Dict[str, dict]] = None):
+        self.stage = stage
+        self.entries: Dict[str, dict] = entries or {}
+
+    @classmethod
+    def from_json(cls, stage: str, data: Optional[bytes]) -> "StageManifest":
+        if not data:
+            return cls(stage)
+        payload = json.loads(data.decode("utf-8"))
+        return cls(stage, payload.get("entries", {}))
+
+    def to_json(self) -> bytes:
+        payload = {
+            "stage": self.stage,
+            "updated_at": datetime.utcnow().isoformat(),
+            "entries": self.entries,
+        }
+        return json.dumps(payload, indent=2, sort_keys=True).encode("utf-8")
+
+    def is_unchanged(self, object_name: str, etag: Optional[str], size: Optional[int]) -> bool:
+        """
+        Cheap check from listing metadata only: same ETag and size as last run.
+        """
+        entry = self.entries.get(object_name)
+        return bool(entry) and entry.get("etag") == etag and entry.get("size") == size
+
+    def has_content(self, object_name: str, digest: str) -> bool:
+        """
+        Content check after download, catches re-uploads of identical data with a new ETag.
+        """
+        entry = self.entries.get(object_name)
+        return bool(entry) and entry.get("content_hash") == digest
+
+    def record(self, object_name: str, etag: Optional[str], size: Optional[int], digest: str,
+               output_key: Optional[str]) -> None:
+        self.entries[object_name] = {
+            "etag": etag,
+            "size": size,
+            "content_hash": digest,
+            "output_key": output_key,
+            "processed_at": datetime.utcnow().isoformat(),
+        }
+
+    def refresh(self, object_name: str, etag: Optional[str], size: Optional[int]) -> None:
+        """
+        Update listing metadata for an input whose content turned out to be unchanged.
+        """
+        self.entries[object_name].update({"etag": etag, "size": size})
+
+    def output_key(self, object_name: str) -> Optional[str]:
+        entry = self.entries.get(object_name)
+        return entry.get("output_key") if entry else None
+
+    def removed(self, current_objects: Iterable[str]) -> List[str]:
+        """
+        Inputs that were processed before but are no longer present upstream.
+        """
+        current = set(current_objects)
+        return sorted(name for name in self.entries if name not in current)
+
+    def drop(self, object_name: str) -> Optional[dict]:
+        return self.entries.pop(object_name, None)
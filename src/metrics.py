@@ -0,0 +1,48 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+
+class StageTimer:
+    """
+    Wall-clock seconds per named stage of one request; repeated stages accumulate.
+    """
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+        self.started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def add(self, name: str, seconds: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def as_ms(self) -> Dict[str, float]:
+        timings = {name: round(seconds * 1000, 2) for name, seconds in self.stages.items()}
+        timings["total"] = round(self.elapsed() * 1000, 2)
+        return timings
+
+
+# Timer of the request being served; code that runs for a request (e.g. embedding on a worker
+# thread started with contextvars.copy_context) records into it without having it passed along
+current_timer: ContextVar[Optional[StageTimer]] = ContextVar("current_timer", default=None)
+
+
+@contextmanager
+def timed_stage(name: str):
+    timer = current_timer.get()
+    if timer is None:
+        yield
+        return
+    with timer.stage(name):
+        yield
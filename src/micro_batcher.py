@@ -0,0 +1,83 @@
+import asyncio
+import os
+import time
+from concurrent.futures import Executor
+from typing import Any, Callable, List, Optional
+
+
+RETRIEVAL_BATCHING = os.getenv("RETRIEVAL_BATCHING", "true").lower() == "true"
+RETRIEVAL_BATCH_SIZE = int(os.getenv("RETRIEVAL_BATCH_SIZE", "32"))
+RETRIEVAL_BATCH_WAIT_MS = float(os.getenv("RETRIEVAL_BATCH_WAIT_MS", "10"))
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent requests into batches for a blocking batch function.
+
+    `submit` parks the caller until its item has been processed. A batch is dispatched once
+    `max_batch_size` items are waiting or `max_wait_ms` after its first item arrived, whichever
+    comes first. `process_batch(items)` runs on `executor` and must return one result per item;
+    if it raises, every caller in that batch gets the exception.
+    """
+
+    def __init__(self, process_batch: Callable[[List[Any]], List[Any]], max_batch_size: int = RETRIEVAL_BATCH_SIZE,
+                 max_wait_ms: float = RETRIEVAL_BATCH_WAIT_MS, executor: Optional[Executor] = None):
+        self.process_batch = process_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000
+        self.executor = executor
+        self._pending: List[tuple] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+        self.batches = 0
+        self.items = 0
+        self.max_observed_batch = 0
+        self.queue_seconds = 0.0
+
+    async def submit(self, item: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future, time.perf_counter()))
+        if len(self._pending) >= self.max_batch_size:
+            self._dispatch(loop)
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._dispatch, loop)
+        return await future
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "max_batch_size": self.max_observed_batch,
+            "avg_queue_ms": round(self.queue_seconds / self.items * 1000, 2) if self.items else 0.0,
+        }
+
+    def _dispatch(self, loop: asyncio.AbstractEventLoop) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        # Requests that timed out while queued are dropped rather than searched for
+        batch = [(item, future, queued) for item, future, queued in self._pending if not future.done()]
+        self._pending = []
+        if not batch:
+            return
+
+        now = time.perf_counter()
+        self.batches += 1
+        self.items += len(batch)
+        self.max_observed_batch = max(self.max_observed_batch, len(batch))
+        self.queue_seconds += sum(now - queued for _, _, queued in batch)
+        loop.create_task(self._run(loop, batch))
+
+    async def _run(self, loop: asyncio.AbstractEventLoop, batch: List[tuple]) -> None:
+        try:
+            results = await loop.run_in_executor(self.executor, self.process_batch, [item for item, _, _ in batch])
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future, _), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
@@ -0,0 +1,297 @@
+import hashlib
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from io import BytesIO
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from minio import Minio
+from minio.error import S3Error
+
+
+OBJECT_STORE = os.getenv("OBJECT_STORE", "minio")  # "minio" or "filesystem"
+OBJECT_STORE_ROOT = os.getenv("OBJECT_STORE_ROOT", "/opt/data/object_store")
+OBJECT_STORE_WORKERS = int(os.getenv("OBJECT_STORE_WORKERS", "8"))
+OBJECT_STORE_POOL_SIZE = int(os.getenv("OBJECT_STORE_POOL_SIZE", str(OBJECT_STORE_WORKERS * 2)))
+MULTIPART_THRESHOLD = int(os.getenv("MULTIPART_THRESHOLD", str(64 * 1024 * 1024)))
+MULTIPART_PART_SIZE = int(os.getenv("MULTIPART_PART_SIZE", str(16 * 1024 * 1024)))
+MULTIPART_PARALLEL_UPLOADS = int(os.getenv("MULTIPART_PARALLEL_UPLOADS", "4"))
+MINIO_URL = os.getenv("MINIO_URL", "localhost:9000")
+MINIO_ACCESS_KEY = os.getenv("MINIO_ACCESS_KEY", "minioadmin")
+MINIO_SECRET_KEY = os.getenv("MINIO_SECRET_KEY", "minioadmin")
+
+
+# -----------------------------
+# Filesystem stand-in for MinIO
+# -----------------------------
+def _no_such_key(bucket_name: str, object_name: str) -> S3Error:
+    return S3Error(response=None, code="NoSuchKey", message="The specified key does not exist.",
+                   resource=f"/{bucket_name}/{object_name}", request_id=None, host_id=None)
+
+
+class _FileObject:
+    def __init__(self, object_name: str, path: str):
+        stat = os.stat(path)
+        with open(path, "rb") as f:
+            self.etag = hashlib.md5(f.read()).hexdigest()
+        self.object_name = object_name
+        self.size = stat.st_size
+        self.last_modified = datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc)
+
+
+class _FileResponse:
+    def __init__(self, path: str):
+        self._file = open(path, "rb")
+
+    def read(self, amt: Optional[int] = None) -> bytes:
+        return self._file.read() if amt is None else self._file.read(amt)
+
+    def stream(self, amt: int = 32 * 1024) -> Iterator[bytes]:
+        while chunk := self._file.read(amt):
+            yield chunk
+
+    def close(self) -> None:
+        self._file.close()
+
+    def release_conn(self) -> None:
+        pass
+
+
+class FilesystemClient:
+    """
+    Local-directory stand-in implementing the subset of the `Minio` client API the pipeline uses.
+    Objects live at `<root>/<bucket>/<object_name>`; ETags are content MD5s like single-part S3 uploads.
+    """
+
+    def __init__(self, root: str = OBJECT_STORE_ROOT):
+        self.root = root
+
+    def _path(self, bucket_name: str, object_name: str = "") -> str:
+        return os.path.join(self.root, bucket_name, object_name)
+
+    def bucket_exists(self, bucket_name: str) -> bool:
+        return os.path.isdir(self._path(bucket_name))
+
+    def make_bucket(self, bucket_name: str) -> None:
+        os.makedirs(self._path(bucket_name), exist_ok=True)
+
+    def put_object(self, bucket_name: str, object_name: str, data, length: int,
+                   content_type: str = "application/octet-stream", part_size: int = 0, **kwargs) -> None:
+        path = self._path(bucket_name, object_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            remaining = length
+            while remaining != 0:
+                chunk = data.read(min(remaining, 1024 * 1024) if remaining > 0 else 1024 * 1024)
+                if not chunk:
+                    break
+                f.write(chunk)
+                remaining -= len(chunk) if remaining > 0 else 0
+        os.replace(tmp_path, path)  # readers never see a half-written object
+
+    def get_object(self, bucket_name: str, object_name: str) -> _FileResponse:
+        path = self._path(bucket_name, object_name)
+        if not os.path.isfile(path):
+            raise _no_such_key(bucket_name, object_name)
+        return _FileResponse(path)
+
+    def stat_object(self, bucket_name: str, object_name: str) -> _FileObject:
+        path = self._path(bucket_name, object_name)
+        if not os.path.isfile(path):
+            raise _no_such_key(bucket_name, object_name)
+        return _FileObject(object_name, path)
+
+    def remove_object(self, bucket_name: str, object_name: str) -> None:
+        try:
+            os.remove(self._path(bucket_name, object_name))
+        except FileNotFoundError:
+            pass  # S3 deletes are idempotent
+
+    def list_objects(self, bucket_name: str, prefix: str = "", recursive: bool = False) -> Iterator[_FileObject]:
+        base = self._path(bucket_name)
+        names = []
+        for dirpath, _, filenames in os.walk(base):
+            for filename in filenames:
+                if filename.endswith(".tmp"):
+                    continue
+                name = os.path.relpath(os.path.join(dirpath, filename), base).replace(os.sep, "/")
+                if name.startswith(prefix):
+                    names.append(name)
+        for name in sorted(names):  # S3 lists keys in lexical order
+            yield _FileObject(name, self._path(bucket_name, name))
+
+
+# -----------------------------
+# Pooled client + concurrent transfers
+# -----------------------------
+def _sql_literal(text: str) -> str:
+    return "'" + text.replace("'", "''") + "'"
+
+
+def create_client(backend: str = OBJECT_STORE):
+    """
+    Build the storage client: a `Minio` client on a tuned keep-alive connection pool,
+    or the filesystem stand-in when OBJECT_STORE=filesystem.
+    """
+    if backend == "filesystem":
+        return FilesystemClient(OBJECT_STORE_ROOT)
+    if backend != "minio":
+        raise ValueError(f"Unknown object store backend: {backend}")
+
+    import urllib3
+
+    http_client = urllib3.PoolManager(
+        num_pools=4,
+        maxsize=OBJECT_STORE_POOL_SIZE,
+        block=True,  # wait for a free connection instead of opening throwaway ones
+        timeout=urllib3.Timeout(connect=10, read=300),
+        retries=urllib3.Retry(total=5, backoff_factor=0.2, status_forcelist=[500, 502, 503, 504]),
+    )
+    return Minio(
+        MINIO_URL,
+        access_key=MINIO_ACCESS_KEY,
+        secret_key=MINIO_SECRET_KEY,
+        secure=False,
+        http_client=http_client,
+    )
+
+
+class ObjectStore:
+    """
+    Shared object-store access for every pipeline stage: one pooled client, streaming listings,
+    concurrent GET/PUT on a thread pool and multipart uploads for large objects.
+    """
+
+    def __init__(self, client, bucket: str, workers: int = OBJECT_STORE_WORKERS):
+        self.client = client
+        self.bucket = bucket
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="object-store")
+
+    def ensure_bucket(self) -> None:
+        if not self.client.bucket_exists(self.bucket):
+            self.client.make_bucket(self.bucket)
+
+    def iter_objects(self, prefix: str, suffix: str = "") -> Iterator:
+        """
+        Lazily yield objects under `prefix` in key order, so processing starts with the first page.
+        """
+        for obj in self.client.list_objects(self.bucket, prefix=prefix, recursive=True):
+            if obj.object_name.endswith(suffix):
+                yield obj
+
+    def list_objects(self, prefix: str, suffix: str = "") -> List:
+        return list(self.iter_objects(prefix, suffix))
+
+    def duckdb_path(self, object_name: str) -> str:
+        """
+        Where DuckDB reads the object from in place: the file itself for the filesystem stand-in,
+        otherwise an s3:// URL served through httpfs (see `configure_duckdb`).
+        """
+        if isinstance(self.client, FilesystemClient):
+            return self.client._path(self.bucket, object_name)
+        return f"s3://{self.bucket}/{object_name}"
+
+    def configure_duckdb(self, con) -> None:
+        """
+        Point a DuckDB connection's httpfs S3 reader at MinIO. Raises duckdb.Error when the
+        extension is neither installed nor downloadable.
+        """
+        if isinstance(self.client, FilesystemClient):
+            return
+        con.execute("INSTALL httpfs")
+        con.execute("LOAD httpfs")
+        con.execute(f"CREATE SECRET object_store (TYPE s3, KEY_ID {_sql_literal(MINIO_ACCESS_KEY)}, "
+                    f"SECRET {_sql_literal(MINIO_SECRET_KEY)}, ENDPOINT {_sql_literal(MINIO_URL)}, "
+                    f"URL_STYLE 'path', USE_SSL false, REGION 'us-east-1')")
+
+    def get(self, object_name: str) -> bytes:
+        response = self.client.get_object(self.bucket, object_name)
+        try:
+            return response.read()
+        finally:
+            response.close()
+            response.release_conn()
+
+    def get_many(self, object_names: Iterable[str], window: Optional[int] = None) -> Iterator[Tuple[str, bytes]]:
+        """
+        Download objects concurrently and yield `(name, data)` in input order.
+        """
+        return self.map_ordered(self.get, object_names, window)
+
+    def map_ordered(self, fn, items: Iterable, window: Optional[int] = None) -> Iterator[Tuple]:
+        """
+        Run `fn(item)` on the transfer pool and yield `(item, result)` in input order.
+        At most `window` calls are in flight, so memory stays bounded and a lazy input
+        (e.g. a streaming listing) is consumed as processing moves along.
+        """
+        window = window or self.workers * 2
+        pending = deque()
+        for item in items:
+            pending.append((item, self._executor.submit(fn, item)))
+            if len(pending) >= window:
+                done_item, future = pending.popleft()
+                yield done_item, future.result()
+        while pending:
+            done_item, future = pending.popleft()
+            yield done_item, future.result()
+
+    def put(self, object_name: str, data, length: Optional[int] = None,
+            content_type: str = "application/octet-stream") -> None:
+        """
+        Upload bytes or a readable stream; objects above MULTIPART_THRESHOLD (or of unknown length)
+        go up as parallel multipart uploads.
+        """
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            length = len(data)
+            data = BytesIO(data)
+        length = -1 if length is None else length
+        if length < 0 or length > MULTIPART_THRESHOLD:
+            self.client.put_object(self.bucket, object_name, data, length, content_type=content_type,
+                                   part_size=MULTIPART_PART_SIZE, num_parallel_uploads=MULTIPART_PARALLEL_UPLOADS)
+        else:
+            self.client.put_object(self.bucket, object_name, data, length, content_type=content_type)
+
+    def submit_put(self, object_name: str, data, length: Optional[int] = None,
+                   content_type: str = "application/octet-stream"):
+        """
+        Queue an upload on the transfer pool and return its future.
+        """
+        return self._executor.submit(self.put, object_name, data, length, content_type)
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Run any transfer callable (e.g. a parquet write) on the transfer pool.
+        """
+        return self._executor.submit(fn, *args, **kwargs)
+
+    def remove(self, object_name: str) -> None:
+        self.client.remove_object(self.bucket, object_name)
+
+    def exists(self, object_name: str) -> bool:
+        try:
+            self.client.stat_object(self.bucket, object_name)
+        except S3Error as e:
+            if e.code == "NoSuchKey":
+                return False
+            raise
+        return True
+
+
+_store: Optional[ObjectStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> ObjectStore:
+    """
+    Process-wide shared store (one connection pool and transfer pool per process).
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ObjectStore(create_client(), os.getenv("MINIO_BUCKET", "mydata"))
+            _store.ensure_bucket()
+        return _store
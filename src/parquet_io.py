@@ -0,0 +1,150 @@
+import hashlib
+import os
+import threading
+import time
+from typing import List, Optional, Union
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from minio import Minio
+
+
+class IOStats:
+    """
+    Bytes and wall time moved to and from object storage by one ETL stage.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()  # transfers may run on a thread pool
+        self.objects_read = 0
+        self.objects_written = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.read_seconds = 0.0
+        self.write_seconds = 0.0
+
+    def add_read(self, nbytes: int, seconds: float) -> None:
+        with self._lock:
+            self.objects_read += 1
+            self.bytes_read += nbytes
+            self.read_seconds += seconds
+
+    def add_write(self, nbytes: int, seconds: float) -> None:
+        with self._lock:
+            self.objects_written += 1
+            self.bytes_written += nbytes
+            self.write_seconds += seconds
+
+    def as_dict(self) -> dict:
+        return {
+            "objects_read": self.objects_read,
+            "objects_written": self.objects_written,
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+            "read_seconds": round(self.read_seconds, 3),
+            "write_seconds": round(self.write_seconds, 3),
+            "read_mb_per_sec": round(self.bytes_read / 1e6 / self.read_seconds, 2) if self.read_seconds else 0.0,
+            "write_mb_per_sec": round(self.bytes_written / 1e6 / self.write_seconds, 2) if self.write_seconds else 0.0,
+        }
+
+
+def read_object_buffer(client: Minio, bucket: str, object_name: str, stats: Optional[IOStats] = None) -> pa.Buffer:
+    """
+    Read an object straight into an Arrow buffer (no temp file, no extra copy when parsed).
+    """
+    started = time.perf_counter()
+    response = client.get_object(bucket, object_name)
+    try:
+        buffer = pa.py_buffer(response.read())
+    finally:
+        response.close()
+        response.release_conn()
+
+    if stats is not None:
+        stats.add_read(buffer.size, time.perf_counter() - started)
+    return buffer
+
+
+def download_object(client: Minio, bucket: str, object_name: str, path: str, stats: Optional[IOStats] = None,
+                    chunk_size: int = 1024 * 1024) -> str:
+    """
+    Stream an object to a local file a chunk at a time, for readers that scan files (DuckDB)
+    without the object ever being held in memory whole.
+    """
+    started = time.perf_counter()
+    size = 0
+    response = client.get_object(bucket, object_name)
+    try:
+        with open(path, "wb") as f:
+            for chunk in response.stream(chunk_size):
+                f.write(chunk)
+                size += len(chunk)
+    finally:
+        response.close()
+        response.release_conn()
+
+    if stats is not None:
+        stats.add_read(size, time.perf_counter() - started)
+    return path
+
+
+def parquet_from_buffer(buffer: pa.Buffer, columns: Optional[List[str]] = None) -> pa.Table:
+    return pq.read_table(pa.BufferReader(buffer), columns=columns)
+
+
+def read_parquet_object(client: Minio, bucket: str, object_name: str, columns: Optional[List[str]] = None,
+                        stats: Optional[IOStats] = None) -> pa.Table:
+    return parquet_from_buffer(read_object_buffer(client, bucket, object_name, stats), columns)
+
+
+def write_parquet_object(client: Minio, bucket: str, object_name: str, data: Union[pa.Table, pd.DataFrame],
+                         stats: Optional[IOStats] = None, **write_options) -> int:
+    """
+    Serialize a table to an in-memory Arrow sink and stream it to MinIO from that buffer,
+    skipping the BytesIO round trip. Returns the object size in bytes.
+    """
+    started = time.perf_counter()
+    buffer = serialize_parquet(data, **write_options)
+    client.put_object(
+        bucket_name=bucket,
+        object_name=object_name,
+        data=pa.BufferReader(buffer),
+        length=buffer.size,
+        content_type="application/octet-stream",
+    )
+
+    if stats is not None:
+        stats.add_write(buffer.size, time.perf_counter() - started)
+    return buffer.size
+
+
+def serialize_parquet(data: Union[pa.Table, pd.DataFrame], **write_options) -> pa.Buffer:
+    table = pa.Table.from_pandas(data, preserve_index=False) if isinstance(data, pd.DataFrame) else data
+    sink = pa.BufferOutputStream()
+    pq.write_table(table, sink, **write_options)
+    return sink.getvalue()
+
+
+def record_key(object_name: str) -> str:
+    """
+    Layer-independent key of a record: `raw/x.txt`, `bronze/x.parquet` and `silver/x.parquet` all map to `x`.
+    """
+    relative = object_name.split("/", 1)[1] if "/" in object_name else object_name
+    return os.path.splitext(relative)[0]
+
+
+def partition_for(object_name: str, partitions: int) -> int:
+    """
+    Stable hash partition of a record; the same raw file always lands in the same partition.
+    """
+    digest = hashlib.md5(record_key(object_name).encode("utf-8")).hexdigest()
+    return int(digest[:8], 16) % partitions
+
+
+def partition_path(folder: str, partition: int) -> str:
+    return f"{folder}/part-{partition:05d}.parquet"
+
+
+def is_partition_file(object_name: str) -> bool:
+    return os.path.basename(object_name).startswith("part-")
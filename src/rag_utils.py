@@ -1,30 +1,26 @@
 import os
 import json
+import threading
+import time
 from datetime import datetime
 from io import BytesIO
 from typing import List, Optional, Dict, Any
 from minio import Minio
 import requests
 
+from object_store import get_store
+
 
 LINEAGE_PREFIX = "lineage"
 
 
 def get_minio_client() -> tuple[Minio, str]:
     """
-    Initialize and return a MinIO client and bucket name from environment variables.
+    Return the process-wide pooled storage client and bucket name (see object_store.get_store).
     Creates bucket if it doesn't exist.
     """
-    url = os.getenv("MINIO_URL", "localhost:9000")
-    access_key = os.getenv("MINIO_ACCESS_KEY", "minioadmin")
-    secret_key = os.getenv("MINIO_SECRET_KEY", "minioadmin")
-    bucket = os.getenv("MINIO_BUCKET", "mydata")
-
-    client = Minio(url, access_key=access_key, secret_key=secret_key, secure=False)
-    if not client.bucket_exists(bucket):
-        client.make_bucket(bucket)
-
-    return client, bucket
+    store = get_store()
+    return store.client, store.bucket
 
 
 def upload_to_minio(client: Minio, data: bytes, object_name: str, content_type: str = "application/octet-stream") -> None:
@@ -61,16 +57,61 @@ def emit_lineage(client: Minio, stage: str, processed_files: List[str], quality_
     print(f"✅ Lineage for stage '{stage}' uploaded to MinIO as '{object_name}'")
 
 
-def safe_get(url: str, headers: Optional[dict] = None, retries: int = 3, timeout: int = 10) -> Optional["requests.Response"]:
+def build_http_session(pool_size: int = 10, headers: Optional[dict] = None) -> "requests.Session":
+    """
+    Create a requests Session with a keep-alive connection pool sized for `pool_size` concurrent requests.
+    """
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    if headers:
+        session.headers.update(headers)
+    return session
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket rate limiter: allows `rate` requests per second with bursts up to `capacity`.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[int] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1, int(rate))
+        self._tokens = float(self.capacity)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """
+        Block until a token is available, then consume it.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def safe_get(url: str, headers: Optional[dict] = None, retries: int = 3, timeout: int = 10, session: Optional["requests.Session"] = None) -> Optional["requests.Response"]:
     """
     Perform HTTP GET request with retries, returns Response or None if failed.
+    Uses `session` (keep-alive pooled connections) when given, otherwise a one-off `requests.get`.
     """
     import requests
     from requests.exceptions import RequestException
 
+    getter = session.get if session is not None else requests.get
     for attempt in range(1, retries + 1):
         try:
-            response = requests.get(url, headers=headers, timeout=timeout)
+            response = getter(url, headers=headers, timeout=timeout)
             if response.status_code == 200:
                 return response
             else:
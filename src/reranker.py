@@ -0,0 +1,121 @@
+import os
+import threading
+import time
+from typing import List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "false").lower() == "true"
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "30"))  # k fetched from retrieval before reranking
+RERANK_TOP_N = int(os.getenv("RERANK_TOP_N", "3"))  # documents kept for the prompt
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "16"))
+RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", "250"))
+
+
+class RerankResult(NamedTuple):
+    order: List[int]  # indices into the candidates, best first
+    scores: List[Optional[float]]  # cross-encoder score per returned index; None where not scored
+    scored: int
+    elapsed_ms: float
+    skipped: bool  # True when the budget left no time to score anything
+
+
+class Reranker:
+    """
+    Cross-encoder reranking of retrieval candidates on CPU.
+
+    (query, document) pairs are scored in batches of `batch_size`. Before each batch the cost is
+    predicted from the average per-pair time seen so far; once the next batch would overrun
+    `budget_ms`, scoring stops. Scored candidates are ranked by score and the rest keep their
+    retrieval order after them, so an exhausted budget degrades to plain retrieval order.
+    """
+
+    def __init__(self, model_name: str = RERANK_MODEL, model=None, batch_size: int = RERANK_BATCH_SIZE,
+                 budget_ms: float = RERANK_BUDGET_MS):
+        self.model_name = model_name
+        self.batch_size = max(1, batch_size)
+        self.budget = budget_ms / 1000
+        self._model = model
+        self._lock = threading.Lock()
+
+        self.reranks = 0
+        self.skipped = 0
+        self.truncated = 0
+        self.candidates = 0
+        self.pairs_scored = 0
+        self.score_seconds = 0.0
+        self.rerank_seconds = 0.0
+        self.max_seconds = 0.0
+
+    @property
+    def model(self):
+        if self._model is None:
+            from sentence_transformers import CrossEncoder
+
+            self._model = CrossEncoder(self.model_name, device="cpu")
+        return self._model
+
+    def warm_up(self) -> float:
+        """
+        Load the model and score one dummy batch; returns the seconds it took. The warm-up
+        batch also seeds the per-pair cost estimate used for the budget.
+        """
+        started = time.perf_counter()
+        self.model  # model load time must not count towards the per-pair estimate
+        pairs = [("warm up", "warm up")] * self.batch_size
+        batch_started = time.perf_counter()
+        self._predict(pairs)
+        with self._lock:
+            self.pairs_scored += len(pairs)
+            self.score_seconds += time.perf_counter() - batch_started
+        return time.perf_counter() - started
+
+    def rerank(self, query: str, documents: Sequence[str], top_n: int = RERANK_TOP_N) -> RerankResult:
+        started = time.perf_counter()
+        deadline = started + self.budget
+        scores = []
+        for start in range(0, len(documents), self.batch_size):
+            batch = [(query, doc or "") for doc in documents[start:start + self.batch_size]]
+            if time.perf_counter() + self._per_pair_seconds() * len(batch) > deadline:
+                break
+            batch_started = time.perf_counter()
+            scores.extend(float(score) for score in self._predict(batch))
+            with self._lock:
+                self.pairs_scored += len(batch)
+                self.score_seconds += time.perf_counter() - batch_started
+
+        ranked = sorted(range(len(scores)), key=lambda i: -scores[i]) + list(range(len(scores), len(documents)))
+        order = ranked[:top_n]
+        skipped = not scores and bool(documents)
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.reranks += 1
+            self.candidates += len(documents)
+            self.skipped += skipped
+            self.truncated += 0 < len(scores) < len(documents)
+            self.rerank_seconds += elapsed
+            self.max_seconds = max(self.max_seconds, elapsed)
+        return RerankResult(order, [scores[i] if i < len(scores) else None for i in order], len(scores),
+                            round(elapsed * 1000, 2), skipped)
+
+    def stats(self) -> dict:
+        return {
+            "model": self.model_name,
+            "reranks": self.reranks,
+            "skipped": self.skipped,
+            "truncated": self.truncated,
+            "avg_candidates": round(self.candidates / self.reranks, 2) if self.reranks else 0.0,
+            "avg_pair_ms": round(self._per_pair_seconds() * 1000, 3),
+            "avg_rerank_ms": round(self.rerank_seconds / self.reranks * 1000, 2) if self.reranks else 0.0,
+            "max_rerank_ms": round(self.max_seconds * 1000, 2),
+            "budget_ms": round(self.budget * 1000, 1),
+        }
+
+    def _per_pair_seconds(self) -> float:
+        return self.score_seconds / self.pairs_scored if self.pairs_scored else 0.0
+
+    def _predict(self, pairs: List[tuple]) -> np.ndarray:
+        return np.asarray(self.model.predict(pairs, batch_size=self.batch_size, convert_to_numpy=True,
+                                             show_progress_bar=False)).ravel()
@@ -1,10 +1,14 @@
+import os
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timezone
 from io import BytesIO
+from urllib.parse import urlparse
 from bs4 import BeautifulSoup
 from requests.exceptions import RequestException
 
-from rag_utils import get_minio_client, safe_get
+from rag_utils import get_minio_client, safe_get, build_http_session, TokenBucket
 
 BASE_URL = "https://books.toscrape.com"
 START_URL = f"{BASE_URL}/catalogue/page-1.html"
@@ -12,15 +16,25 @@ MAX_BOOKS = 50
 HEADERS = {"User-Agent": "Mozilla/5.0"}
 RAW_FOLDER = "raw"
 
+# Concurrent mode settings ("sequential" keeps the original one-request-at-a-time behaviour)
+SCRAPER_MODE = os.getenv("SCRAPER_MODE", "sequential")
+SCRAPER_WORKERS = int(os.getenv("SCRAPER_WORKERS", "8"))
+SCRAPER_MAX_PER_HOST = int(os.getenv("SCRAPER_MAX_PER_HOST", "4"))
+SCRAPER_RATE_LIMIT = float(os.getenv("SCRAPER_RATE_LIMIT", "5"))  # requests per second
+SCRAPER_TIMEOUT = 10  # seconds per request
+# Statuses that will not change on a retry (e.g. catalogue pages past the last one)
+FINAL_STATUSES = {404, 410}
+BOOKS_PER_PAGE = 20
+
 client, MINIO_BUCKET = get_minio_client()
 
 MAX_RETRIES = 5
 RETRY_BACKOFF = [1, 2, 4, 8, 16]  # Backoff durations in seconds
 
-def safe_get_with_retries(url: str, headers: dict, retries: int = MAX_RETRIES) -> str | None:
+def safe_get_with_retries(url: str, headers: dict, retries: int = MAX_RETRIES, session=None) -> str | None:
     for attempt in range(retries):
         try:
-            response = safe_get(url, headers=headers)
+            response = safe_get(url, headers=headers, session=session)
             if response:
                 return response
             else:
@@ -44,15 +58,12 @@ def get_book_links(max_books: int = MAX_BOOKS) -> list[str]:
             print("❌ Failed to get page, stopping.")
             break
 
-        soup = BeautifulSoup(res.text, "html.parser")
-        articles = soup.select("article.product_pod")
+        page_links = parse_book_links(res.text)
 
-        if not articles:
+        if not page_links:
             break  # No more books/pages
 
-        for book in articles:
-            href = book.find("a")["href"]
-            full_link = BASE_URL + "/catalogue/" + href.strip().replace('../../../', '')
+        for full_link in page_links:
             book_links.append(full_link)
             if len(book_links) >= max_books:
                 break
@@ -62,12 +73,23 @@ def get_book_links(max_books: int = MAX_BOOKS) -> list[str]:
 
     return book_links
 
+def parse_book_links(html: str, base_url: str = BASE_URL) -> list[str]:
+    soup = BeautifulSoup(html, "html.parser")
+    links = []
+    for book in soup.select("article.product_pod"):
+        href = book.find("a")["href"]
+        links.append(base_url + "/catalogue/" + href.strip().replace('../../../', ''))
+    return links
+
 def download_book_details(book_url: str) -> dict | None:
     res = safe_get_with_retries(book_url, headers=HEADERS)
     if not res:
         return None
 
-    soup = BeautifulSoup(res.text, "html.parser")
+    return parse_book_details(res.text, book_url)
+
+def parse_book_details(html: str, book_url: str) -> dict:
+    soup = BeautifulSoup(html, "html.parser")
 
     title_tag = soup.select_one("div.product_main h1")
     price_tag = soup.select_one("p.price_color")
@@ -87,7 +109,44 @@ def download_book_details(book_url: str) -> dict | None:
         "link": book_url,
     }
 
+def upload_book_record(data: dict, index: int, timestamp: str) -> dict | None:
+    content = (
+        f"Title: {data['title']}\n"
+        f"Price: {data['price']}\n"
+        f"Availability: {data['availability']}\n"
+        f"Link: {data['link']}\n\n"
+        f"{data['description']}"
+    )
+    object_name = f"{RAW_FOLDER}/toscrape_{timestamp}_{index}.txt"
+
+    try:
+        content_bytes = content.encode("utf-8")
+        content_stream = BytesIO(content_bytes)
+
+        client.put_object(
+            bucket_name=MINIO_BUCKET,
+            object_name=object_name,
+            data=content_stream,
+            length=len(content_bytes),
+            content_type="text/plain",
+        )
+        print(f"[{index}] ✅ Uploaded {object_name} to MinIO")
+
+        return {
+            "title": data["title"],
+            "price": data["price"],
+            "availability": data["availability"],
+            "link": data["link"],
+            "minio_object": object_name,
+        }
+    except Exception as e:
+        print(f"[{index}] ❌ Failed to upload: {e}")
+        return None
+
 def scrape_books_to_minio() -> list[dict]:
+    if SCRAPER_MODE == "concurrent":
+        return scrape_books_to_minio_concurrent()
+
     print("📘 Starting scrape from books.toscrape.com...")
     links = get_book_links(MAX_BOOKS)
     timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
@@ -100,44 +159,128 @@ def scrape_books_to_minio() -> list[dict]:
             print("⚠️ Skipping due to missing data.")
             continue
 
-        content = (
-            f"Title: {data['title']}\n"
-            f"Price: {data['price']}\n"
-            f"Availability: {data['availability']}\n"
-            f"Link: {data['link']}\n\n"
-            f"{data['description']}"
-        )
-        object_name = f"{RAW_FOLDER}/toscrape_{timestamp}_{i}.txt"
-
-        try:
-            content_bytes = content.encode("utf-8")
-            content_stream = BytesIO(content_bytes)
-
-            client.put_object(
-                bucket_name=MINIO_BUCKET,
-                object_name=object_name,
-                data=content_stream,
-                length=len(content_bytes),
-                content_type="text/plain",
-            )
-            print(f"[{i}] ✅ Uploaded {object_name} to MinIO")
-
-            records.append(
-                {
-                    "title": data["title"],
-                    "price": data["price"],
-                    "availability": data["availability"],
-                    "link": data["link"],
-                    "minio_object": object_name,
-                }
-            )
-        except Exception as e:
-            print(f"[{i}] ❌ Failed to upload: {e}")
+        record = upload_book_record(data, i, timestamp)
+        if record:
+            records.append(record)
 
         time.sleep(1)
 
     print("✅ Done scraping and uploading.")
     return records
 
+# -----------------------------
+# Concurrent scraping mode
+# -----------------------------
+class ConcurrentFetcher:
+    """
+    Shared keep-alive HTTP session with a per-host in-flight cap and a token-bucket rate limit.
+    Safe to call `fetch` from many worker threads at once.
+    """
+
+    def __init__(self, max_per_host: int = SCRAPER_MAX_PER_HOST, rate_limit: float = SCRAPER_RATE_LIMIT,
+                 pool_size: int = SCRAPER_WORKERS):
+        self.session = build_http_session(pool_size=pool_size, headers=HEADERS)
+        self.rate_limiter = TokenBucket(rate_limit)
+        self.max_per_host = max_per_host
+        self._host_slots: dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def _slot(self, url: str) -> threading.BoundedSemaphore:
+        host = urlparse(url).netloc
+        with self._lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.max_per_host)
+            return self._host_slots[host]
+
+    def fetch(self, url: str, retries: int = MAX_RETRIES):
+        """
+        GET `url`, retrying with backoff. Every attempt takes a rate-limit token and a host slot,
+        and the slot is released while backing off; a final status such as 404 is not retried.
+        """
+        slot = self._slot(url)
+        for attempt in range(retries):
+            with slot:
+                self.rate_limiter.acquire()
+                try:
+                    response = self.session.get(url, timeout=SCRAPER_TIMEOUT)
+                except RequestException as e:
+                    print(f"❌ Attempt {attempt + 1} error for {url}: {e}")
+                    response = None
+            if response is not None:
+                if response.status_code == 200:
+                    return response
+                print(f"⚠️ HTTP {response.status_code} for {url}")
+                if response.status_code in FINAL_STATUSES:
+                    return None
+            if attempt + 1 < retries:
+                backoff_time = RETRY_BACKOFF[min(attempt, len(RETRY_BACKOFF) - 1)]
+                print(f"⏳ Retrying {url} in {backoff_time} seconds...")
+                time.sleep(backoff_time)
+        return None
+
+    def close(self) -> None:
+        self.session.close()
+
+def get_book_links_concurrent(fetcher: ConcurrentFetcher, max_books: int = MAX_BOOKS,
+                              base_url: str = BASE_URL, workers: int = SCRAPER_WORKERS) -> list[str]:
+    book_links = []
+    next_page = 1
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while len(book_links) < max_books:
+            # Fetch just enough catalogue pages in parallel to cover the remaining books
+            remaining_pages = -(-(max_books - len(book_links)) // BOOKS_PER_PAGE)
+            pages = list(range(next_page, next_page + remaining_pages))
+            next_page += remaining_pages
+
+            responses = executor.map(lambda p: fetcher.fetch(f"{base_url}/catalogue/page-{p}.html"), pages)
+
+            exhausted = False
+            for res in responses:  # map preserves page order
+                page_links = parse_book_links(res.text, base_url) if res else []
+                if not page_links:
+                    exhausted = True
+                    break
+                book_links.extend(page_links)
+
+            if exhausted:
+                break
+
+    return book_links[:max_books]
+
+def scrape_books_to_minio_concurrent(max_books: int = MAX_BOOKS, base_url: str = BASE_URL,
+                                     workers: int = SCRAPER_WORKERS,
+                                     max_per_host: int = SCRAPER_MAX_PER_HOST,
+                                     rate_limit: float = SCRAPER_RATE_LIMIT) -> list[dict]:
+    print(f"📘 Starting concurrent scrape from {base_url} ({workers} workers, {rate_limit} req/s)...")
+    fetcher = ConcurrentFetcher(max_per_host=max_per_host, rate_limit=rate_limit, pool_size=workers)
+    timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    started = time.monotonic()
+
+    def fetch_and_upload(index: int, link: str) -> dict | None:
+        # Each record is uploaded as soon as it is parsed, no waiting for the whole batch
+        res = fetcher.fetch(link)
+        if not res:
+            print(f"[{index}] ⚠️ Skipping due to missing data.")
+            return None
+        return upload_book_record(parse_book_details(res.text, link), index, timestamp)
+
+    try:
+        links = get_book_links_concurrent(fetcher, max_books, base_url, workers)
+        records = []
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(fetch_and_upload, i, link): i for i, link in enumerate(links)}
+            for future in as_completed(futures):
+                record = future.result()
+                if record:
+                    records.append((futures[future], record))
+    finally:
+        fetcher.close()
+
+    records.sort(key=lambda item: item[0])
+    elapsed = time.monotonic() - started
+    print(f"✅ Done scraping and uploading {len(records)}/{len(links)} books in {elapsed:.1f}s.")
+    return [record for _, record in records]
+
 if __name__ == "__main__":
     scrape_books_to_minio()
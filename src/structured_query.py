@@ -0,0 +1,187 @@
+import json
+import os
+import re
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+
+STRUCTURED_ANSWERS = os.getenv("STRUCTURED_ANSWERS", "true").lower() == "true"
+BOOK_CATALOG_FILE = "book_catalog.json"
+DEFAULT_LIST_LIMIT = 10
+
+_NUMBER = r"[£$€]?\s*(\d+(?:\.\d+)?)"
+SORT_DESC = re.compile(r"\b(most expensive|priciest|costliest|highest[- ]priced|highest price|most costly)\b")
+SORT_ASC = re.compile(r"\b(cheapest|least expensive|lowest[- ]priced|lowest price|most affordable)\b")
+BETWEEN = re.compile(rf"\bbetween\s*{_NUMBER}\s*(?:and|-)\s*{_NUMBER}")
+UNDER = re.compile(rf"\b(?:under|below|less than|cheaper than|at most|up to)\s*{_NUMBER}")
+OVER = re.compile(rf"\b(?:over|above|more than|at least|pricier than|more expensive than)\s*{_NUMBER}")
+OUT_OF_STOCK = re.compile(r"\b(out of stock|sold out|unavailable|not available)\b")
+IN_STOCK = re.compile(r"\b(in stock|available)\b")
+COUNT = re.compile(r"\b(how many|number of|count)\b")
+TOP_N = re.compile(r"\b(?:top|first)\s+(\d+)\b|\b(\d+)\s+(?=most|cheapest|least|priciest|costliest|highest|lowest)")
+# Words that carry no subject matter; a question made only of these plus the patterns above is tabular
+FILLER = frozenset(
+    "what which who is are the a an book books title titles list show me all of in our your store shop catalog "
+    "catalogue give find price prices priced cost costs that with and there do does we you have has sell sold "
+    "one ones whose for tell please currently right now items item s".split()
+)
+
+
+class QueryFilters(NamedTuple):
+    price_min: Optional[float] = None
+    price_max: Optional[float] = None
+    in_stock: Optional[bool] = None
+
+    def is_empty(self) -> bool:
+        return self.price_min is None and self.price_max is None and self.in_stock is None
+
+
+class TabularQuery(NamedTuple):
+    filters: QueryFilters
+    sort: Optional[str]  # "asc" | "desc" by price
+    limit: Optional[int]
+    count: bool
+
+
+def build_where(filters: Optional[QueryFilters]) -> Optional[dict]:
+    """
+    Chroma `where` clause over the book metadata written by the gold stage.
+    """
+    if filters is None:
+        return None
+    clauses = []
+    if filters.price_min is not None:
+        clauses.append({"price": {"$gte": filters.price_min}})
+    if filters.price_max is not None:
+        clauses.append({"price": {"$lte": filters.price_max}})
+    if filters.in_stock is not None:
+        clauses.append({"in_stock": filters.in_stock})
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def matches_filters(metadata: Optional[dict], filters: Optional[QueryFilters]) -> bool:
+    if filters is None or filters.is_empty():
+        return True
+    metadata = metadata or {}
+    price = metadata.get("price")
+    if filters.price_min is not None and (price is None or price < filters.price_min):
+        return False
+    if filters.price_max is not None and (price is None or price > filters.price_max):
+        return False
+    if filters.in_stock is not None and metadata.get("in_stock") is not filters.in_stock:
+        return False
+    return True
+
+
+def parse_tabular_question(question: str) -> Optional[TabularQuery]:
+    """
+    Recognize questions answerable from the book table alone ("cheapest book", "books under £20",
+    "how many books are in stock"). Returns None when any subject-matter word remains, since those
+    need retrieval and the LLM.
+    """
+    text = question.lower()
+    matched = False
+    price_min = price_max = in_stock = sort = limit = None
+
+    def consume(pattern):
+        nonlocal text, matched
+        match = pattern.search(text)
+        if match:
+            text = text[:match.start()] + " " + text[match.end():]
+            matched = True
+        return match
+
+    # Before the sort phrases are consumed: "5 cheapest books" needs the phrase after the number
+    top = TOP_N.search(text)
+    if top:
+        limit = int(top.group(1) or top.group(2))
+        text = text[:top.start()] + " " + text[top.end():]
+    if consume(SORT_DESC):
+        sort = "desc"
+    elif consume(SORT_ASC):
+        sort = "asc"
+    between = consume(BETWEEN)
+    if between:
+        price_min, price_max = sorted((float(between.group(1)), float(between.group(2))))
+    else:
+        under, over = consume(UNDER), consume(OVER)
+        price_max = float(under.group(1)) if under else None
+        price_min = float(over.group(1)) if over else None
+    if consume(OUT_OF_STOCK):
+        in_stock = False
+    elif consume(IN_STOCK):
+        in_stock = True
+    count = bool(consume(COUNT))
+
+    if not matched:
+        return None
+    leftover = [word for word in re.findall(r"[a-z0-9]+", text) if word not in FILLER]
+    if leftover:
+        return None
+    return TabularQuery(QueryFilters(price_min, price_max, in_stock), sort, limit, count)
+
+
+class BookCatalog:
+    """
+    One row per book (title, price, availability...) exported by the gold stage.
+    """
+
+    def __init__(self, books: List[Dict]):
+        self.books = books
+
+    def __len__(self) -> int:
+        return len(self.books)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["BookCatalog"]:
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def select(self, query: TabularQuery) -> Tuple[int, List[Dict]]:
+        """
+        `(total matching, rows)` with rows sorted/limited as the question asked.
+        """
+        rows = [book for book in self.books if book.get("title") and matches_filters(book, query.filters)]
+        total = len(rows)
+        if query.sort is not None:
+            priced = [book for book in rows if book.get("price") is not None]
+            rows = sorted(priced, key=lambda book: (book["price"], book["title"]), reverse=query.sort == "desc")
+            return total, rows[:query.limit or 1]
+        rows = sorted(rows, key=lambda book: book["title"])
+        return total, rows[:query.limit or DEFAULT_LIST_LIMIT]
+
+    def answer(self, query: TabularQuery) -> Tuple[str, List[Dict]]:
+        total, rows = self.select(query)
+        description = describe_filters(query.filters)
+        if query.count:
+            return f"There are {total} books{description}.", []
+        if not rows:
+            return f"No books found{description}.", []
+        if query.sort is not None and len(rows) == 1:
+            superlative = "most expensive" if query.sort == "desc" else "cheapest"
+            book = rows[0]
+            return f'The {superlative} book{description} is "{book["title"]}" at {format_price(book["price"])}.', rows
+
+        header = f"{len(rows)} of {total} books{description}" if total > len(rows) else f"{total} books{description}"
+        lines = [f'{i}. "{book["title"]}" - {format_price(book.get("price"))}' for i, book in enumerate(rows, start=1)]
+        return header + ":\n" + "\n".join(lines), rows
+
+
+def format_price(price: Optional[float]) -> str:
+    return f"£{price:.2f}" if price is not None else "price unknown"
+
+
+def describe_filters(filters: QueryFilters) -> str:
+    parts = []
+    if filters.price_min is not None and filters.price_max is not None:
+        parts.append(f"priced between {format_price(filters.price_min)} and {format_price(filters.price_max)}")
+    elif filters.price_max is not None:
+        parts.append(f"priced at most {format_price(filters.price_max)}")
+    elif filters.price_min is not None:
+        parts.append(f"priced at least {format_price(filters.price_min)}")
+    if filters.in_stock is not None:
+        parts.append("in stock" if filters.in_stock else "out of stock")
+    return (" " + " and ".join(parts)) if parts else ""
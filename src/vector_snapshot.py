@@ -0,0 +1,427 @@
+import json
+import os
+import shutil
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+VECTOR_SNAPSHOT_DIR = "vector_snapshot"  # inside CHROMA_DIR
+VECTOR_SNAPSHOT_KEEP = int(os.getenv("VECTOR_SNAPSHOT_KEEP", "2"))  # published versions kept on disk
+SNAPSHOT_SEARCH_BLOCK = 65536  # rows scored at a time, so the distance matrix stays small
+QUANTIZED_SEARCH_BLOCK = 8192  # quantized rows are widened to float32 block by block
+# "none", "fp16" or "int8" (one symmetric scale per vector); the quantized codes are searched first
+VECTOR_SNAPSHOT_QUANTIZATION = os.getenv("VECTOR_SNAPSHOT_QUANTIZATION", "none")
+# Keep the float32 vectors next to the codes so results can be re-scored at full precision
+VECTOR_SNAPSHOT_KEEP_FLOAT32 = os.getenv("VECTOR_SNAPSHOT_KEEP_FLOAT32", "true").lower() == "true"
+# Quantized candidates per requested result that are re-scored in float32 (0: quantized distances only)
+VECTOR_SNAPSHOT_RESCORE = int(os.getenv("VECTOR_SNAPSHOT_RESCORE", "4"))
+QUANTIZATIONS = ("none", "fp16", "int8")
+CURRENT_FILE = "CURRENT"
+MANIFEST_FILE = "manifest.json"
+
+
+class SnapshotWriter:
+    """
+    Streams a collection's (id, vector, document, metadata) rows into a new snapshot version:
+
+        <root>/<version>/vectors.npy       float32 (n, dim)
+                        /sq_norms.npy      float32 (n,), squared L2 norms
+                        /ids.npy           fixed-width unicode (n,)
+                        /sorted_ids.npy    ids.npy in sorted order, for lookups by ID
+                        /sorted_rows.npy   int64 (n,), row of each sorted_ids entry
+                        /documents.bin     UTF-8 blob, sliced by document_offsets.npy
+                        /metadatas.bin     JSON per row, sliced by metadata_offsets.npy
+                        /columns/<key>.npy float64 per numeric/bool metadata key (NaN = missing)
+                        /manifest.json
+
+    With `quantization` set, `publish` also writes codes.npy (float16 or int8 (n, dim)),
+    code_sq_norms.npy and, for int8, scales.npy (float32 (n,), code * scale ~ value), and drops
+    vectors.npy unless `keep_float32`.
+
+    Nothing is visible to readers until `publish` rewrites the CURRENT pointer.
+    """
+
+    def __init__(self, root: str, count: int, dim: int, version: Optional[str] = None,
+                 quantization: str = VECTOR_SNAPSHOT_QUANTIZATION, keep_float32: bool = VECTOR_SNAPSHOT_KEEP_FLOAT32):
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"Unknown quantization '{quantization}'. Available: {', '.join(QUANTIZATIONS)}")
+        self.root = root
+        self.version = version or datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+        self.path = os.path.join(root, self.version)
+        self.count = count
+        self.dim = dim
+        self.quantization = quantization
+        self.keep_float32 = keep_float32 or quantization == "none"
+        os.makedirs(os.path.join(self.path, "columns"), exist_ok=True)
+        self._vectors = np.lib.format.open_memmap(os.path.join(self.path, "vectors.npy"), mode="w+",
+                                                  dtype=np.float32, shape=(count, dim))
+        self._documents = open(os.path.join(self.path, "documents.bin"), "wb")
+        self._metadatas = open(os.path.join(self.path, "metadatas.bin"), "wb")
+        self._document_offsets = [0]
+        self._metadata_offsets = [0]
+        self._ids: List[str] = []
+        self._columns: Dict[str, List[float]] = {}
+        self._rows = 0
+
+    def add(self, ids: Sequence[str], vectors, documents: Sequence[str], metadatas: Sequence[dict]) -> None:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        start, end = self._rows, self._rows + len(ids)
+        if end > self.count:
+            raise ValueError(f"Snapshot sized for {self.count} rows, got at least {end}")
+        self._vectors[start:end] = vectors
+        for doc, meta in zip(documents, metadatas):
+            self._write(self._documents, self._document_offsets, (doc or "").encode("utf-8"))
+            self._write(self._metadatas, self._metadata_offsets, json.dumps(meta or {}).encode("utf-8"))
+        for row, meta in enumerate(metadatas, start=start):
+            for key, value in (meta or {}).items():
+                if isinstance(value, (bool, int, float)):
+                    self._columns.setdefault(key, [np.nan] * self.count)[row] = float(value)
+        self._ids.extend(ids)
+        self._rows = end
+
+    def publish(self, extra: Optional[dict] = None) -> dict:
+        """
+        Finish the files, switch CURRENT to this version atomically and prune old versions.
+        """
+        if self._rows != self.count:
+            raise ValueError(f"Snapshot sized for {self.count} rows, got {self._rows}")
+        self._vectors.flush()
+        np.save(os.path.join(self.path, "sq_norms.npy"), np.einsum("ij,ij->i", self._vectors, self._vectors))
+        if self.quantization != "none":
+            self._quantize()
+        del self._vectors
+        if not self.keep_float32:
+            os.remove(os.path.join(self.path, "vectors.npy"))
+            os.remove(os.path.join(self.path, "sq_norms.npy"))
+        self._documents.close()
+        self._metadatas.close()
+        np.save(os.path.join(self.path, "document_offsets.npy"), np.array(self._document_offsets, dtype=np.int64))
+        np.save(os.path.join(self.path, "metadata_offsets.npy"), np.array(self._metadata_offsets, dtype=np.int64))
+        ids = np.array(self._ids, dtype=str)
+        np.save(os.path.join(self.path, "ids.npy"), ids)
+        order = np.argsort(ids, kind="stable")
+        np.save(os.path.join(self.path, "sorted_ids.npy"), ids[order])
+        np.save(os.path.join(self.path, "sorted_rows.npy"), order.astype(np.int64))
+        for key, values in self._columns.items():
+            np.save(os.path.join(self.path, "columns", f"{key}.npy"), np.array(values, dtype=np.float64))
+
+        manifest = {"version": self.version, "count": self.count, "dim": self.dim,
+                    "quantization": self.quantization, "float32": self.keep_float32,
+                    "columns": sorted(self._columns), "created": datetime.utcnow().isoformat(), **(extra or {})}
+        with open(os.path.join(self.path, MANIFEST_FILE), "w") as f:
+            json.dump(manifest, f)
+        write_pointer(self.root, self.version)
+        prune_versions(self.root, VECTOR_SNAPSHOT_KEEP)
+        return manifest
+
+    def _quantize(self) -> None:
+        dtype = np.float16 if self.quantization == "fp16" else np.int8
+        codes = np.lib.format.open_memmap(os.path.join(self.path, "codes.npy"), mode="w+",
+                                          dtype=dtype, shape=(self.count, self.dim))
+        scales = np.ones(self.count, dtype=np.float32)
+        code_sq_norms = np.empty(self.count, dtype=np.float32)
+        for start in range(0, self.count, QUANTIZED_SEARCH_BLOCK):
+            block = np.asarray(self._vectors[start:start + QUANTIZED_SEARCH_BLOCK])
+            end = start + len(block)
+            if self.quantization == "int8":
+                peaks = np.abs(block).max(axis=1)
+                scales[start:end] = np.where(peaks > 0, peaks / 127, 1.0)
+                codes[start:end] = np.clip(np.rint(block / scales[start:end, None]), -127, 127)
+            else:
+                codes[start:end] = block
+            # Norms of the values the codes stand for, so quantized distances are self-consistent
+            restored = codes[start:end].astype(np.float32) * scales[start:end, None]
+            code_sq_norms[start:end] = np.einsum("ij,ij->i", restored, restored)
+        codes.flush()
+        del codes
+        np.save(os.path.join(self.path, "code_sq_norms.npy"), code_sq_norms)
+        if self.quantization == "int8":
+            np.save(os.path.join(self.path, "scales.npy"), scales)
+
+    @staticmethod
+    def _write(handle, offsets: List[int], data: bytes) -> None:
+        handle.write(data)
+        offsets.append(offsets[-1] + len(data))
+
+
+def write_pointer(root: str, version: str) -> None:
+    tmp_path = os.path.join(root, f"{CURRENT_FILE}.tmp")
+    with open(tmp_path, "w") as f:
+        f.write(version)
+    os.replace(tmp_path, os.path.join(root, CURRENT_FILE))
+
+
+def current_version(root: str) -> Optional[str]:
+    try:
+        with open(os.path.join(root, CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def prune_versions(root: str, keep: int) -> None:
+    """
+    Delete all but the newest `keep` versions. Workers still mapping a deleted version keep
+    reading it safely: the files stay alive until their last mapping is closed.
+    """
+    current = current_version(root)
+    versions = sorted(name for name in os.listdir(root) if os.path.isdir(os.path.join(root, name)))
+    for name in versions[:-keep] if keep > 0 else versions:
+        if name != current:
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+
+def export_collection(collection, root: str, page_size: int = 5000, extra: Optional[dict] = None,
+                      quantization: str = VECTOR_SNAPSHOT_QUANTIZATION) -> dict:
+    """
+    Write every vector of a Chroma collection into a new snapshot version and publish it.
+    """
+    started = time.perf_counter()
+    count = collection.count()
+    writer = None
+    offset = 0
+    while offset < count:
+        page = collection.get(include=["embeddings", "documents", "metadatas"], limit=page_size, offset=offset)
+        if not len(page["ids"]):
+            break
+        if writer is None:
+            writer = SnapshotWriter(root, count, len(page["embeddings"][0]), quantization=quantization)
+        writer.add(page["ids"], page["embeddings"], page["documents"], page["metadatas"])
+        offset += len(page["ids"])
+    if writer is None:
+        return {"count": 0}
+    manifest = writer.publish(extra)
+    return dict(manifest, export_seconds=round(time.perf_counter() - started, 3),
+                bytes=directory_size(writer.path))
+
+
+def directory_size(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(folder, name)) for folder, _, names in os.walk(path) for name in names)
+
+
+class VectorSnapshot:
+    """
+    Read-only view of a published snapshot. Every array is memory-mapped, so API workers opening
+    the same version share one copy of it in the OS page cache instead of each loading their own.
+
+    `query` and `get` mirror the subset of Chroma's collection API the API uses; search is exact
+    (squared L2, like Chroma's default space) over SNAPSHOT_SEARCH_BLOCK rows at a time. A quantized
+    snapshot is scanned through its codes instead, and the best `rescore` * k candidates are
+    re-ranked against the float32 vectors when the snapshot kept them.
+    """
+
+    def __init__(self, path: str, mmap: bool = True, rescore: int = VECTOR_SNAPSHOT_RESCORE):
+        mode = "r" if mmap else None
+        self.path = path
+        with open(os.path.join(path, MANIFEST_FILE)) as f:
+            self.manifest = json.load(f)
+        self.version = self.manifest["version"]
+        self.quantization = self.manifest.get("quantization", "none")
+        self.rescore = rescore
+        self.vectors = self.sq_norms = self.codes = self.code_sq_norms = self.scales = None
+        if self.manifest.get("float32", True):
+            self.vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode=mode)
+            self.sq_norms = np.load(os.path.join(path, "sq_norms.npy"), mmap_mode=mode)
+        if self.quantization != "none":
+            self.codes = np.load(os.path.join(path, "codes.npy"), mmap_mode=mode)
+            self.code_sq_norms = np.load(os.path.join(path, "code_sq_norms.npy"), mmap_mode=mode)
+        if self.quantization == "int8":
+            self.scales = np.load(os.path.join(path, "scales.npy"), mmap_mode=mode)
+        self.ids = np.load(os.path.join(path, "ids.npy"), mmap_mode=mode)
+        self._document_offsets = np.load(os.path.join(path, "document_offsets.npy"), mmap_mode=mode)
+        self._metadata_offsets = np.load(os.path.join(path, "metadata_offsets.npy"), mmap_mode=mode)
+        self._documents = self._blob(os.path.join(path, "documents.bin"), mmap)
+        self._metadatas = self._blob(os.path.join(path, "metadatas.bin"), mmap)
+        self.columns = {key: np.load(os.path.join(path, "columns", f"{key}.npy"), mmap_mode=mode)
+                        for key in self.manifest["columns"]}
+        if os.path.exists(os.path.join(path, "sorted_ids.npy")):
+            self._sorted_ids = np.load(os.path.join(path, "sorted_ids.npy"), mmap_mode=mode)
+            self._sorted_rows = np.load(os.path.join(path, "sorted_rows.npy"), mmap_mode=mode)
+        else:
+            # Snapshots published before the sorted index existed
+            self._sorted_rows = np.argsort(self.ids, kind="stable")
+            self._sorted_ids = self.ids[self._sorted_rows]
+
+    @classmethod
+    def open_current(cls, root: str, mmap: bool = True, rescore: int = VECTOR_SNAPSHOT_RESCORE) -> Optional["VectorSnapshot"]:
+        version = current_version(root)
+        return cls(os.path.join(root, version), mmap, rescore) if version else None
+
+    def count(self) -> int:
+        return len(self.ids)
+
+    def document(self, row: int) -> str:
+        return bytes(self._documents[self._document_offsets[row]:self._document_offsets[row + 1]]).decode("utf-8")
+
+    def metadata(self, row: int) -> dict:
+        return json.loads(bytes(self._metadatas[self._metadata_offsets[row]:self._metadata_offsets[row + 1]]))
+
+    def search(self, queries, k: int, where: Optional[dict] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        `(rows, distances)`, each (n_queries, <=k), nearest first.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        allowed = None if where is None else np.flatnonzero(self._mask(where))
+        n = len(self.ids) if allowed is None else len(allowed)
+        k = min(k, n)
+        if k == 0:
+            return np.empty((len(queries), 0), dtype=np.int64), np.empty((len(queries), 0), dtype=np.float32)
+        if self.quantization == "none":
+            return self._scan(queries, k, allowed, SNAPSHOT_SEARCH_BLOCK, self._float32_distances)
+
+        rescore = self.rescore > 0 and self.vectors is not None
+        rows, distances = self._scan(queries, min(n, k * self.rescore) if rescore else k, allowed,
+                                     QUANTIZED_SEARCH_BLOCK, self._quantized_distances)
+        return self._rescore(queries, rows, k) if rescore else (rows, distances)
+
+    def _scan(self, queries: np.ndarray, k: int, allowed: Optional[np.ndarray], block_size: int,
+              distances_of) -> Tuple[np.ndarray, np.ndarray]:
+        """Top k of every allowed row, `block_size` rows at a time."""
+        n = len(self.ids) if allowed is None else len(allowed)
+        query_norms = np.einsum("ij,ij->i", queries, queries)[:, None]
+        best_rows = np.empty((len(queries), 0), dtype=np.int64)
+        best_distances = np.empty((len(queries), 0), dtype=np.float32)
+        for start in range(0, n, block_size):
+            rows = np.arange(start, min(start + block_size, n)) if allowed is None \
+                else allowed[start:start + block_size]
+            # Contiguous slices of the memory map are read in place; filtered rows are gathered
+            select = slice(start, start + len(rows)) if allowed is None else rows
+            distances = distances_of(queries, query_norms, select)
+            candidate_rows = np.concatenate([best_rows, np.broadcast_to(rows, distances.shape)], axis=1)
+            candidate_distances = np.concatenate([best_distances, distances], axis=1)
+            if candidate_distances.shape[1] > k:
+                top = np.argpartition(candidate_distances, k - 1, axis=1)[:, :k]
+                candidate_rows = np.take_along_axis(candidate_rows, top, axis=1)
+                candidate_distances = np.take_along_axis(candidate_distances, top, axis=1)
+            best_rows, best_distances = candidate_rows, candidate_distances
+
+        order = np.argsort(best_distances, axis=1, kind="stable")
+        return np.take_along_axis(best_rows, order, axis=1), np.maximum(np.take_along_axis(best_distances, order, axis=1), 0)
+
+    def _float32_distances(self, queries: np.ndarray, query_norms: np.ndarray, select) -> np.ndarray:
+        return query_norms + self.sq_norms[select][None, :] - 2 * (queries @ self.vectors[select].T)
+
+    def _quantized_distances(self, queries: np.ndarray, query_norms: np.ndarray, select) -> np.ndarray:
+        # Queries stay float32; only the stored side is quantized
+        dots = queries @ self.codes[select].astype(np.float32).T
+        if self.scales is not None:
+            dots *= self.scales[select][None, :]
+        return query_norms + self.code_sq_norms[select][None, :] - 2 * dots
+
+    def _rescore(self, queries: np.ndarray, candidates: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Exact float32 distances for each query's quantized candidates; only those rows are read."""
+        query_norms = np.einsum("ij,ij->i", queries, queries)
+        rows = np.empty((len(queries), k), dtype=np.int64)
+        distances = np.empty((len(queries), k), dtype=np.float32)
+        for i, (query, query_rows) in enumerate(zip(queries, candidates)):
+            # Sorted row numbers turn the gather into forward reads of the memory map
+            query_rows = np.sort(query_rows)
+            exact = query_norms[i] + self.sq_norms[query_rows] - 2 * (self.vectors[query_rows] @ query)
+            order = np.argsort(exact, kind="stable")[:k]
+            rows[i], distances[i] = query_rows[order], np.maximum(exact[order], 0)
+        return rows, distances
+
+    def query(self, query_embeddings, n_results: int = 10, include: Iterable[str] = ("documents", "metadatas", "distances"),
+              where: Optional[dict] = None) -> dict:
+        rows, distances = self.search(query_embeddings, n_results, where)
+        results = {"ids": [[str(self.ids[row]) for row in query_rows] for query_rows in rows]}
+        if "documents" in include:
+            results["documents"] = [[self.document(row) for row in query_rows] for query_rows in rows]
+        if "metadatas" in include:
+            results["metadatas"] = [[self.metadata(row) for row in query_rows] for query_rows in rows]
+        if "distances" in include:
+            results["distances"] = [[float(distance) for distance in query_distances] for query_distances in distances]
+        return results
+
+    def get(self, ids: Sequence[str], include: Iterable[str] = ("documents", "metadatas")) -> dict:
+        rows = self._rows_of(ids)
+        results = {"ids": [str(self.ids[row]) for row in rows]}
+        if "documents" in include:
+            results["documents"] = [self.document(row) for row in rows]
+        if "metadatas" in include:
+            results["metadatas"] = [self.metadata(row) for row in rows]
+        return results
+
+    def _rows_of(self, ids: Sequence[str]) -> List[int]:
+        """Rows of `ids`, in order and skipping unknown ones, by binary search over the sorted IDs."""
+        if not len(ids) or not len(self._sorted_ids):
+            return []
+        # Cast to the stored width so the mapped array is searched in place rather than copied wider
+        positions = np.searchsorted(self._sorted_ids, np.array(ids, dtype=self._sorted_ids.dtype))
+        rows = []
+        for doc_id, position in zip(ids, positions):
+            # Compared as Python strings: an ID longer than the stored width was truncated above
+            if position < len(self._sorted_ids) and str(self._sorted_ids[position]) == doc_id:
+                rows.append(int(self._sorted_rows[position]))
+        return rows
+
+    def _mask(self, where: dict) -> np.ndarray:
+        """
+        Boolean row mask for a Chroma-style `where` over numeric/bool metadata:
+        `$and`/`$or` plus `$eq`, `$ne`, `$gt`, `$gte`, `$lt`, `$lte` (a bare value means `$eq`).
+        """
+        if "$and" in where:
+            return np.logical_and.reduce([self._mask(clause) for clause in where["$and"]])
+        if "$or" in where:
+            return np.logical_or.reduce([self._mask(clause) for clause in where["$or"]])
+        (key, condition), = where.items()
+        if key not in self.columns:
+            raise ValueError(f"Metadata key '{key}' is not filterable in this snapshot")
+        column = self.columns[key]
+        (op, value), = (condition.items() if isinstance(condition, dict) else [("$eq", condition)])
+        value = float(value)
+        compare = {"$eq": np.equal, "$ne": np.not_equal, "$gt": np.greater, "$gte": np.greater_equal,
+                   "$lt": np.less, "$lte": np.less_equal}[op]
+        return compare(column, value) & ~np.isnan(column)
+
+    @staticmethod
+    def _blob(path: str, mmap: bool):
+        if os.path.getsize(path) == 0:
+            return np.zeros(0, dtype=np.uint8)
+        return np.memmap(path, dtype=np.uint8, mode="r") if mmap else np.fromfile(path, dtype=np.uint8)
+
+
+class ExactIndex(VectorSnapshot):
+    """
+    A published snapshot held in process memory for small and medium corpora: L2-normalized
+    vectors in one contiguous float32 array, searched with one matrix product per batch of
+    queries and an `argpartition` top-k, with no block loop and no page-cache reads.
+
+    Distances are squared L2 between normalized vectors (2 - 2 * cosine), which ranks like
+    Chroma's default space for normalized embeddings such as all-MiniLM-L6-v2's.
+    """
+
+    def __init__(self, path: str, mmap: bool = False, rescore: int = 0):
+        super().__init__(path, mmap=mmap, rescore=0)
+        if self.vectors is not None:
+            vectors = np.asarray(self.vectors, dtype=np.float32)
+        else:
+            vectors = self.codes.astype(np.float32)
+            if self.scales is not None:
+                vectors *= self.scales[:, None]
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        self.matrix = np.ascontiguousarray(vectors / np.where(norms > 0, norms, 1), dtype=np.float32)
+        self.vectors = self.sq_norms = self.codes = self.code_sq_norms = self.scales = None
+
+    def search(self, queries, k: int, where: Optional[dict] = None) -> Tuple[np.ndarray, np.ndarray]:
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        queries = queries / np.where(norms > 0, norms, 1)
+        allowed = None if where is None else np.flatnonzero(self._mask(where))
+        matrix = self.matrix if allowed is None else self.matrix[allowed]
+        k = min(k, len(matrix))
+        if k == 0:
+            return np.empty((len(queries), 0), dtype=np.int64), np.empty((len(queries), 0), dtype=np.float32)
+
+        scores = queries @ matrix.T
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k] if k < len(matrix) else \
+            np.broadcast_to(np.arange(k), (len(queries), k))
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+        top, top_scores = np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+        rows = top if allowed is None else allowed[top]
+        return rows, np.maximum(2 - 2 * top_scores, 0)
+
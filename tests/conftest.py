@@ -19,3 +19,164 @@ def mock_sleep(monkeypatch):
     def mock_sleep_fn(seconds):
         pass  # Skip the actual sleep
     monkeypatch.setattr("time.sleep", mock_sleep_fn)
+
+# Local stub of books.toscrape.com for the concurrent scraper tests
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+STUB_PAGES = 3
+STUB_BOOKS_PER_PAGE = 2
+
+class _StubBookSiteHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        path = self.path
+        if path.startswith("/catalogue/page-"):
+            page = int(path.split("page-")[1].split(".")[0])
+            if page > STUB_PAGES:
+                return self._send(404, "not found")
+            articles = "".join(
+                f'<article class="product_pod"><a href="../../../book-{page}-{i}/index.html"></a></article>'
+                for i in range(STUB_BOOKS_PER_PAGE)
+            )
+            return self._send(200, f"<html><body>{articles}</body></html>")
+        if path.startswith("/catalogue/book-"):
+            slug = path.split("/")[2]
+            return self._send(200, f"""
+            <html>
+                <div class="product_main">
+                    <h1>{slug}</h1>
+                    <p class="price_color">£10.00</p>
+                    <p class="availability">In stock</p>
+                </div>
+                <div id="product_description"></div>
+                <p>Description of {slug}.</p>
+            </html>
+            """)
+        return self._send(404, "not found")
+
+    def _send(self, status, body):
+        payload = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass  # Keep test output quiet
+
+@pytest.fixture
+def stub_book_site():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubBookSiteHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+# In-memory stand-in for the MinIO client methods used by the ETL helpers
+import hashlib
+from types import SimpleNamespace
+from minio.error import S3Error
+
+def _no_such_key(object_name):
+    return S3Error(response=None, code="NoSuchKey", message="missing", resource=object_name,
+                   request_id=None, host_id=None)
+
+class InMemoryMinio:
+    def __init__(self):
+        self.objects = {}
+
+    def put_object(self, bucket_name, object_name, data, length, content_type="application/octet-stream", **kwargs):
+        self.objects[object_name] = data.read(length)
+
+    def get_object(self, bucket_name, object_name):
+        if object_name not in self.objects:
+            raise _no_such_key(object_name)
+        response = MagicMock()
+        response.read.return_value = self.objects[object_name]
+        return response
+
+    def stat_object(self, bucket_name, object_name):
+        if object_name not in self.objects:
+            raise _no_such_key(object_name)
+        return self._info(object_name)
+
+    def list_objects(self, bucket_name, prefix="", recursive=False):
+        return [self._info(name) for name in sorted(self.objects) if name.startswith(prefix)]
+
+    def remove_object(self, bucket_name, object_name):
+        self.objects.pop(object_name, None)
+
+    def _info(self, name):
+        data = self.objects[name]
+        return SimpleNamespace(object_name=name, etag=hashlib.md5(data).hexdigest(), size=len(data))
+
+@pytest.fixture
+def memory_minio():
+    return InMemoryMinio()
+
+# Local stand-in for the Ollama /api/generate endpoint (NDJSON token stream)
+import json
+import time
+
+class _FakeOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        server = self.server
+        server.prompts.append(body.get("prompt", ""))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for token in server.tokens:
+                time.sleep(server.token_delay)
+                self._chunk({"model": body.get("model"), "created_at": "2024-01-01T00:00:00Z",
+                             "response": token, "done": False})
+            self._chunk({"model": body.get("model"), "created_at": "2024-01-01T00:00:00Z",
+                         "response": "", "done": True, "done_reason": "stop"})
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            server.cancelled += 1
+
+    def _chunk(self, message):
+        line = (json.dumps(message) + "\n").encode("utf-8")
+        self.wfile.write(f"{len(line):x}\r\n".encode("ascii") + line + b"\r\n")
+        self.wfile.flush()
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def fake_ollama():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _FakeOllamaHandler)
+    server.tokens = ["Answer", " from", " fake", " LLM"]
+    server.token_delay = 0.0
+    server.prompts = []
+    server.cancelled = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+# Cross-encoder stand-in for the reranker tests
+class OverlapCrossEncoder:
+    """Scores a pair by the number of query words found in the document."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.batches = []
+
+    def predict(self, pairs, batch_size=32, convert_to_numpy=True, show_progress_bar=False):
+        self.batches.append(len(pairs))
+        time.sleep(self.delay)
+        return [len(set(query.split()) & set(doc.split())) for query, doc in pairs]
+
+@pytest.fixture
+def overlap_cross_encoder():
+    return OverlapCrossEncoder
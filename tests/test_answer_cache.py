@@ -0,0 +1,47 @@
+import numpy as np
+from src.answer_cache import AnswerCache, normalize_query
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def one_hot(text):
+    vector = np.zeros(4, dtype=np.float32)
+    vector[len(text.split()) % 4] = 1.0
+    return vector
+
+# --- Test normalization and eviction ---
+
+def test_normalize_query_keeps_prices():
+    assert normalize_query("  What costs £51.77?? ") == "what costs £51.77"
+    assert normalize_query("Cheapest book.") == normalize_query("cheapest   BOOK")
+
+def test_ttl_expiry_and_lru_eviction():
+    clock = FakeClock()
+    cache = AnswerCache(max_entries=2, ttl=10, clock=clock)
+    cache.put("a", {"answer": "A"})
+    cache.put("b", {"answer": "B"})
+    assert cache.lookup("a")[0].payload == {"answer": "A"}  # "a" becomes most recent
+    cache.put("c", {"answer": "C"})
+
+    assert cache.lookup("b")[0] is None
+    assert cache.stats()["evictions"] == 1
+    clock.now = 11
+    assert cache.lookup("a")[0] is None
+
+def test_semantic_hit_requires_threshold_and_version_change_clears():
+    cache = AnswerCache(embed_fn=one_hot, similarity_threshold=0.99)
+    hit, vector = cache.lookup("one two")
+    assert hit is None and vector is not None
+    cache.put("one two", {"answer": "x"}, vector)
+
+    hit, _ = cache.lookup("three four")  # same word count -> same vector
+    assert hit.kind == "semantic" and hit.similarity > 0.99
+    assert cache.lookup("five")[0] is None
+
+    cache.sync_version("v2")
+    assert cache.lookup("one two")[0] is None
+    assert cache.stats()["invalidations"] == 1
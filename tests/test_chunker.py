@@ -0,0 +1,48 @@
+import pytest
+from src.chunker import SentenceChunker, FixedCharChunker, get_chunker, token_histogram
+
+def word_count(text):
+    return len(text.split())
+
+# --- Test SentenceChunker ---
+
+def test_sentence_chunker_respects_budget_and_sentence_boundaries():
+    text = "One two three. Four five six. Seven eight nine. Ten eleven twelve."
+    chunks = SentenceChunker(max_tokens=6, overlap_tokens=0, token_counter=word_count).split(text)
+
+    assert [c.text for c in chunks] == ["One two three. Four five six.", "Seven eight nine. Ten eleven twelve."]
+    assert all(c.tokens <= 6 for c in chunks)
+    # Offsets point back into the source text
+    assert all(text[c.offset:c.offset + len(c.text)] == c.text for c in chunks)
+
+def test_sentence_chunker_overlaps_trailing_sentences():
+    text = "A b c. D e f. G h i. J k l."
+    chunks = SentenceChunker(max_tokens=6, overlap_tokens=3, token_counter=word_count).split(text)
+
+    assert [c.text for c in chunks] == ["A b c. D e f.", "D e f. G h i.", "G h i. J k l."]
+
+def test_sentence_chunker_splits_long_sentences_on_words():
+    text = "word " * 10 + "end."
+    chunks = SentenceChunker(max_tokens=4, overlap_tokens=0, token_counter=word_count).split(text)
+
+    assert all(c.tokens <= 4 for c in chunks)
+    assert " ".join(c.text for c in chunks).split() == text.split()
+
+def test_sentence_chunker_keeps_decimal_prices_intact():
+    chunks = SentenceChunker(max_tokens=50, overlap_tokens=0, token_counter=word_count).split("price: £51.77\nin stock.")
+    assert chunks[0].text == "price: £51.77\nin stock."
+
+def test_sentence_chunker_rejects_overlap_larger_than_budget():
+    with pytest.raises(ValueError):
+        SentenceChunker(max_tokens=10, overlap_tokens=10)
+
+# --- Test registry and histogram ---
+
+def test_get_chunker_by_name():
+    assert isinstance(get_chunker("fixed"), FixedCharChunker)
+    assert [c.offset for c in get_chunker("fixed").split("x" * 1100)] == [0, 512, 1024]
+    with pytest.raises(ValueError):
+        get_chunker("paragraph")
+
+def test_token_histogram():
+    assert token_histogram([1, 31, 32, 250], bin_width=32) == {"0-31": 2, "32-63": 1, "224-255": 1}
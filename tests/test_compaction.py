@@ -0,0 +1,59 @@
+import json
+import pyarrow as pa
+from src.parquet_io import write_parquet_object, read_parquet_object, partition_for
+from src.compaction import compact_layer, drop_records, object_partition
+
+PARTITIONS = 4
+
+def put_bronze(client, name, content):
+    raw = name.replace("bronze/", "raw/").replace(".parquet", ".txt")
+    write_parquet_object(client, "b", name, pa.table({"file": [raw], "content": [content]}))
+
+def all_rows(client):
+    rows = {}
+    for name in client.objects:
+        if name.endswith(".parquet"):
+            table = read_parquet_object(client, "b", name)
+            rows.update(zip(table.column("file").to_pylist(), table.column("content").to_pylist()))
+    return rows
+
+# --- Test compact_layer ---
+
+def test_compaction_merges_loose_files_into_partitions(memory_minio):
+    for i in range(10):
+        put_bronze(memory_minio, f"bronze/book_{i}.parquet", f"text {i}")
+
+    stats = compact_layer(memory_minio, "b", "bronze", PARTITIONS, row_group_size=100)
+
+    names = [n for n in memory_minio.objects if n.endswith(".parquet")]
+    assert all(n.startswith("bronze/part-") for n in names)
+    assert stats["compacted_files"] == 10
+    assert stats["total_rows"] == 10
+    # Readers see exactly the same records as before
+    assert all_rows(memory_minio) == {f"raw/book_{i}.txt": f"text {i}" for i in range(10)}
+    # Every row sits in the partition its source hashes to
+    for name in names:
+        table = read_parquet_object(memory_minio, "b", name)
+        assert {partition_for(f, PARTITIONS) for f in table.column("file").to_pylist()} == {object_partition(name, PARTITIONS)}
+
+def test_compaction_manifest_lists_sources_and_newer_rows_win(memory_minio):
+    put_bronze(memory_minio, "bronze/book_1.parquet", "old")
+    compact_layer(memory_minio, "b", "bronze", PARTITIONS, row_group_size=100)
+    put_bronze(memory_minio, "bronze/book_1.parquet", "new")
+    compact_layer(memory_minio, "b", "bronze", PARTITIONS, row_group_size=100)
+
+    assert all_rows(memory_minio) == {"raw/book_1.txt": "new"}
+    manifest = json.loads(memory_minio.objects["bronze/_compaction_manifest.json"])
+    part = f"part-{partition_for('raw/book_1.txt', PARTITIONS):05d}.parquet"
+    assert manifest["parts"][part]["sources"] == ["raw/book_1.txt"]
+
+def test_drop_records_removes_rows_of_deleted_sources(memory_minio):
+    for i in range(6):
+        put_bronze(memory_minio, f"bronze/book_{i}.parquet", f"text {i}")
+    compact_layer(memory_minio, "b", "bronze", PARTITIONS, row_group_size=100)
+
+    removed = drop_records(memory_minio, "b", "bronze", ["raw/book_2.txt", "raw/missing.txt"], PARTITIONS, 100)
+
+    assert removed == 1
+    assert "raw/book_2.txt" not in all_rows(memory_minio)
+    assert len(all_rows(memory_minio)) == 5
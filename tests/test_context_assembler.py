@@ -0,0 +1,41 @@
+from src.context_assembler import ContextAssembler
+
+SOURCE = "Sharp Objects is a thriller. Camille returns home to report on two murders. Her past catches up with her."
+
+def chunk(start, end, source="raw/a.txt"):
+    return SOURCE[start:end], {"source": source, "chunk_offset": start}
+
+def assemble(chunks, **kwargs):
+    documents, metadatas = zip(*chunks)
+    return ContextAssembler(**kwargs).assemble(list(documents), list(metadatas))
+
+# --- Test context assembly ---
+
+def test_near_duplicate_chunks_are_dropped():
+    context, stats = assemble([
+        ("Poetry for children, with drawings.", {"source": "raw/1.txt"}),
+        ("poetry for children with drawings", {"source": "raw/2.txt"}),  # re-ingested copy
+        ("A historical novel.", {"source": "raw/3.txt"}),
+    ])
+    assert context == "Poetry for children, with drawings.\n\nA historical novel."
+    assert stats["duplicates"] == 1
+
+def test_overlapping_and_touching_chunks_of_a_source_are_merged():
+    second = SOURCE.index("Camille")
+    third = SOURCE.index("Her past")
+    context, stats = assemble([
+        chunk(second, third - 1),  # overlaps the first chunk, ends one space before the third
+        ("Another book entirely.", {"source": "raw/b.txt"}),
+        chunk(0, second + 10),
+        chunk(third, len(SOURCE)),
+    ])
+    assert context.split("\n\n") == [SOURCE, "Another book entirely."]
+    assert stats["merged"] == 2 and stats["passages"] == 2
+
+def test_context_is_trimmed_to_the_token_budget():
+    long_text = " ".join(f"word{i}" for i in range(100))
+    context, stats = assemble([("short passage", {}), (long_text, {}), ("never reached", {})],
+                              token_budget=50, token_counter=lambda text: len(text.split()))
+    first, second = context.split("\n\n")
+    assert first == "short passage" and second == " ".join(f"word{i}" for i in range(48))
+    assert stats["tokens"] == 50 and stats["cut"] == 1 and stats["dropped"] == 1
@@ -0,0 +1,86 @@
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.object_store import FilesystemClient, ObjectStore
+from src.data_quality import PartitionStatsCache, build_report, merge_stats, partition_stats, run_data_quality_checks
+
+
+def pandas_report(df):
+    """The checks as they ran on one concatenated DataFrame, over its text columns."""
+    strings = [column for column in df.columns if pd.api.types.is_string_dtype(df[column])]
+    empty = {column: int((df[column].astype(str).str.strip() == "").sum()) for column in strings}
+    return {
+        "total_non_nulls": int(df.notnull().sum().sum()),
+        "non_nulls_by_column": {k: int(v) for k, v in df.notnull().sum().items()},
+        "total_nulls": int(df.isnull().sum().sum()),
+        "nulls_by_column": {k: int(v) for k, v in df.isnull().sum().items()},
+        "duplicate_rows": int(df.duplicated().sum()),
+        "total_empty_strings": sum(empty.values()),
+        "empty_strings_by_column": empty,
+    }
+
+
+def write_partitions(tmp_path):
+    tmp_path.mkdir(parents=True, exist_ok=True)
+    tables = {
+        "silver/part-00000.parquet": pa.table({
+            "file": ["raw/a.txt", "raw/a.txt", "raw/b.txt", "raw/c.txt"],
+            "content": ["text", "text", "  \n", None],
+            "price": [10.5, 10.5, None, 3.0],
+            "stock_count": [1, 1, 2, None],
+        }),
+        # Written before stock_count existed
+        "silver/part-00001.parquet": pa.table({
+            "file": ["raw/d.txt", "raw/e.txt"],
+            "content": ["", "more text"],
+            "title": pa.array([None, None], pa.string()),
+            "price": [None, 7.25],
+        }),
+    }
+    paths = {}
+    for name, table in tables.items():
+        paths[name] = str(tmp_path / name.replace("/", "__"))
+        pq.write_table(table, paths[name])
+    return tables, paths
+
+
+def test_report_matches_the_pandas_checks(tmp_path):
+    tables, paths = write_partitions(tmp_path)
+    expected = pandas_report(pa.concat_tables(tables.values(), promote_options="default").to_pandas())
+
+    assert run_data_quality_checks(paths) == expected
+    assert expected["duplicate_rows"] == 1 and expected["empty_strings_by_column"]["content"] == 2
+
+
+def test_partition_stats_add_up_to_a_single_pass(tmp_path):
+    _, paths = write_partitions(tmp_path)
+    separately = [partition_stats({name: path})[name] for name, path in paths.items()]
+
+    assert separately == list(partition_stats(paths).values())
+    assert "stock_count" not in separately[1]["columns"]
+    assert build_report(merge_stats(separately)) == run_data_quality_checks(paths)
+
+
+def test_partition_stats_read_objects_in_place(tmp_path):
+    tables, paths = write_partitions(tmp_path / "local")
+    store = ObjectStore(FilesystemClient(str(tmp_path / "store")), "bucket", workers=2)
+    store.ensure_bucket()
+    for name, path in paths.items():
+        with open(path, "rb") as f:
+            store.put(name, f.read())
+
+    in_place = partition_stats({name: store.duckdb_path(name) for name in tables}, configure=store.configure_duckdb)
+    assert in_place == partition_stats(paths)
+
+
+def test_partition_stats_cache_is_keyed_by_etag_and_size():
+    cache = PartitionStatsCache()
+    cache.put("silver/part-00000.parquet", "etag-1", 100, {"rows": 4})
+    cache.put("silver/part-00001.parquet", "etag-2", 50, {"rows": 2})
+    cache = PartitionStatsCache.from_json(cache.to_json())
+
+    assert cache.get("silver/part-00000.parquet", "etag-1", 100) == {"rows": 4}
+    assert cache.get("silver/part-00000.parquet", "etag-3", 100) is None
+    cache.retain(["silver/part-00000.parquet"])
+    assert cache.get("silver/part-00001.parquet", "etag-2", 50) is None
@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+from unittest.mock import MagicMock
+from src.embedding import EmbeddingPipeline
+
+class FakeModel:
+    def __init__(self):
+        self.batch_sizes = []
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True):
+        self.batch_sizes.append(len(texts))
+        return np.array([[float(len(t)), 1.0] for t in texts], dtype=np.float32)
+
+# --- Test EmbeddingPipeline ---
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_pipeline_batches_across_adds_and_bulk_writes(workers):
+    model = FakeModel()
+    collection = MagicMock()
+    pipeline = EmbeddingPipeline(model, collection, batch_size=4, workers=workers, pool="thread", write_batch_size=8)
+
+    for i in range(10):
+        pipeline.add(f"id-{i}", "x" * (i + 1), {"source": f"file-{i // 3}"})
+    stats = pipeline.flush()
+
+    assert stats["chunks"] == 10
+    assert max(model.batch_sizes) <= 4
+    written_ids = [i for call in collection.upsert.call_args_list for i in call.kwargs["ids"]]
+    assert written_ids == [f"id-{i}" for i in range(10)]
+    # Vectors stay aligned with their IDs across batches
+    first_call = collection.upsert.call_args_list[0].kwargs
+    assert first_call["embeddings"][2][0] == 3.0
+    assert all(len(call.kwargs["ids"]) <= 8 for call in collection.upsert.call_args_list)
+    assert stats["chroma_writes"] == collection.upsert.call_count
+
+def test_pipeline_rejects_unknown_pool():
+    with pytest.raises(ValueError):
+        EmbeddingPipeline(FakeModel(), MagicMock(), pool="gpu")
+
+# --- Test EmbeddingCache ---
+
+from src.embedding_cache import EmbeddingCache, chunk_hash
+
+def test_chunk_hash_ignores_whitespace_differences():
+    assert chunk_hash("a  book\n about cats ") == chunk_hash("a book about cats")
+    assert chunk_hash("a book") != chunk_hash("another book")
+
+def test_cache_round_trip_and_hit_ratio(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"), max_entries=10)
+    vectors = np.array([[1.0, 2.0], [3.0, 4.0]], dtype=np.float32)
+    cache.put_many("model-a", ["h1", "h2"], vectors)
+
+    found = cache.get_many("model-a", ["h1", "h2", "h3"])
+    assert np.array_equal(found["h2"], vectors[1])
+    assert "h3" not in found
+    # Keyed by model name too
+    assert cache.get_many("model-b", ["h1"]) == {}
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 2
+    assert cache.stats()["hit_ratio"] == 0.5
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"), max_entries=2)
+    for i, digest in enumerate(["old", "mid", "new"]):
+        cache.put_many("m", [digest], np.array([[float(i)]], dtype=np.float32))
+    cache._conn.execute("UPDATE embeddings SET last_used = 0 WHERE chunk_hash = 'old'")
+
+    assert cache.evict() == 1
+    assert set(cache.get_many("m", ["old", "mid", "new"])) == {"mid", "new"}
+
+def test_pipeline_only_encodes_cache_misses(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"))
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return FakeModel()
+
+    first = EmbeddingPipeline(None, MagicMock(), batch_size=4, cache=cache, model_name="m", model_loader=loader)
+    for i in range(3):
+        first.add(f"id-{i}", f"chunk {i}", {})
+    assert first.flush()["encoded_chunks"] == 3
+
+    second = EmbeddingPipeline(None, MagicMock(), batch_size=4, cache=cache, model_name="m", model_loader=loader)
+    for i in range(3):
+        second.add(f"id-{i}", f"chunk  {i}", {})
+    stats = second.flush()
+
+    assert stats["encoded_chunks"] == 0
+    assert stats["chunks"] == 3
+    assert len(loads) == 1  # second run never loaded the model
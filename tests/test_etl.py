@@ -0,0 +1,169 @@
+import hashlib
+import importlib
+import io
+import os
+from types import SimpleNamespace
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from unittest.mock import MagicMock
+
+class FakeModel:
+    def __init__(self, name="all-MiniLM-L6-v2"):
+        self.name = name
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True):
+        return np.array([[float(len(t)), float(len(self.name))] for t in texts], dtype=np.float32)
+
+class FakeCollection:
+    """Dict-backed stand-in for the Chroma collection calls the gold stage makes."""
+
+    name = "rag_docs"
+
+    def __init__(self):
+        self.rows = {}
+
+    def upsert(self, ids, documents, embeddings, metadatas):
+        for vector_id, document, embedding, metadata in zip(ids, documents, embeddings, metadatas):
+            self.rows[vector_id] = {"document": document, "embedding": embedding, "metadata": metadata}
+
+    def update(self, ids, metadatas):
+        for vector_id, metadata in zip(ids, metadatas):
+            self.rows[vector_id]["metadata"] = metadata
+
+    def delete(self, ids):
+        for vector_id in ids:
+            self.rows.pop(vector_id, None)
+
+    def get(self, where=None, include=(), limit=None, offset=0):
+        ids = [vector_id for vector_id, row in self.rows.items()
+               if where is None or all(row["metadata"].get(key) == value for key, value in where.items())]
+        ids = ids[offset:None if limit is None else offset + limit]
+        return {
+            "ids": ids,
+            "documents": [self.rows[vector_id]["document"] for vector_id in ids],
+            "metadatas": [self.rows[vector_id]["metadata"] for vector_id in ids],
+        }
+
+    def count(self):
+        return len(self.rows)
+
+class FakeChromaClient:
+    def __init__(self, collection, path):
+        os.makedirs(path, exist_ok=True)  # the next release copies this directory
+        self.collection = collection
+
+    def get_or_create_collection(self, name):
+        return self.collection
+
+    def get_max_batch_size(self):
+        return 100
+
+def silver_parquet(rows):
+    table = pa.table({"file": [source for source, _ in rows], "content": [content for _, content in rows]})
+    sink = io.BytesIO()
+    pq.write_table(table, sink)
+    return sink.getvalue()
+
+@pytest.fixture
+def etl(monkeypatch, tmp_path):
+    # Importing the module opens the object store; none of these tests talk to it
+    import object_store
+    monkeypatch.setattr(object_store, "get_store", lambda: MagicMock())
+    monkeypatch.setenv("CHROMA_DIR", str(tmp_path / "gold"))
+    return importlib.import_module("etl")
+
+@pytest.fixture
+def gold(etl, monkeypatch, tmp_path):
+    """Runs etl_silver_to_gold over in-memory silver files into one fake collection."""
+    collection = FakeCollection()
+    silver = {}
+    monkeypatch.setattr(etl, "CHROMA_DIR", str(tmp_path / "gold"))
+    monkeypatch.setattr(etl, "EMBED_CACHE_ENABLED", False)
+    monkeypatch.setattr(etl, "VECTOR_SNAPSHOT_ENABLED", False)
+    monkeypatch.setattr(etl, "load_embedding_model", FakeModel)
+    monkeypatch.setattr(etl, "load_token_counter", lambda name: lambda text: len(text.split()))
+    monkeypatch.setattr(etl, "upload_to_minio", lambda *args, **kwargs: None)
+    monkeypatch.setattr(etl.chromadb, "PersistentClient", lambda path: FakeChromaClient(collection, path))
+    monkeypatch.setattr(etl, "list_objects", lambda folder, suffix=".txt": [
+        SimpleNamespace(object_name=name, etag=hashlib.md5(data).hexdigest(), size=len(data))
+        for name, data in sorted(silver.items())
+    ])
+    monkeypatch.setattr(etl, "read_buffers", lambda objects, io_stats, key: (
+        (obj, silver[key(obj)]) for obj in objects
+    ))
+    return SimpleNamespace(etl=etl, collection=collection, silver=silver)
+
+# --- Test deterministic chunk IDs ---
+
+def test_chunk_id_is_stable_per_source_offset_and_text(etl):
+    chunk_id = etl.chunk_id
+    assert chunk_id("raw/a.txt", 0, "A book.") == chunk_id("raw/a.txt", 0, "A book.")
+    assert chunk_id("raw/a.txt", 0, "A book.") != chunk_id("raw/b.txt", 0, "A book.")
+    assert chunk_id("raw/a.txt", 0, "A book.") != chunk_id("raw/a.txt", 8, "A book.")
+    assert chunk_id("raw/a.txt", 0, "A book.") != chunk_id("raw/a.txt", 0, "Another book.")
+
+def test_delete_stale_vectors_keeps_produced_ids(etl):
+    collection = MagicMock()
+    assert etl.delete_stale_vectors(collection, {"a", "b", "c"}, keep_ids={"b"}) == 2
+    assert sorted(collection.delete.call_args.kwargs["ids"]) == ["a", "c"]
+    collection.reset_mock()
+    assert etl.delete_stale_vectors(collection, {"a"}, keep_ids={"a"}) == 0
+    collection.delete.assert_not_called()
+
+# --- Test vector upserts and cleanup in the gold stage ---
+
+def test_rerun_upserts_instead_of_duplicating(gold):
+    gold.silver["silver/part-0.parquet"] = silver_parquet([("raw/a.txt", "A book about cats.")])
+    gold.etl.etl_silver_to_gold()
+    ids = set(gold.collection.rows)
+
+    gold.etl.etl_silver_to_gold(full_refresh=True)
+    assert set(gold.collection.rows) == ids and len(ids) == 1
+
+def test_reprocessed_silver_file_drops_vectors_it_no_longer_produces(gold):
+    gold.silver["silver/part-0.parquet"] = silver_parquet([
+        ("raw/a.txt", "A book about cats."), ("raw/b.txt", "A book about dogs."),
+    ])
+    gold.etl.etl_silver_to_gold()
+    [kept] = gold.collection.get(where={"source": "raw/a.txt"})["ids"]
+
+    gold.silver["silver/part-0.parquet"] = silver_parquet([
+        ("raw/a.txt", "A book about cats."), ("raw/b.txt", "A book about birds."),
+    ])
+    gold.etl.etl_silver_to_gold()
+    assert sorted(row["document"] for row in gold.collection.rows.values()) == [
+        "A book about birds.", "A book about cats.",
+    ]
+    assert kept in gold.collection.rows
+
+def test_removed_silver_file_drops_its_vectors(gold):
+    gold.silver["silver/part-0.parquet"] = silver_parquet([("raw/a.txt", "A book about cats.")])
+    gold.silver["silver/part-1.parquet"] = silver_parquet([("raw/b.txt", "A book about dogs.")])
+    gold.etl.etl_silver_to_gold()
+    assert gold.collection.count() == 2
+
+    del gold.silver["silver/part-1.parquet"]
+    gold.etl.etl_silver_to_gold()
+    assert [row["metadata"]["source"] for row in gold.collection.rows.values()] == ["raw/a.txt"]
+
+def test_full_refresh_removes_legacy_ids(gold):
+    gold.collection.upsert(ids=["3f2b-legacy-uuid"], documents=["old chunk"], embeddings=[[1.0, 1.0]],
+                           metadatas=[{"source": "raw/a.txt"}])
+    gold.silver["silver/part-0.parquet"] = silver_parquet([("raw/a.txt", "A book about cats.")])
+
+    gold.etl.etl_silver_to_gold(full_refresh=True)
+    assert "3f2b-legacy-uuid" not in gold.collection.rows
+    assert gold.collection.count() == 1
+
+def test_changed_model_re_embeds_the_whole_release(gold, monkeypatch):
+    gold.silver["silver/part-0.parquet"] = silver_parquet([("raw/a.txt", "A book about cats.")])
+    gold.silver["silver/part-1.parquet"] = silver_parquet([("raw/b.txt", "A book about dogs.")])
+    gold.etl.etl_silver_to_gold()
+
+    # Silver is unchanged, yet nothing embedded with the old model may be kept
+    monkeypatch.setattr(gold.etl, "EMBEDDING_MODEL", "another-model")
+    assert len(gold.etl.etl_silver_to_gold()) == 2
+    assert {row["embedding"][1] for row in gold.collection.rows.values()} == {float(len("another-model"))}
@@ -0,0 +1,56 @@
+import os
+
+from src.gold_release import (
+    discard_release, legacy_layout, published_layout, publish_release, release_version, releases_root,
+    stage_release,
+)
+
+
+def build_release(root, text, previous=None):
+    release = stage_release(str(root), previous=previous)
+    os.makedirs(release.chroma, exist_ok=True)
+    with open(os.path.join(release.chroma, "data.txt"), "w") as f:
+        f.write(text)
+    with open(release.manifest, "w") as f:
+        f.write(text)
+    return release
+
+
+def test_release_is_invisible_until_published(tmp_path):
+    assert published_layout(str(tmp_path)).chroma == legacy_layout(str(tmp_path)).chroma
+    assert release_version(published_layout(str(tmp_path))) is None
+
+    release = build_release(tmp_path, "first")
+    assert published_layout(str(tmp_path)).version is None
+
+    publish_release(str(tmp_path), release)
+    assert published_layout(str(tmp_path)).chroma == release.chroma
+    assert release_version(published_layout(str(tmp_path))) == release.version
+
+
+def test_next_release_starts_from_the_published_one(tmp_path):
+    first = build_release(tmp_path, "first")
+    publish_release(str(tmp_path), first)
+
+    second = stage_release(str(tmp_path), previous=published_layout(str(tmp_path)))
+    with open(os.path.join(second.chroma, "data.txt")) as f:
+        assert f.read() == "first"
+    with open(second.manifest) as f:
+        assert f.read() == "first"
+
+
+def test_old_and_failed_releases_are_removed(tmp_path):
+    versions = []
+    for text in ("one", "two", "three"):
+        release = build_release(tmp_path, text)
+        publish_release(str(tmp_path), release, keep=2)
+        versions.append(release.version)
+    assert sorted(os.listdir(releases_root(str(tmp_path)))) == versions[1:] + ["CURRENT"]
+
+    # A build that never got published is cleared by the next one
+    build_release(tmp_path, "failed")
+    staged = build_release(tmp_path, "four")
+    assert sorted(os.listdir(releases_root(str(tmp_path)))) == versions[1:] + [staged.version, "CURRENT"]
+
+    discard_release(staged)
+    assert published_layout(str(tmp_path)).version == versions[-1]
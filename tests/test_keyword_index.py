@@ -0,0 +1,35 @@
+from src.keyword_index import BM25Index, reciprocal_rank_fusion, tokenize
+
+DOCS = {
+    "a": "Title: A Light in the Attic. Price: £51.77. Poetry for children.",
+    "b": "Title: Tipping the Velvet. Price: £53.74. A historical novel.",
+    "c": "Title: Soumission. Price: £50.10. A novel about politics and religion.",
+}
+
+# --- Test BM25 index ---
+
+def test_tokenize_keeps_prices_and_drops_stopwords():
+    assert tokenize("The price of the book is £51.77!") == ["price", "51.77"]
+
+def test_search_ranks_matching_documents():
+    index = BM25Index.build(list(DOCS), list(DOCS.values()))
+
+    assert [doc_id for doc_id, _ in index.search("tipping velvet")] == ["b"]
+    assert {doc_id for doc_id, _ in index.search("novel", k=5)} == {"b", "c"}
+    assert index.search("51.77")[0][0] == "a"
+    assert index.search("unicorn") == []
+
+def test_save_and_load_round_trip(tmp_path):
+    index = BM25Index.build(list(DOCS), list(DOCS.values()))
+    size = index.save(str(tmp_path / "bm25_index.npz"))
+    loaded = BM25Index.load(str(tmp_path / "bm25_index.npz"))
+
+    assert size > 0
+    assert loaded.stats() == index.stats()
+    assert loaded.search("politics religion") == index.search("politics religion")
+
+# --- Test reciprocal rank fusion ---
+
+def test_rrf_rewards_agreement_between_rankings():
+    fused = reciprocal_rank_fusion([["x", "y", "z"], ["y", "w"]], k=60)
+    assert [doc_id for doc_id, _ in fused] == ["y", "x", "w", "z"]
@@ -0,0 +1,34 @@
+from src.manifest import StageManifest, content_hash
+
+# --- Test StageManifest ---
+
+def test_manifest_skips_unchanged_objects():
+    manifest = StageManifest("raw_to_bronze")
+    digest = content_hash(b"hello")
+    manifest.record("raw/a.txt", "etag-1", 5, digest, "bronze/a.parquet")
+
+    assert manifest.is_unchanged("raw/a.txt", "etag-1", 5)
+    assert not manifest.is_unchanged("raw/a.txt", "etag-2", 5)
+    assert not manifest.is_unchanged("raw/b.txt", "etag-1", 5)
+
+def test_manifest_detects_identical_content_with_new_etag():
+    manifest = StageManifest("raw_to_bronze")
+    manifest.record("raw/a.txt", "etag-1", 5, content_hash(b"hello"), "bronze/a.parquet")
+
+    assert manifest.has_content("raw/a.txt", content_hash(b"hello"))
+    assert not manifest.has_content("raw/a.txt", content_hash(b"world"))
+
+    manifest.refresh("raw/a.txt", "etag-2", 5)
+    assert manifest.is_unchanged("raw/a.txt", "etag-2", 5)
+
+def test_manifest_round_trip_and_removed():
+    manifest = StageManifest("bronze_to_silver")
+    manifest.record("bronze/a.parquet", "e1", 10, "h1", "silver/a.parquet")
+    manifest.record("bronze/b.parquet", "e2", 20, "h2", "silver/b.parquet")
+
+    restored = StageManifest.from_json("bronze_to_silver", manifest.to_json())
+
+    assert restored.entries == manifest.entries
+    assert restored.removed(["bronze/a.parquet"]) == ["bronze/b.parquet"]
+    assert restored.output_key("bronze/b.parquet") == "silver/b.parquet"
+    assert StageManifest.from_json("bronze_to_silver", None).entries == {}
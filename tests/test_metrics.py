@@ -0,0 +1,18 @@
+from src.metrics import StageTimer, current_timer, timed_stage
+
+# --- Test per-request stage timings ---
+
+def test_stage_timer_accumulates_through_the_context_variable():
+    timer = StageTimer()
+    with timed_stage("embed"):
+        pass  # no current timer: nothing recorded
+    token = current_timer.set(timer)
+    try:
+        with timed_stage("embed"):
+            pass
+        timer.add("embed", 0.5)
+    finally:
+        current_timer.reset(token)
+
+    assert timer.stages["embed"] >= 0.5
+    assert set(timer.as_ms()) == {"embed", "total"}
@@ -0,0 +1,45 @@
+import asyncio
+from src.micro_batcher import MicroBatcher
+
+# --- Test batching window and fan-out ---
+
+def test_concurrent_submissions_share_one_batch():
+    batches = []
+
+    def double(items):
+        batches.append(list(items))
+        return [item * 2 for item in items]
+
+    async def run():
+        batcher = MicroBatcher(double, max_batch_size=10, max_wait_ms=20)
+        return await asyncio.gather(*[batcher.submit(i) for i in range(5)]), batcher.stats()
+
+    results, stats = asyncio.run(run())
+    assert results == [0, 2, 4, 6, 8]
+    assert batches == [[0, 1, 2, 3, 4]]
+    assert stats["batches"] == 1 and stats["avg_batch_size"] == 5
+
+def test_full_batch_dispatches_without_waiting():
+    batches = []
+
+    def identity(items):
+        batches.append(len(items))
+        return items
+
+    async def run():
+        batcher = MicroBatcher(identity, max_batch_size=3, max_wait_ms=10_000)
+        return await asyncio.wait_for(asyncio.gather(*[batcher.submit(i) for i in range(6)]), timeout=2)
+
+    assert asyncio.run(run()) == list(range(6))
+    assert batches == [3, 3]
+
+def test_batch_errors_reach_every_caller():
+    def fail(items):
+        raise RuntimeError("index unavailable")
+
+    async def run():
+        batcher = MicroBatcher(fail, max_batch_size=4, max_wait_ms=5)
+        return await asyncio.gather(*[batcher.submit(i) for i in range(2)], return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, RuntimeError) for result in results)
@@ -0,0 +1,44 @@
+import pytest
+from minio.error import S3Error
+from src.object_store import FilesystemClient, ObjectStore
+
+# --- Test filesystem backend behind the shared store ---
+
+@pytest.fixture
+def store(tmp_path):
+    store = ObjectStore(FilesystemClient(str(tmp_path)), "bucket", workers=4)
+    store.ensure_bucket()
+    return store
+
+def test_put_list_and_remove(store):
+    store.put("raw/b.txt", b"bravo")
+    store.put("raw/a.txt", b"alpha")
+    store.put("bronze/a.parquet", b"parquet")
+
+    listed = store.list_objects("raw/", ".txt")
+    assert [obj.object_name for obj in listed] == ["raw/a.txt", "raw/b.txt"]
+    assert listed[0].size == 5 and listed[0].etag
+
+    store.remove("raw/a.txt")
+    assert not store.exists("raw/a.txt")
+    assert store.exists("raw/b.txt")
+
+def test_get_many_keeps_input_order(store):
+    names = [f"raw/{i:03d}.txt" for i in range(20)]
+    for name in names:
+        store.put(name, name.encode())
+
+    results = list(store.get_many(reversed(names), window=3))
+    assert [name for name, _ in results] == list(reversed(names))
+    assert all(data == name.encode() for name, data in results)
+
+def test_missing_object_raises_no_such_key(store):
+    with pytest.raises(S3Error) as excinfo:
+        store.get("raw/missing.txt")
+    assert excinfo.value.code == "NoSuchKey"
+
+def test_submitted_uploads_are_visible_after_result(store):
+    futures = [store.submit_put(f"silver/part-{i:05d}.parquet", bytes([i]) * 10) for i in range(8)]
+    for future in futures:
+        future.result()
+    assert len(store.list_objects("silver/", ".parquet")) == 8
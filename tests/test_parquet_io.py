@@ -0,0 +1,29 @@
+import pyarrow as pa
+import pandas as pd
+from src.parquet_io import IOStats, read_parquet_object, write_parquet_object, record_key, partition_for
+
+# --- Test parquet round trip through object storage ---
+
+def test_parquet_round_trip_tracks_io_stats(memory_minio):
+    stats = IOStats()
+    table = pa.table({"file": ["raw/a.txt", "raw/b.txt"], "content": ["a", "b"]})
+
+    size = write_parquet_object(memory_minio, "bucket", "bronze/a.parquet", table, stats=stats)
+    loaded = read_parquet_object(memory_minio, "bucket", "bronze/a.parquet", columns=["file"], stats=stats)
+
+    assert size == len(memory_minio.objects["bronze/a.parquet"])
+    assert loaded.column_names == ["file"]
+    assert loaded.column("file").to_pylist() == ["raw/a.txt", "raw/b.txt"]
+    assert stats.as_dict()["bytes_read"] == stats.as_dict()["bytes_written"] == size
+    assert stats.objects_read == stats.objects_written == 1
+
+def test_write_accepts_dataframes(memory_minio):
+    write_parquet_object(memory_minio, "bucket", "silver/a.parquet", pd.DataFrame({"word_count": [3]}))
+    loaded = read_parquet_object(memory_minio, "bucket", "silver/a.parquet")
+    assert loaded.to_pydict() == {"word_count": [3]}
+
+# --- Test partitioned layout helpers ---
+
+def test_record_key_is_layer_independent():
+    assert record_key("raw/toscrape_1.txt") == record_key("bronze/toscrape_1.parquet") == "toscrape_1"
+    assert partition_for("raw/toscrape_1.txt", 8) == partition_for("bronze/toscrape_1.parquet", 8)
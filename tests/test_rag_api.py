@@ -0,0 +1,437 @@
+import asyncio
+import json
+import time
+import httpx
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from langchain_ollama import OllamaLLM
+
+import rag_api
+from src.answer_cache import AnswerCache
+from src.embedding import QueryEmbedder
+from src.keyword_index import BM25Index
+from src.vector_snapshot import SnapshotWriter
+from src.gold_release import published_layout, release_version, stage_release, publish_release
+
+def bag_of_words(text):
+    vector = np.zeros(64, dtype=np.float32)
+    for word in text.lower().replace("?", "").split():
+        vector[sum(map(ord, word)) % 64] += 1
+    return vector
+
+class BagOfWordsModel:
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True):
+        self.calls.append(list(texts))
+        return np.vstack([bag_of_words(text) for text in texts])
+
+class FakeCollection:
+    """Returns documents in list order for every query, like a vector index that ranks them so."""
+
+    def __init__(self, documents, metadatas=None):
+        self.documents = documents
+        self.ids = [f"id-{i}" for i in range(len(documents))]
+        self.metadatas = [{"source": f"raw/{i}.txt", **(metadatas[i] if metadatas else {})}
+                          for i in range(len(documents))]
+        self.calls = 0
+        self.batch_sizes = []
+        self.wheres = []
+
+    def query(self, query_embeddings, n_results, include, where=None):
+        self.calls += 1
+        self.batch_sizes.append(len(query_embeddings))
+        self.wheres.append(where)
+        rows = [i for i in range(len(self.documents)) if matches_where(self.metadatas[i], where)][:n_results]
+        return {
+            "ids": [[self.ids[i] for i in rows] for _ in query_embeddings],
+            "documents": [[self.documents[i] for i in rows] for _ in query_embeddings],
+            "metadatas": [[self.metadatas[i] for i in rows] for _ in query_embeddings],
+            "distances": [[0.1 * rank for rank in range(len(rows))] for _ in query_embeddings],
+        }
+
+    def get(self, ids, include):
+        rows = [self.ids.index(doc_id) for doc_id in ids]
+        return {
+            "ids": list(ids),
+            "documents": [self.documents[i] for i in rows],
+            "metadatas": [self.metadatas[i] for i in rows],
+        }
+
+def matches_where(metadata, where):
+    if where is None:
+        return True
+    if "$and" in where:
+        return all(matches_where(metadata, clause) for clause in where["$and"])
+    (key, condition), = where.items()
+    value = metadata.get(key)
+    if not isinstance(condition, dict):
+        return value == condition
+    (op, bound), = condition.items()
+    return value is not None and (value >= bound if op == "$gte" else value <= bound)
+
+@pytest.fixture(autouse=True)
+def fake_embedder(monkeypatch, tmp_path):
+    embedder = QueryEmbedder("all-MiniLM-L6-v2", model=BagOfWordsModel())
+    monkeypatch.setattr(rag_api, "embedder", embedder)
+    monkeypatch.setattr(rag_api, "CHROMA_PATH", str(tmp_path))
+    monkeypatch.setattr(rag_api, "GOLD_POLL_INTERVAL", 0.02)
+    return embedder
+
+def metric_value(name, **labels):
+    return rag_api.metrics_registry.get_sample_value(name, labels) or 0.0
+
+def wait_for_gold_release(timeout=5.0):
+    """Wait until the app has switched to (or rejected) the gold build now published on disk."""
+    published = release_version(published_layout(rag_api.CHROMA_PATH))
+    deadline = time.monotonic() + timeout
+    while published not in (rag_api.served_gold_version, rag_api._rejected_gold_version):
+        assert time.monotonic() < deadline, "published gold release was not picked up"
+        time.sleep(0.01)
+
+@pytest.fixture
+def api(monkeypatch, fake_ollama):
+    monkeypatch.setattr(rag_api, "collection", FakeCollection(["a book about cats", "a book about dogs"]))
+    monkeypatch.setattr(rag_api, "llm", OllamaLLM(model="phi3", base_url=fake_ollama.url))
+    monkeypatch.setattr(rag_api, "answer_cache", AnswerCache(embed_fn=rag_api.embed_query, similarity_threshold=0.85))
+    with TestClient(rag_api.app) as client:
+        yield client
+
+# --- Test async query path against the fake Ollama server ---
+
+def test_query_returns_answer_and_context(api, fake_ollama):
+    response = api.post("/query/", json={"query": "cats?"})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["answer"] == "Answer from fake LLM"
+    assert body["context"] == "a book about cats\n\na book about dogs"
+    assert "a book about cats" in fake_ollama.prompts[0]
+
+def test_llm_timeout_returns_504(api, fake_ollama, monkeypatch):
+    fake_ollama.token_delay = 0.5
+    monkeypatch.setattr(rag_api, "LLM_TIMEOUT", 0.2)
+
+    response = api.post("/query/", json={"query": "cats?"})
+    assert response.status_code == 504
+
+def test_concurrent_queries_overlap(monkeypatch, fake_ollama):
+    fake_ollama.token_delay = 0.05  # ~0.2 s per generation
+    monkeypatch.setattr(rag_api, "collection", FakeCollection(["doc"]))
+    monkeypatch.setattr(rag_api, "ANSWER_CACHE_ENABLED", False)
+    monkeypatch.setattr(rag_api, "llm", OllamaLLM(model="phi3", base_url=fake_ollama.url))
+
+    async def run():
+        async with rag_api.lifespan(rag_api.app):
+            transport = httpx.ASGITransport(app=rag_api.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                started = time.perf_counter()
+                responses = await asyncio.gather(*[client.post("/query/", json={"query": f"q{i}"}) for i in range(10)])
+                return responses, time.perf_counter() - started
+
+    responses, elapsed = asyncio.run(run())
+    assert all(r.status_code == 200 for r in responses)
+    assert elapsed < 10 * 0.2 / 2  # far below serial generation time
+    assert rag_api.collection.calls < 10  # concurrent lookups were micro-batched
+
+def test_generation_is_cancelled_when_client_disconnects():
+    class DisconnectedRequest:
+        async def is_disconnected(self):
+            return True
+
+    cancelled = asyncio.Event()
+
+    async def slow_generation():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async def run():
+        with pytest.raises(rag_api.ClientDisconnected):
+            await rag_api.run_cancellable(DisconnectedRequest(), slow_generation(), timeout=5)
+        await asyncio.sleep(0)
+        return cancelled.is_set()
+
+    assert asyncio.run(run())
+
+# --- Test SSE streaming endpoint ---
+
+def parse_sse(text):
+    events = []
+    for block in text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+def test_stream_sends_sources_then_tokens_then_timings(api):
+    with api.stream("POST", "/query/stream", json={"query": "cats?"}) as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = parse_sse(response.read().decode("utf-8"))
+
+    assert events[0][0] == "sources"
+    assert [s["document"] for s in events[0][1]["sources"]] == ["a book about cats", "a book about dogs"]
+    assert "".join(data["text"] for name, data in events if name == "token") == "Answer from fake LLM"
+    name, timings = events[-1]
+    assert name == "done"
+    assert 0 < timings["ttft_ms"] <= timings["total_ms"]
+
+def test_stream_reports_timeout_as_error_event(api, fake_ollama, monkeypatch):
+    fake_ollama.token_delay = 0.5
+    monkeypatch.setattr(rag_api, "LLM_TIMEOUT", 0.2)
+
+    with api.stream("POST", "/query/stream", json={"query": "cats?"}) as response:
+        events = parse_sse(response.read().decode("utf-8"))
+    assert events[-1] == ("error", {"detail": "Query timed out"})
+
+# --- Test answer cache in front of retrieval and generation ---
+
+def test_repeated_and_paraphrased_questions_skip_the_llm(api, fake_ollama):
+    first = api.post("/query/", json={"query": "Which books are about cats?"}).json()
+    exact = api.post("/query/", json={"query": "  which books are about CATS "}).json()
+    similar = api.post("/query/", json={"query": "which books about cats"}).json()
+
+    assert first["cached"] is None
+    assert exact["cached"] == "exact" and similar["cached"] == "semantic"
+    assert exact["answer"] == similar["answer"] == first["answer"]
+    assert len(fake_ollama.prompts) == 1
+    stats = api.get("/cache/stats").json()
+    assert stats["exact_hits"] == 1 and stats["semantic_hits"] == 1 and stats["misses"] == 1
+
+def test_gold_rebuild_invalidates_cached_answers(api, fake_ollama, tmp_path):
+    lineage = tmp_path / "gold_lineage.json"
+    lineage.write_text('{"version": "1"}')
+    wait_for_gold_release()
+    api.post("/query/", json={"query": "cats?"})
+    assert api.post("/query/", json={"query": "cats?"}).json()["cached"] == "exact"
+
+    lineage.write_text('{"version": "22"}')
+    wait_for_gold_release()
+    assert api.post("/query/", json={"query": "cats?"}).json()["cached"] is None
+    assert len(fake_ollama.prompts) == 2
+
+def test_stream_serves_cached_answer(api, fake_ollama):
+    api.post("/query/", json={"query": "cats?"})
+    with api.stream("POST", "/query/stream", json={"query": "cats?"}) as response:
+        events = parse_sse(response.read().decode("utf-8"))
+
+    assert [name for name, _ in events] == ["sources", "token", "done"]
+    assert events[1][1]["text"] == "Answer from fake LLM"
+    assert events[2][1]["cached"] == "exact"
+    assert len(fake_ollama.prompts) == 1
+
+# --- Test explicit query embedding and model check ---
+
+def test_queries_are_embedded_once_with_the_api_model(api, fake_embedder):
+    warm_up_calls = len(fake_embedder.model.calls)
+    api.post("/query/", json={"query": "cats?"})
+
+    # The semantic cache lookup embeds the question; retrieval reuses that vector
+    assert fake_embedder.model.calls[warm_up_calls:] == [["cats?"]]
+
+def test_startup_fails_on_embedding_model_mismatch(monkeypatch, fake_ollama, tmp_path):
+    (tmp_path / "gold_lineage.json").write_text('{"embedding_model": "another-model"}')
+    monkeypatch.setattr(rag_api, "collection", FakeCollection(["doc"]))
+
+    with pytest.raises(RuntimeError):
+        with TestClient(rag_api.app):
+            pass
+
+def test_rebuild_with_another_model_is_not_served(api, tmp_path):
+    rejected = metric_value("rag_gold_reloads_total", result="rejected")
+    (tmp_path / "gold_lineage.json").write_text('{"embedding_model": "another-model", "version": "2"}')
+    wait_for_gold_release()
+
+    assert metric_value("rag_gold_reloads_total", result="rejected") == rejected + 1
+    response = api.post("/query/", json={"query": "cats?"})
+    assert response.status_code == 200
+    assert response.json()["context"].startswith("a book about cats")
+
+# --- Test hybrid keyword + vector retrieval ---
+
+def test_hybrid_search_surfaces_exact_title_match(api, monkeypatch):
+    documents = [f"a story about the sea number {i}" for i in range(30)] + ["tipping the velvet by sarah waters"]
+    collection = FakeCollection(documents)
+    monkeypatch.setattr(rag_api, "collection", collection)
+    monkeypatch.setattr(rag_api, "keyword_index", BM25Index.build(collection.ids, documents))
+
+    context = api.post("/query/", json={"query": "Tipping the Velvet"}).json()["context"]
+    assert "tipping the velvet" in context  # ranked 31st by vector search, 1st by BM25
+
+def test_vector_only_when_no_keyword_index(api):
+    body = api.post("/query/", json={"query": "Tipping the Velvet"}).json()
+    assert body["context"] == "a book about cats\n\na book about dogs"
+
+# --- Test structured answers and metadata filters ---
+
+BOOKS = [
+    {"source": "raw/0.txt", "title": "Sharp Objects", "price": 47.82, "in_stock": True},
+    {"source": "raw/1.txt", "title": "Soumission", "price": 50.10, "in_stock": False},
+    {"source": "raw/2.txt", "title": "Tipping the Velvet", "price": 53.74, "in_stock": True},
+    {"source": "raw/3.txt", "title": "A Light in the Attic", "price": 12.50, "in_stock": True},
+]
+
+@pytest.fixture
+def books(api, monkeypatch):
+    monkeypatch.setattr(rag_api, "book_catalog", rag_api.BookCatalog(BOOKS))
+    collection = FakeCollection([f"{book['title']} description" for book in BOOKS], metadatas=BOOKS)
+    monkeypatch.setattr(rag_api, "collection", collection)
+    return collection
+
+def test_tabular_question_is_answered_without_the_llm(api, books, fake_ollama):
+    body = api.post("/query/", json={"query": "What is the most expensive book?"}).json()
+
+    assert body["answer"] == 'The most expensive book is "Tipping the Velvet" at £53.74.'
+    assert [row["title"] for row in body["structured"]] == ["Tipping the Velvet"]
+    assert fake_ollama.prompts == [] and books.calls == 0
+
+def test_request_filters_narrow_structured_answers(api, books):
+    body = api.post("/query/", json={"query": "cheapest book", "filters": {"price_min": 40}}).json()
+    assert body["structured"][0]["title"] == "Sharp Objects"
+
+def test_questions_about_content_still_use_retrieval(api, books, fake_ollama):
+    body = api.post("/query/", json={"query": "cheapest book about a murder"}).json()
+    assert "structured" not in body
+    assert len(fake_ollama.prompts) == 1
+
+def test_metadata_filters_are_pushed_into_chroma_and_skip_the_cache(api, books, fake_ollama):
+    payload = {"query": "a good novel", "filters": {"price_max": 50, "in_stock": True}}
+    first = api.post("/query/", json=payload).json()
+    second = api.post("/query/", json=payload).json()
+
+    assert books.wheres[0] == {"$and": [{"price": {"$lte": 50.0}}, {"in_stock": True}]}
+    assert first["context"] == "Sharp Objects description\n\nA Light in the Attic description"
+    assert second["cached"] is None and len(fake_ollama.prompts) == 2
+
+def test_keyword_hits_outside_the_filters_are_dropped(api, books, monkeypatch):
+    monkeypatch.setattr(rag_api, "keyword_index", BM25Index.build(books.ids, books.documents))
+    payload = {"query": "Soumission", "filters": {"in_stock": True}}
+    assert "Soumission" not in api.post("/query/", json=payload).json()["context"]
+
+def test_stream_sends_structured_rows(api, books):
+    with api.stream("POST", "/query/stream", json={"query": "top 2 cheapest books"}) as response:
+        body = "".join(response.iter_text())
+    assert '"structured": [{"source": "raw/3.txt"' in body
+    assert "A Light in the Attic" in body and "event: done" in body
+
+# --- Test cross-encoder reranking ---
+
+def test_reranker_picks_prompt_documents_from_the_candidates(api, monkeypatch, fake_ollama, overlap_cross_encoder):
+    documents = [f"a story about the sea number {i}" for i in range(10)] + ["velvet tipping the velvet"]
+    monkeypatch.setattr(rag_api, "collection", FakeCollection(documents))
+    monkeypatch.setattr(rag_api, "reranker", rag_api.Reranker(model=overlap_cross_encoder(), budget_ms=1000))
+    monkeypatch.setattr(rag_api, "RERANK_TOP_N", 2)
+
+    context = api.post("/query/", json={"query": "tipping velvet"}).json()["context"]
+
+    assert context.split("\n\n")[0] == "velvet tipping the velvet"  # 11th by vector search
+    assert len(context.split("\n\n")) == 2
+    assert api.get("/rerank/stats").json()["reranks"] == 1
+
+# --- Test context assembly ---
+
+def test_duplicate_chunks_reach_the_prompt_once(api, monkeypatch, fake_ollama):
+    monkeypatch.setattr(rag_api, "collection", FakeCollection(["A book about cats.", "a book about cats", "dogs"]))
+
+    body = api.post("/query/", json={"query": "cats?"}).json()
+
+    assert body["context"] == "A book about cats.\n\ndogs"
+    assert fake_ollama.prompts[0].count("about cats") == 1
+
+# --- Test latency metrics ---
+
+def test_debug_timings_and_metrics_endpoint(api):
+    # Metrics are process-wide, so compare against the counts before this test
+    generated = metric_value("rag_stage_duration_seconds_count", stage="generate")
+    cached = metric_value("rag_requests_total", endpoint="query", outcome="cached")
+
+    body = api.post("/query/", json={"query": "cats?", "debug": True}).json()
+    api.post("/query/", json={"query": "cats?"})  # exact cache hit
+
+    assert {"embed", "retrieve", "prompt_build", "generate", "total"} <= set(body["debug"]["timings_ms"])
+    assert metric_value("rag_stage_duration_seconds_count", stage="generate") == generated + 1
+    assert metric_value("rag_requests_total", endpoint="query", outcome="cached") == cached + 1
+    metrics = api.get("/metrics")
+    assert metrics.headers["content-type"] == rag_api.CONTENT_TYPE_LATEST
+    assert 'rag_stage_duration_seconds_bucket{le="+Inf",stage="generate"}' in metrics.text
+    assert 'rag_requests_in_flight{endpoint="query"} 0.0' in metrics.text
+
+def test_stream_reports_ttft_stage(api):
+    with api.stream("POST", "/query/stream", json={"query": "dogs?", "debug": True}) as response:
+        body = "".join(response.iter_text())
+    assert '"ttft"' in body.split("event: done")[1]
+
+# --- Test the shared vector snapshot backend ---
+
+def publish_snapshot(root, version, documents):
+    writer = SnapshotWriter(str(root), count=len(documents), dim=64, version=version)
+    writer.add([f"id-{i}" for i in range(len(documents))], [bag_of_words(doc) for doc in documents], documents,
+               [{"source": f"raw/{i}.txt"} for i in range(len(documents))])
+    writer.publish()
+
+@pytest.mark.parametrize("backend", ["snapshot", "numpy"])
+def test_snapshot_backend_serves_and_follows_new_versions(monkeypatch, fake_ollama, tmp_path, backend):
+    root = tmp_path / "vector_snapshot"
+    publish_snapshot(root, "v1", ["a book about cats", "a book about dogs"])
+    monkeypatch.setattr(rag_api, "VECTOR_BACKEND", backend)
+    monkeypatch.setattr(rag_api, "collection", None)
+    monkeypatch.setattr(rag_api, "llm", OllamaLLM(model="phi3", base_url=fake_ollama.url))
+    monkeypatch.setattr(rag_api, "ANSWER_CACHE_ENABLED", False)
+
+    with TestClient(rag_api.app) as client:
+        assert isinstance(rag_api.collection, rag_api.ExactIndex) == (backend == "numpy")
+        assert client.post("/query/", json={"query": "cats"}).json()["context"].startswith("a book about cats")
+
+        publish_snapshot(root, "v2", ["a book about birds"])
+        (tmp_path / "gold_lineage.json").write_text('{"version": "2"}')
+        wait_for_gold_release()
+        assert client.post("/query/", json={"query": "birds"}).json()["context"] == "a book about birds"
+        assert rag_api.collection.version == "v2"
+
+# --- Test blue/green gold releases ---
+
+def publish_release_with(root, documents):
+    release = stage_release(str(root))
+    publish_snapshot(release.vector_snapshot, "v1", documents)
+    with open(release.lineage, "w") as f:
+        json.dump({"embedding_model": "all-MiniLM-L6-v2", "version": release.version}, f)
+    publish_release(str(root), release)
+    return release
+
+def test_new_release_is_switched_to_in_the_background(monkeypatch, fake_ollama, tmp_path):
+    publish_release_with(tmp_path, ["a book about cats", "a book about dogs"])
+    monkeypatch.setattr(rag_api, "VECTOR_BACKEND", "snapshot")
+    monkeypatch.setattr(rag_api, "collection", None)
+    monkeypatch.setattr(rag_api, "llm", OllamaLLM(model="phi3", base_url=fake_ollama.url))
+    monkeypatch.setattr(rag_api, "ANSWER_CACHE_ENABLED", False)
+
+    with TestClient(rag_api.app) as client:
+        old = rag_api.collection
+        assert client.post("/query/", json={"query": "cats"}).json()["context"].startswith("a book about cats")
+
+        release = publish_release_with(tmp_path, ["a book about birds"])
+        wait_for_gold_release()
+        assert rag_api.served_gold_version == release.version
+        assert client.post("/query/", json={"query": "birds"}).json()["context"] == "a book about birds"
+        # A search that started on the old release still completes against it
+        assert old.query(query_embeddings=[bag_of_words("dogs")], n_results=1)["documents"] == [["a book about dogs"]]
+
+
+def test_release_watcher_survives_a_failed_check(api, monkeypatch):
+    failures = []
+
+    def flaky_layout(root):
+        failures.append(root)
+        raise PermissionError("releases/CURRENT")
+
+    monkeypatch.setattr(rag_api, "published_layout", flaky_layout)
+    deadline = time.monotonic() + 5.0
+    while len(failures) < 3:
+        assert time.monotonic() < deadline, "release watcher stopped polling"
+        time.sleep(0.01)
+    # A request keeps being served from the loaded build
+    assert api.post("/query/", json={"query": "cats?"}).status_code == 200
@@ -0,0 +1,28 @@
+from src.reranker import Reranker
+
+DOCS = ["a book about dogs", "poetry for children", "a mystery about a cat and a dog", "cat poetry"]
+
+# --- Test cross-encoder reranking ---
+
+def test_rerank_orders_by_score_in_batches(overlap_cross_encoder):
+    model = overlap_cross_encoder()
+    reranker = Reranker(model=model, batch_size=3, budget_ms=1000)
+
+    result = reranker.rerank("cat poetry", DOCS, top_n=2)
+
+    assert result.order == [3, 1] and result.scores == [2.0, 1.0]
+    assert model.batches == [3, 1]
+    assert not result.skipped
+
+def test_budget_stops_scoring_and_keeps_retrieval_order_for_the_rest(overlap_cross_encoder):
+    reranker = Reranker(model=overlap_cross_encoder(delay=0.05), batch_size=2, budget_ms=80)
+    reranker.warm_up()  # seeds the per-pair cost estimate
+
+    result = reranker.rerank("cat poetry", DOCS, top_n=4)
+    assert result.scored == 2
+    assert result.order == [1, 0, 2, 3] and result.scores[2:] == [None, None]
+
+    reranker.budget = 0.01
+    skipped = reranker.rerank("cat poetry", DOCS, top_n=2)
+    assert skipped.skipped and skipped.order == [0, 1]
+    assert reranker.stats()["skipped"] == 1 and reranker.stats()["truncated"] == 1
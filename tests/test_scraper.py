@@ -130,3 +130,61 @@ def test_scrape_books_to_minio(mock_client, mock_download, mock_safe_get):
     # Check put_object was called to upload file
     mock_client.put_object.assert_called()
 
+
+# --- Test concurrent scraping mode ---
+
+from src.scraper import scrape_books_to_minio_concurrent, get_book_links_concurrent, ConcurrentFetcher
+from src.rag_utils import TokenBucket
+
+def test_get_book_links_concurrent(stub_book_site):
+    fetcher = ConcurrentFetcher(max_per_host=2, rate_limit=100)
+    try:
+        links = get_book_links_concurrent(fetcher, max_books=5, base_url=stub_book_site, workers=4)
+    finally:
+        fetcher.close()
+
+    assert len(links) == 5
+    assert links[0] == f"{stub_book_site}/catalogue/book-1-0/index.html"
+    assert links[4] == f"{stub_book_site}/catalogue/book-3-0/index.html"
+
+@patch("src.scraper.client")
+def test_scrape_books_to_minio_concurrent(mock_client, stub_book_site):
+    mock_client.put_object = MagicMock()
+
+    # Ask for more books than the stub has: the scraper must stop at the last page
+    records = scrape_books_to_minio_concurrent(max_books=10, base_url=stub_book_site, workers=4, rate_limit=100)
+
+    assert len(records) == 6
+    assert [r["title"] for r in records[:2]] == ["book-1-0", "book-1-1"]
+    assert all(r["price"] == "£10.00" for r in records)
+    assert mock_client.put_object.call_count == 6
+
+def test_fetch_retries_take_a_token_each_and_free_the_host_slot_while_waiting(monkeypatch):
+    fetcher = ConcurrentFetcher(max_per_host=1, rate_limit=100)
+    fetcher.session = MagicMock()
+    fetcher.session.get.side_effect = [MagicMock(status_code=503), MagicMock(status_code=503), MagicMock(status_code=200)]
+    fetcher.rate_limiter = MagicMock()
+    slot = fetcher._slot("http://example.com/page")
+    slot_free_during_backoff = []
+    monkeypatch.setattr("src.scraper.time.sleep", lambda seconds: slot_free_during_backoff.append(slot._value == 1))
+
+    assert fetcher.fetch("http://example.com/page").status_code == 200
+    assert fetcher.rate_limiter.acquire.call_count == 3
+    assert slot_free_during_backoff == [True, True]
+
+def test_fetch_does_not_retry_not_found(monkeypatch, mock_sleep):
+    fetcher = ConcurrentFetcher(max_per_host=1, rate_limit=100)
+    fetcher.session = MagicMock()
+    fetcher.session.get.return_value = MagicMock(status_code=404)
+
+    assert fetcher.fetch("http://example.com/catalogue/page-99.html") is None
+    assert fetcher.session.get.call_count == 1
+
+def test_token_bucket_limits_rate():
+    bucket = TokenBucket(rate=50, capacity=1)
+    import time
+    started = time.monotonic()
+    for _ in range(6):
+        bucket.acquire()
+    # First token is free, the remaining five wait ~20ms each
+    assert time.monotonic() - started >= 0.09
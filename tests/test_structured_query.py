@@ -0,0 +1,58 @@
+from src.book_metadata import parse_book_fields
+from src.structured_query import BookCatalog, QueryFilters, build_where, parse_tabular_question
+
+RAW = (
+    "Title: A Light in the Attic\n"
+    "Price: £51.77\n"
+    "Availability: In stock (22 available)\n"
+    "Link: https://books.toscrape.com/a-light-in-the-attic_1000/index.html\n\n"
+    "Price: not a header once the description starts."
+)
+
+# --- Test book field parsing ---
+
+def test_parse_book_fields_types_the_scraper_header():
+    assert parse_book_fields(RAW) == {
+        "title": "A Light in the Attic", "price": 51.77, "availability": "In stock (22 available)",
+        "in_stock": True, "stock_count": 22,
+    }
+
+def test_parse_book_fields_leaves_placeholders_null():
+    fields = parse_book_fields("Title: Unknown Title\nPrice: N/A\nAvailability: N/A\n\nno header here")
+    assert set(fields.values()) == {None}
+
+# --- Test tabular question parsing ---
+
+def test_parse_tabular_questions():
+    assert parse_tabular_question("What is the most expensive book?").sort == "desc"
+    assert parse_tabular_question("top 5 cheapest books").limit == 5
+    assert parse_tabular_question("5 cheapest books")[1:3] == ("asc", 5)
+    assert parse_tabular_question("what are the 3 cheapest books?")[1:3] == ("asc", 3)
+    assert parse_tabular_question("10 most expensive books")[1:3] == ("desc", 10)
+    assert parse_tabular_question("books between £20 and 10").filters == QueryFilters(10.0, 20.0)
+    count = parse_tabular_question("How many books are in stock?")
+    assert count.count and count.filters.in_stock is True
+
+def test_questions_with_subject_matter_are_not_tabular():
+    assert parse_tabular_question("cheapest poetry book") is None
+    assert parse_tabular_question("What is the price of Tipping the Velvet?") is None
+    assert parse_tabular_question("tell me about cats") is None
+
+def test_build_where():
+    assert build_where(QueryFilters()) is None
+    assert build_where(QueryFilters(in_stock=False)) == {"in_stock": False}
+    assert build_where(QueryFilters(price_min=5, price_max=9)) == {
+        "$and": [{"price": {"$gte": 5}}, {"price": {"$lte": 9}}]
+    }
+
+def test_catalog_answers():
+    catalog = BookCatalog([
+        {"title": "B", "price": 20.0, "in_stock": True},
+        {"title": "A", "price": 10.0, "in_stock": False},
+        {"title": "C", "price": None, "in_stock": True},
+    ])
+
+    answer, rows = catalog.answer(parse_tabular_question("cheapest book"))
+    assert answer == 'The cheapest book is "A" at £10.00.' and rows[0]["title"] == "A"
+    assert catalog.answer(parse_tabular_question("how many books are in stock"))[0] == "There are 2 books in stock."
+    assert catalog.answer(parse_tabular_question("books over £50"))[0] == "No books found priced at least £50.00."
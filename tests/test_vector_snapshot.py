@@ -0,0 +1,129 @@
+import os
+import uuid
+
+import chromadb
+import numpy as np
+import pytest
+
+from src import vector_snapshot
+from src.vector_snapshot import ExactIndex, SnapshotWriter, VectorSnapshot, current_version, export_collection
+
+@pytest.fixture
+def chroma_collection():
+    rng = np.random.default_rng(0)
+    collection = chromadb.EphemeralClient().get_or_create_collection(f"snapshot-{uuid.uuid4().hex}")
+    collection.add(
+        ids=[f"id-{i}" for i in range(300)],
+        embeddings=rng.standard_normal((300, 16)).astype(np.float32),
+        documents=[f"chunk {i} – £{i % 40}" for i in range(300)],
+        metadatas=[{"source": f"raw/{i}.txt", "price": float(i % 40), "in_stock": i % 3 > 0} for i in range(300)],
+    )
+    return collection
+
+# --- Test snapshot export and search ---
+
+def test_snapshot_search_matches_chroma(chroma_collection, tmp_path, monkeypatch):
+    monkeypatch.setattr(vector_snapshot, "SNAPSHOT_SEARCH_BLOCK", 64)  # exercise the block-wise top-k merge
+    export_collection(chroma_collection, str(tmp_path), page_size=70)
+    snapshot = VectorSnapshot.open_current(str(tmp_path))
+    queries = np.random.default_rng(1).standard_normal((4, 16)).astype(np.float32)
+    where = {"$and": [{"price": {"$lte": 10.0}}, {"in_stock": True}]}
+
+    for kwargs in ({}, {"where": where}):
+        expected = chroma_collection.query(query_embeddings=queries, n_results=5, **kwargs)
+        actual = snapshot.query(queries, n_results=5, **kwargs)
+        assert actual["ids"] == expected["ids"]
+        assert actual["documents"] == expected["documents"]
+        assert actual["metadatas"] == expected["metadatas"]
+        assert np.allclose(actual["distances"], expected["distances"], rtol=1e-4, atol=1e-4)
+
+    assert snapshot.get(["id-7", "missing"])["documents"] == ["chunk 7 – £7"]
+    assert isinstance(snapshot.vectors, np.memmap)
+
+def test_publish_switches_pointer_and_prunes_old_versions(tmp_path):
+    root = str(tmp_path)
+    for version in ("v1", "v2", "v3"):
+        writer = SnapshotWriter(root, count=1, dim=2, version=version)
+        writer.add(["a"], [[1.0, 0.0]], ["doc"], [{}])
+        writer.publish()
+
+    assert current_version(root) == "v3"
+    assert sorted(os.listdir(root)) == ["CURRENT", "v2", "v3"]
+
+def test_get_looks_ids_up_in_the_mapped_sorted_index(tmp_path):
+    writer = SnapshotWriter(str(tmp_path), count=3, dim=2, version="v1")
+    writer.add(["c", "a", "bb"], [[1.0, 0.0], [0.0, 1.0], [1.0, 1.0]], ["doc c", "doc a", "doc bb"], [{}, {}, {}])
+    writer.publish()
+    snapshot = VectorSnapshot.open_current(str(tmp_path))
+
+    assert isinstance(snapshot._sorted_ids, np.memmap)
+    # Input order is kept; unknown IDs and IDs wider than the stored ones are skipped
+    assert snapshot.get(["bb", "zz", "c", "bbb", "a"])["documents"] == ["doc bb", "doc c", "doc a"]
+
+def test_unknown_filter_key_is_rejected(chroma_collection, tmp_path):
+    export_collection(chroma_collection, str(tmp_path))
+    with pytest.raises(ValueError):
+        VectorSnapshot.open_current(str(tmp_path)).query([[0.0] * 16], where={"source": "raw/1.txt"})
+
+# --- Test quantized snapshots ---
+
+def publish_random(root, quantization, keep_float32=True, count=2000, dim=32):
+    vectors = np.random.default_rng(2).standard_normal((count, dim)).astype(np.float32)
+    writer = SnapshotWriter(root, count=count, dim=dim, version=quantization, quantization=quantization,
+                            keep_float32=keep_float32)
+    writer.add([f"id-{i}" for i in range(count)], vectors, [f"doc {i}" for i in range(count)],
+               [{"price": float(i % 10)} for i in range(count)])
+    writer.publish()
+    return vectors
+
+def recall(expected, actual):
+    return np.mean([len(set(e) & set(a)) / len(e) for e, a in zip(expected, actual)])
+
+@pytest.mark.parametrize("quantization", ["fp16", "int8"])
+def test_quantized_search_with_rescore_matches_float32(tmp_path, quantization):
+    vectors = publish_random(str(tmp_path), quantization)
+    snapshot = VectorSnapshot.open_current(str(tmp_path), rescore=4)
+    queries = np.random.default_rng(3).standard_normal((20, 32)).astype(np.float32)
+    exact = ((queries[:, None, :] - vectors[None, :, :]) ** 2).sum(axis=2)
+    expected = np.argsort(exact, axis=1)[:, :10]
+
+    rows, distances = snapshot.search(queries, 10)
+    assert snapshot.codes.dtype == (np.float16 if quantization == "fp16" else np.int8)
+    assert recall(expected, rows) >= 0.98
+    assert np.allclose(distances, np.take_along_axis(exact, rows, axis=1), rtol=1e-4, atol=1e-3)
+
+    filtered = snapshot.query(queries[:2], n_results=5, include=["metadatas"], where={"price": {"$lt": 3.0}})
+    assert all(meta["price"] < 3 for metas in filtered["metadatas"] for meta in metas)
+
+def test_int8_snapshot_without_float32_vectors(tmp_path):
+    vectors = publish_random(str(tmp_path), "int8", keep_float32=False)
+    assert not os.path.exists(tmp_path / "int8" / "vectors.npy")
+    snapshot = VectorSnapshot.open_current(str(tmp_path))
+    queries = np.random.default_rng(3).standard_normal((20, 32)).astype(np.float32)
+    expected = np.argsort(((queries[:, None, :] - vectors[None, :, :]) ** 2).sum(axis=2), axis=1)[:, :10]
+
+    rows, _ = snapshot.search(queries, 10)
+    assert snapshot.vectors is None
+    assert recall(expected, rows) >= 0.9
+
+# --- Test the in-memory exact index ---
+
+def test_exact_index_matches_chroma_on_normalized_vectors(tmp_path):
+    rng = np.random.default_rng(4)
+    vectors = rng.standard_normal((500, 16)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    collection = chromadb.EphemeralClient().get_or_create_collection(f"exact-{uuid.uuid4().hex}")
+    collection.add(ids=[f"id-{i}" for i in range(500)], embeddings=vectors, documents=[f"chunk {i}" for i in range(500)],
+                   metadatas=[{"price": float(i % 40)} for i in range(500)])
+    export_collection(collection, str(tmp_path))
+    index = ExactIndex.open_current(str(tmp_path))
+    queries = rng.standard_normal((4, 16)).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    assert index.matrix.flags["C_CONTIGUOUS"] and index.vectors is None
+    for kwargs in ({}, {"where": {"price": {"$lt": 5.0}}}):
+        expected = collection.query(query_embeddings=queries, n_results=5, **kwargs)
+        actual = index.query(queries, n_results=5, **kwargs)
+        assert actual["ids"] == expected["ids"]
+        assert np.allclose(actual["distances"], expected["distances"], rtol=1e-4, atol=1e-4)
+